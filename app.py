@@ -1,50 +1,111 @@
 import streamlit as st
-from scripts.analise import * 
-from scripts.classificador_ia import classificar_feedback_com_ia
+from scripts.analise import (
+    carregar_dados, analisar_pontos_fortes, analisar_principais_termos_negativos, criar_quadro_honra,
+    calcular_health_score, desenhar_health_score, plotar_rating_por_dia_semana, plotar_tendencia_rating_mensal,
+    plotar_grafico_pareto, plotar_mapa_calor_problemas_loja, plotar_problemas_por_canal,
+)
+from scripts import config
+from scripts import cubo
+from scripts import cache_graficos
+from scripts import dados_incrementais
+from scripts import instrumentacao
+from scripts import telemetria_ia
 
 st.set_page_config(page_title="Análise de Feedbacks | Protótipo", page_icon="⭐", layout="wide")
 
-@st.cache_data
-def carregar_dados_cached():
-    return carregar_dados()
+# painel de performance: liga a instrumentação só nesta execução do script
+mostrar_performance = st.sidebar.toggle("⏱️ Painel de performance", value=False)
+registros_performance = instrumentacao.iniciar_coleta(ativar=mostrar_performance)
+
+@st.cache_resource
+def obter_dados_incrementais():
+    # um por processo: linhas e cubo ficam em memória e cada execução do script só lê o que mudou
+    return dados_incrementais.DadosIncrementais()
+
+@instrumentacao.instrumentar()
+@st.cache_resource(max_entries=1)
+def carregar_modelo_urgencia_cached(versao, _df):
+    # a versão dos dados é a chave: o registro em disco atualiza o modelo só com as linhas novas
+    from scripts.modelo_urgencia import carregar_ou_treinar_modelo_urgencia # scikit-learn só na aba de IA
+    return carregar_ou_treinar_modelo_urgencia(_df)
+
+@instrumentacao.instrumentar()
+@st.cache_resource(max_entries=20)
+def filtrar_dados_cached(setor, loja, versao, _df):
+    # só os recortes filtrados ficam guardados (sem cópia nem pickle: os consumidores não alteram o DataFrame);
+    # no backend SQLite o filtro vira uma consulta indexada; nos outros, filtra o DataFrame em memória
+    if config.BACKEND_ARMAZENAMENTO == 'sqlite':
+        return carregar_dados(setor=setor, local=loja)
+    df = _df
+    if setor is not None:
+        df = df[df['Setor'] == setor]
+    if loja is not None:
+        df = df[df['Local_Loja'] == loja]
+    return df
+
+def carregar_dados_filtrados(setor, loja, versao, df):
+    # sem filtro, as linhas são as que os dados incrementais já mantêm em memória: nada a copiar nem a guardar
+    if setor is None and loja is None:
+        return df
+    return filtrar_dados_cached(setor, loja, versao, df)
+
+@st.cache_resource
+def obter_cache_graficos():
+    # PNGs já renderizados, compartilhados entre as sessões; a chave inclui filtros e versão dos dados
+    return cache_graficos.CacheDeGraficos()
+
+@st.cache_data(ttl=30)
+def carregar_telemetria_cached():
+    # a tabela cresce a cada classificação; o ttl mostra as execuções novas sem reler a cada rerun
+    return telemetria_ia.carregar_chamadas()
 
 st.title("👨‍💻 Protótipo: Dashboard de Análise de Feedbacks")
-df_original = carregar_dados_cached()
+dados = obter_dados_incrementais()
+df_original, cubo_original, versao_dados, atualizado_em = dados.atualizar()
 
 if df_original is None:
     st.error("Arquivo de dados não encontrado. Use a opção 'Gerar Novos Feedbacks' no menu `main.py`.")
 else:
     # BARRA LATERAL DE FILTROS
+    st.sidebar.caption(f"🕒 Dados de {atualizado_em:%d/%m/%Y %H:%M:%S} · {len(df_original):,} feedbacks"
+                       + (f" · +{dados.ultima_atualizacao['linhas_lidas']:,} linhas na última leitura"
+                          if not dados.ultima_atualizacao['completa'] else ""))
     st.sidebar.header("Filtros Interativos")
-    opcoes_setor = ['Todos'] + list(df_original['Setor'].unique())
+    opcoes_setor = ['Todos'] + list(cubo_original['Setor'].unique())
     setor = st.sidebar.selectbox("Selecione o Setor:", options=opcoes_setor)
-    if setor != 'Todos':
-        df_filtrado = df_original[df_original['Setor'] == setor].copy()
-    else:
-        df_filtrado = df_original.copy()
-    opcoes_loja = ['Todas'] + list(df_filtrado['Local_Loja'].unique())
+    setor_filtro = setor if setor != 'Todos' else None
+    cubo_setor = cubo.filtrar_cubo(cubo_original, setor=setor_filtro)
+    opcoes_loja = ['Todas'] + list(cubo_setor['Local_Loja'].unique())
     loja = st.sidebar.selectbox("Selecione a Loja/Hotel:", options=opcoes_loja)
-    if loja != 'Todas':
-        df_filtrado = df_filtrado[df_filtrado['Local_Loja'] == loja].copy()
+    loja_filtro = loja if loja != 'Todas' else None
+    cubo_filtrado = cubo.filtrar_cubo(cubo_setor, loja=loja_filtro)
+    kpis = cubo.agregar_kpis(cubo_filtrado)
+    # as linhas só são necessárias para termos, pontos fortes e quadro de honra
+    df_filtrado = carregar_dados_filtrados(setor_filtro, loja_filtro, versao_dados, df_original)
+    graficos = obter_cache_graficos()
+
+    def grafico(nome, funcao_plotagem, dados):
+        """PNG do gráfico para os filtros e a versão atuais (desenhado só na primeira vez)."""
+        return graficos.obter((nome, setor_filtro, loja_filtro, versao_dados), lambda: funcao_plotagem(dados))
 
     # CORPO DA PÁGINA COM ABAS
-    tab_geral, tab_criticos, tab_fortes, tab_ia = st.tabs(["📊 Visão Geral", "🔥 Pontos Críticos", "💡 Pontos Fortes", "🤖 Análise Preditiva e IA"])
+    tab_geral, tab_criticos, tab_fortes, tab_ia, tab_telemetria = st.tabs(["📊 Visão Geral", "🔥 Pontos Críticos", "💡 Pontos Fortes", "🤖 Análise Preditiva e IA", "📡 Telemetria da IA"])
 
-    with tab_geral:
+    with tab_geral, instrumentacao.medir("aba: Visão Geral"):
         st.header("O Pulso do Negócio")
-        if not df_filtrado.empty:
+        if kpis['total'] > 0:
             col1, col2, col3 = st.columns(3)
-            col1.metric("Total de Feedbacks", f"{len(df_filtrado):,}")
-            col2.metric("Rating Médio", f"{df_filtrado['Rating'].mean():.2f} ⭐")
-            col3.metric("Feedbacks Negativos", f"{(df_filtrado['Sentimento'] == 'Negativo').sum():,}")
+            col1.metric("Total de Feedbacks", f"{kpis['total']:,}")
+            col2.metric("Rating Médio", f"{kpis['rating_medio']:.2f} ⭐")
+            col3.metric("Feedbacks Negativos", f"{kpis['negativos']:,}")
             st.divider()
 
             st.subheader("Índice de Saúde por Loja/Hotel")
-            health_scores_df, fig_health = calcular_e_exibir_health_score(df_filtrado)
+            health_scores_df = calcular_health_score(cubo_filtrado)
             if health_scores_df is not None:
                 col_tabela, col_grafico = st.columns([1, 2])
                 with col_tabela: st.dataframe(health_scores_df, use_container_width=True, hide_index=True)
-                with col_grafico: st.pyplot(fig_health)
+                with col_grafico: st.image(grafico('health_score', desenhar_health_score, health_scores_df), use_container_width=True)
             else:
                 st.warning("Dados insuficientes para calcular o Health Score.")
             st.divider()
@@ -54,20 +115,20 @@ else:
             col_semanal, col_mensal = st.columns(2)
             with col_semanal:
                 st.markdown("###### Por Dia da Semana")
-                fig_semana = plotar_rating_por_dia_semana(df_filtrado)
-                if fig_semana: st.pyplot(fig_semana)
+                png_semana = grafico('dia_semana', plotar_rating_por_dia_semana, cubo_filtrado)
+                if png_semana: st.image(png_semana, use_container_width=True)
             with col_mensal:
                 st.markdown("###### Por Mês")
-                fig_mes = plotar_tendencia_rating_mensal(df_filtrado)
-                if fig_mes: st.pyplot(fig_mes)
+                png_mes = grafico('tendencia_mensal', plotar_tendencia_rating_mensal, cubo_filtrado)
+                if png_mes: st.image(png_mes, use_container_width=True)
         else:
             st.warning("Nenhum dado encontrado para os filtros selecionados.")
 
-    with tab_criticos:
+    with tab_criticos, instrumentacao.medir("aba: Pontos Críticos"):
         st.header("Análise Profunda dos Problemas")
-        if not df_filtrado[df_filtrado['Sentimento'] == 'Negativo'].empty:
-            fig_pareto = plotar_grafico_pareto(df_filtrado)
-            if fig_pareto: st.subheader("Gráfico de Pareto das Reclamações"); st.pyplot(fig_pareto)
+        if kpis['negativos'] > 0:
+            png_pareto = grafico('pareto', plotar_grafico_pareto, cubo_filtrado)
+            if png_pareto: st.subheader("Gráfico de Pareto das Reclamações"); st.image(png_pareto, use_container_width=True)
             
             # Análises de Causa Raiz Lado a Lado
             st.divider()
@@ -79,17 +140,20 @@ else:
                 else: st.info("Sem dados para análise de termos.")
             with col_calor:
                 st.subheader("Mapa de Calor (Loja vs. Problema)")
-                fig_calor = plotar_mapa_calor_problemas_loja(df_filtrado)
-                if fig_calor: st.pyplot(fig_calor)
+                so_maiores = st.toggle(f"Só as {config.MAPA_CALOR_MAX_LOJAS} lojas com mais reclamações (demais em \"{config.MAPA_CALOR_ROTULO_OUTROS}\")",
+                                       value=config.MAPA_CALOR_SO_MAIORES)
+                png_calor = grafico(f'mapa_calor_{"maiores" if so_maiores else "todas"}',
+                                    lambda dados: plotar_mapa_calor_problemas_loja(dados, so_maiores), cubo_filtrado)
+                if png_calor: st.image(png_calor, use_container_width=True)
                 else: st.info("Sem dados para o mapa de calor.")
             st.divider()
             
-            fig_canal = plotar_problemas_por_canal(df_filtrado)
-            if fig_canal: st.subheader("Perfil de Problemas por Canal"); st.pyplot(fig_canal)
+            png_canal = grafico('problemas_canal', plotar_problemas_por_canal, cubo_filtrado)
+            if png_canal: st.subheader("Perfil de Problemas por Canal"); st.image(png_canal, use_container_width=True)
         else:
             st.info("Ótima notícia! Nenhum feedback negativo encontrado para os filtros selecionados.")
 
-    with tab_fortes:
+    with tab_fortes, instrumentacao.medir("aba: Pontos Fortes"):
         st.header("Identificando o que Funciona para Replicar o Sucesso")
         if not df_filtrado[df_filtrado['Sentimento'] == 'Positivo'].empty:
             col_elogios, col_quadro = st.columns(2)
@@ -106,13 +170,13 @@ else:
         else:
             st.info("Nenhum feedback positivo encontrado para os filtros selecionados.")
 
-    with tab_ia:
+    with tab_ia, instrumentacao.medir("aba: Análise Preditiva e IA"):
         st.header("Análise Preditiva e Demonstração da IA")
         
         # Relatório do Treinamento do Modelo
         st.subheader("Performance do Modelo de Previsão de Urgência")
-        with st.spinner("Treinando modelo de IA..."):
-            modelo, vetorizador, relatorio = treinar_e_avaliar_modelo_urgencia(df_original)
+        with st.spinner("Carregando modelo de IA..."):
+            modelo, vetorizador, relatorio = carregar_modelo_urgencia_cached(versao_dados, df_original)
         if relatorio:
             with st.expander("Ver Relatório de Classificação do Modelo"):
                 st.text(relatorio)
@@ -126,8 +190,56 @@ else:
         if st.button("Analisar Feedback com IA", type="primary"):
             if texto_usuario:
                 with st.spinner("Analisando..."):
+                    from scripts.classificador_ia import classificar_feedback_com_ia
                     resultado = classificar_feedback_com_ia(texto_usuario, setor_ia)
                     if resultado: st.success("Feedback classificado!"); st.json(resultado)
                     else: st.error("Erro ao classificar. A API pode estar indisponível.")
             else:
-                st.warning("Por favor, digite um texto para ser analisado.")
\ No newline at end of file
+                st.warning("Por favor, digite um texto para ser analisado.")
+
+    with tab_telemetria, instrumentacao.medir("aba: Telemetria da IA"):
+        st.header("Custo e Desempenho das Chamadas à IA")
+        df_chamadas = carregar_telemetria_cached()
+        if df_chamadas is None or df_chamadas.empty:
+            st.info("Nenhuma chamada à API registrada ainda. Classifique feedbacks pelo `main.py` para gerar a telemetria.")
+        else:
+            execucao = st.selectbox("Execução:", ['Todas'] + list(df_chamadas['execucao'].unique()[::-1]))
+            if execucao != 'Todas':
+                df_chamadas = df_chamadas[df_chamadas['execucao'] == execucao]
+            relatorio_telemetria = telemetria_ia.gerar_relatorio(df_chamadas)
+
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Chamadas", f"{len(df_chamadas):,}", f"{int((df_chamadas['tentativas'] - 1).sum())} novas tentativas", delta_color="off")
+            col2.metric("Latência p95", f"{df_chamadas['latencia_ms'].quantile(0.95):,.0f} ms")
+            classificados = df_chamadas.loc[df_chamadas['etapa'] != 'geracao', 'feedbacks'].sum()
+            col3.metric("Tokens por Feedback", f"{df_chamadas['total_tokens'].sum() / max(classificados, 1):,.0f}")
+            col4.metric("Custo", f"US$ {df_chamadas['custo'].sum():,.4f}")
+
+            st.subheader("Vazão (feedbacks classificados por minuto)")
+            st.line_chart(relatorio_telemetria['vazao']['feedbacks'])
+            st.subheader("Resumo por Execução")
+            st.dataframe(relatorio_telemetria['resumo'], hide_index=True, use_container_width=True)
+            st.subheader("Prompt Único vs. Duas Etapas (por feedback classificado)")
+            st.dataframe(relatorio_telemetria['etapas'], hide_index=True, use_container_width=True)
+            col_lentas, col_caras = st.columns(2)
+            with col_lentas:
+                st.subheader("Chamadas Mais Lentas")
+                st.dataframe(relatorio_telemetria['mais_lentas'][['ids', 'latencia_ms', 'espera_ms', 'tentativas', 'erro']], hide_index=True, use_container_width=True)
+            with col_caras:
+                st.subheader("Chamadas Mais Caras")
+                st.dataframe(relatorio_telemetria['mais_caras'][['ids', 'modo', 'total_tokens', 'tokens_por_feedback', 'custo_por_feedback']], hide_index=True, use_container_width=True)
+
+    # PAINEL DE PERFORMANCE (tempo de cada etapa nesta execução)
+    if mostrar_performance:
+        with st.sidebar.expander("⏱️ Performance desta execução", expanded=True):
+            df_performance = instrumentacao.resumo(registros_performance)
+            if df_performance.empty:
+                st.info("Nenhuma etapa medida.")
+            else:
+                abas = df_performance[df_performance['pai'].isna()]
+                st.metric("Tempo total medido", f"{abas['duracao_ms'].sum():,.0f} ms")
+                cache = graficos.estatisticas()
+                st.caption(f"🖼️ Cache de gráficos: {cache['itens']} imagens, {cache['mb']:.1f} MB, "
+                           f"{cache['taxa_acerto']:.0%} de acertos")
+                st.bar_chart(df_performance.groupby('nome', sort=False)['duracao_ms'].sum().sort_values(ascending=False).head(15))
+                st.dataframe(df_performance, hide_index=True, use_container_width=True)
@@ -0,0 +1,324 @@
+# Benchmarks de carga, análise e classificação em datasets sintéticos (10 mil a 10 milhões de linhas).
+# Os resultados são salvos em JSON para comparação entre commits; com --comparar, uma piora acima
+# do limite em tempo ou memória faz o script terminar com código 1.
+#
+#   python benchmarks/executar_benchmarks.py --tamanhos 10000 100000
+#   python benchmarks/executar_benchmarks.py --tamanhos 10000 --comparar benchmarks/resultados/base.json
+import argparse
+import contextlib
+import inspect
+import io
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+from scripts import config, armazenamento, analise, cubo, gerarFeedback, modelo_urgencia, quase_duplicatas
+from scripts import classificador_ia
+
+TAMANHOS_PADRAO = [10_000, 100_000, 1_000_000, 10_000_000]
+PASTA_RESULTADOS = RAIZ / 'benchmarks' / 'resultados'
+LIMITE_REGRESSAO = 0.25 # 25% mais lento (ou mais memória) que a base conta como regressão
+MINIMO_SEGUNDOS = 0.05 # etapas mais rápidas que isso na base são ruído e não entram na comparação
+MINIMO_MEMORIA_MB = 5
+SEMENTE = 42
+LOJAS_MAPA_CALOR = 5_000 # unidades distintas no benchmark do mapa de calor com muitas lojas (e 50 variações de cada subcategoria)
+MAXIMO_QUASE_DUPLICATAS = 1_000_000 # linhas no benchmark do índice de quase duplicatas (a assinatura ocupa 128 bytes por linha)
+
+# Valores sintéticos para as colunas preenchidas pela IA
+CATEGORIAS = [
+    ('Atendimento', 'Recepção'), ('Atendimento', 'Vendedor'), ('Instalações', 'Quarto'),
+    ('Limpeza', 'Limpeza do Quarto'), ('Produto', 'Falta de Estoque'), ('Entrega', 'Atraso na Entrega'),
+    ('Preço', 'Preço Alto'), ('Processos', 'Check-in'),
+]
+
+# DATASET
+def _classificar_sinteticamente(bloco: pd.DataFrame, rng: np.random.Generator, pools: dict) -> pd.DataFrame:
+    """Preenche as colunas da IA de forma vetorizada, coerente com o rating de cada linha."""
+    n = len(bloco)
+    ratings = bloco['Rating'].to_numpy()
+    sentimento = np.where(ratings >= 4, config.SENTIMENTS.POS, np.where(ratings == 3, config.SENTIMENTS.NEUTRO, config.SENTIMENTS.NEG))
+    categorias = np.array(CATEGORIAS, dtype=object)[rng.integers(0, len(CATEGORIAS), n)]
+    urgencia = np.where(
+        sentimento == config.SENTIMENTS.NEG,
+        np.where(rng.random(n) < 0.6, config.URGENCIA.ALTA, config.URGENCIA.MEDIA),
+        np.where(rng.random(n) < 0.8, config.URGENCIA.BAIXA, config.URGENCIA.MEDIA),
+    )
+    funcionario = np.where(rng.random(n) < 0.15, pools['nome'][rng.integers(0, len(pools['nome']), n)], 'Não')
+    return bloco.assign(
+        Status=config.STATUS_CLASSIFICADO,
+        Sentimento=sentimento,
+        Sentiment_Score=np.round(np.clip((ratings - 1) / 4 + rng.normal(0, 0.1, n), 0, 1), 2),
+        Categoria=categorias[:, 0],
+        Subcategoria=categorias[:, 1],
+        Tags='tag1, tag2, tag3',
+        Menciona_Empregado=funcionario,
+        Urgencia=urgencia,
+        Palavras_Chave='palavra1, palavra2, palavra3',
+        Sugestao_Acao='Revisar o processo',
+        Rascunho_Resposta='Obrigado pelo seu feedback, vamos analisar o ocorrido.',
+    )
+
+def criar_dataset(tamanho: int, pasta: Path, backend: str):
+    """Gera o dataset com o mesmo esquema do gerador e grava no backend escolhido, bloco a bloco."""
+    config.BACKEND_ARMAZENAMENTO = backend
+    config.DATA_DIR = pasta
+    config.NOME_ARQUIVO_CSV = pasta / 'feedbacks_gerados.csv'
+    config.ARQUIVO_SQLITE = pasta / 'feedbacks.sqlite'
+    config.PASTA_PARQUET = pasta / 'feedbacks_parquet'
+    config.ARQUIVO_DIARIO_IA = pasta / 'diario_classificacoes.jsonl'
+    config.ARQUIVO_CACHE_IA = pasta / 'cache_classificacoes.sqlite'
+    config.PASTA_MODELOS = pasta / 'modelos'
+    config.ARQUIVO_TELEMETRIA_IA = pasta / 'telemetria_ia.sqlite'
+    config.ARQUIVO_INDICE_DUPLICATAS = pasta / 'indice_quase_duplicatas.npz'
+
+    rng = np.random.default_rng(SEMENTE)
+    pools = gerarFeedback.criar_pools_de_nomes(SEMENTE)
+    inicio, fim = pd.Timestamp('2024-01-01'), pd.Timestamp('2025-01-01')
+    setores = ['hotelaria', 'material_construcao']
+    restante = tamanho
+    while restante > 0:
+        n = min(config.GERADOR_TAMANHO_BLOCO, restante)
+        bloco = gerarFeedback.gerar_bloco_de_feedbacks(n, setores[restante % 2], rng, pools, inicio, fim)
+        armazenamento.anexar_feedbacks(_classificar_sinteticamente(bloco, rng, pools))
+        restante -= n
+
+# MEDIÇÃO
+def medir(funcao, repeticoes: int = 1, medir_memoria: bool = True, preparar=None) -> dict:
+    """Melhor tempo entre as repetições e, numa execução à parte com tracemalloc, o pico de memória."""
+    def executar():
+        if preparar:
+            preparar()
+        with contextlib.redirect_stdout(io.StringIO()):
+            inicio = time.perf_counter()
+            funcao()
+            duracao = time.perf_counter() - inicio
+        analise._pyplot().close('all')
+        return duracao
+
+    try:
+        resultado = {'segundos': round(min(executar() for _ in range(repeticoes)), 4)}
+        if medir_memoria:
+            tracemalloc.start()
+            try:
+                executar()
+                _, pico = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+            resultado['pico_memoria_mb'] = round(pico / 2 ** 20, 2)
+    except Exception as e:
+        analise._pyplot().close('all')
+        return {'erro': f"{type(e).__name__}: {e}"}
+    return resultado
+
+def _com_muitas_lojas(tabela: pd.DataFrame) -> pd.DataFrame:
+    """Mesma tabela com LOJAS_MAPA_CALOR unidades e subcategorias livres (como as escritas pela IA)."""
+    posicao = np.arange(len(tabela))
+    return tabela.assign(
+        Local_Loja=pd.Series(posicao % LOJAS_MAPA_CALOR, index=tabela.index).map('Unidade {}'.format),
+        Subcategoria=tabela['Subcategoria'].astype(str) + pd.Series(posicao % 50, index=tabela.index).map(' ({})'.format),
+    )
+
+def _etapas_de_analise(df: pd.DataFrame, cubo_df: pd.DataFrame) -> dict:
+    """Todas as funções analisar_*/plotar_*/calcular_* de analise.py, sobre as linhas e (quando aceitam) sobre o cubo."""
+    etapas = {}
+    for nome, funcao in inspect.getmembers(analise, inspect.isfunction):
+        if funcao.__module__ != analise.__name__ or not nome.startswith(('analisar_', 'plotar_', 'calcular_')):
+            continue
+        etapas[nome] = partial(funcao, df)
+    for nome in ['plotar_tendencia_rating_mensal', 'plotar_grafico_pareto', 'plotar_mapa_calor_problemas_loja',
+                 'plotar_rating_por_dia_semana', 'plotar_problemas_por_canal', 'calcular_e_exibir_health_score']:
+        etapas[f"{nome}[cubo]"] = partial(getattr(analise, nome), cubo_df)
+    etapas[f'plotar_mapa_calor_problemas_loja[cubo, {LOJAS_MAPA_CALOR} lojas]'] = partial(analise.plotar_mapa_calor_problemas_loja,
+                                                                                     _com_muitas_lojas(cubo_df))
+    etapas['criar_quadro_honra'] = partial(analise.criar_quadro_honra, df)
+    etapas['treinar_e_avaliar_modelo_urgencia'] = partial(analise.treinar_e_avaliar_modelo_urgencia, df)
+    return etapas
+
+def _resposta_simulada(prompt: str, limitador=None, formato_resposta=None) -> tuple[str, dict]:
+    """Substitui a chamada HTTP: devolve um JSON válido (um objeto, ou um por ID no modo em lote) e metadados zerados."""
+    resposta = {
+        'Sentimento': 'Negativo', 'Sentiment_Score': '0.2', 'Categoria': 'Atendimento', 'Subcategoria': 'Recepção',
+        'Tags': ['atendimento', 'demora'], 'Menciona_Empregado': 'Não', 'Urgencia': 'Alta',
+        'Palavras_Chave': ['demora'], 'Sugestao_Acao': 'Treinar equipe', 'Rascunho_Resposta': 'Sentimos muito.',
+        'Status': config.STATUS_CLASSIFICADO,
+    }
+    metadados = {'inicio': time.time(), 'latencia_ms': 0.0, 'espera_ms': 0.0, 'tentativas': 1, 'status_http': 200, 'usage': {}, 'erro': None}
+    ids = re.findall(r'- ID: ([\w-]+)', prompt)
+    if ids:
+        return json.dumps([dict(resposta, ID=id_feedback) for id_feedback in ids], ensure_ascii=False), metadados
+    return json.dumps(resposta, ensure_ascii=False), metadados
+
+def _marcar_pendentes(quantidade: int):
+    """Volta `quantidade` feedbacks para o status pendente (fora da medição)."""
+    ids = armazenamento.carregar_feedbacks(colunas=['ID'])['ID'].head(quantidade)
+    armazenamento.salvar_classificacoes({id_feedback: {'Status': 'Pendente'} for id_feedback in ids})
+
+def _medir_classificacao(pendentes: int, repeticoes: int, medir_memoria: bool, modo_lote: bool) -> dict:
+    """Laço de classificação completo (pendentes, lotes, diário, gravação) com a API simulada."""
+    enviar_original, chave_original = classificador_ia._enviar_prompt, classificador_ia.OPENROUTER_API_KEY
+    classificador_ia._enviar_prompt = _resposta_simulada
+    classificador_ia.OPENROUTER_API_KEY = chave_original or 'benchmark' # a chamada HTTP nunca acontece
+    try:
+        return medir(
+            partial(classificador_ia.classificar_feedbacks_pendentes, requisicoes_por_segundo=1e9, modo_lote=modo_lote,
+                    usar_modelo_local=False, agrupar_quase_duplicatas=False),
+            repeticoes, medir_memoria, preparar=partial(_marcar_pendentes, pendentes)
+        )
+    finally:
+        classificador_ia._enviar_prompt, classificador_ia.OPENROUTER_API_KEY = enviar_original, chave_original
+
+def _agrupar_quase_duplicatas(ids: list, textos: list) -> dict:
+    """Índice de quase duplicatas montado do zero (assinaturas MinHash + bandas LSH) e agrupamento de todas as linhas."""
+    indice = quase_duplicatas.IndiceQuaseDuplicatas(caminho=config.ARQUIVO_INDICE_DUPLICATAS)
+    indice.atualizar(ids, textos)
+    return indice.agrupar(ids)
+
+def executar_benchmarks(tamanhos: list, backend: str = 'csv', repeticoes: int = 1, medir_memoria: bool = True, pendentes: int = 1000) -> dict:
+    usar_cache_original = config.IA_USAR_CACHE
+    config.IA_USAR_CACHE = False # com cache, a segunda repetição não mediria nada
+    resultados = {}
+    try:
+        for tamanho in tamanhos:
+            pasta = Path(tempfile.mkdtemp(prefix=f'benchmark_{tamanho}_'))
+            try:
+                print(f"\n📦 Gerando dataset com {tamanho:,} linhas ({backend})...")
+                etapas = {'criar_dataset': medir(partial(criar_dataset, tamanho, pasta, backend), medir_memoria=False)}
+                print(f"   -> {etapas['criar_dataset']}")
+
+                medicoes = {
+                    'carregar_dados': partial(analise.carregar_dados),
+                    'carregar_dados[relatorio]': partial(analise.carregar_dados, colunas=config.COLUNAS_RELATORIO_ESTATICO),
+                }
+                for nome, funcao in medicoes.items():
+                    etapas[nome] = medir(funcao, repeticoes, medir_memoria)
+                    print(f"   ⏱️  {nome}: {etapas[nome]}")
+
+                df = analise.carregar_dados()
+                etapas['construir_cubo'] = medir(partial(cubo.construir_cubo, df), repeticoes, medir_memoria)
+                cubo_df = cubo.construir_cubo(df)
+                for nome, funcao in _etapas_de_analise(df, cubo_df).items():
+                    etapas[nome] = medir(funcao, repeticoes, medir_memoria)
+                    print(f"   ⏱️  {nome}: {etapas[nome]}")
+
+                etapas['carregar_ou_treinar_modelo_urgencia[novo]'] = medir(
+                    partial(modelo_urgencia.carregar_ou_treinar_modelo_urgencia, df), repeticoes, medir_memoria,
+                    preparar=partial(shutil.rmtree, config.PASTA_MODELOS, ignore_errors=True)
+                )
+                etapas['carregar_ou_treinar_modelo_urgencia[registro]'] = medir(
+                    partial(modelo_urgencia.carregar_ou_treinar_modelo_urgencia, df), repeticoes, medir_memoria
+                )
+                for nome in ['carregar_ou_treinar_modelo_urgencia[novo]', 'carregar_ou_treinar_modelo_urgencia[registro]']:
+                    print(f"   ⏱️  {nome}: {etapas[nome]}")
+                amostra = df.head(min(tamanho, MAXIMO_QUASE_DUPLICATAS))
+                nome = f"agrupar_quase_duplicatas[{len(amostra)}]"
+                etapas[nome] = medir(partial(_agrupar_quase_duplicatas, amostra['ID'].tolist(), amostra['Texto_Original'].tolist()),
+                                     repeticoes, medir_memoria)
+                print(f"   ⏱️  {nome}: {etapas[nome]}")
+                del df, cubo_df, amostra
+
+                quantidade = min(pendentes, tamanho)
+                for modo_lote in [False, True]:
+                    nome = f"classificar_feedbacks_pendentes[{quantidade}{', lote' if modo_lote else ''}]"
+                    etapas[nome] = _medir_classificacao(quantidade, repeticoes, medir_memoria, modo_lote)
+                    print(f"   ⏱️  {nome}: {etapas[nome]}")
+                resultados[str(tamanho)] = etapas
+            finally:
+                shutil.rmtree(pasta, ignore_errors=True)
+    finally:
+        config.IA_USAR_CACHE = usar_cache_original
+    return resultados
+
+# COMPARAÇÃO
+def comparar(atual: dict, base: dict, limite: float = LIMITE_REGRESSAO) -> list:
+    """
+    Lista as etapas que pioraram mais que `limite` em relação à base (mesmo tamanho de dataset) e as
+    que funcionavam na base e agora falham.
+    """
+    regressoes = []
+    for tamanho, etapas in atual['resultados'].items():
+        for etapa, medidas in etapas.items():
+            anterior = base['resultados'].get(tamanho, {}).get(etapa)
+            if not anterior or 'erro' in anterior:
+                continue
+            if 'erro' in medidas:
+                regressoes.append({'tamanho': tamanho, 'etapa': etapa, 'metrica': 'erro',
+                                   'base': anterior.get('segundos'), 'atual': medidas['erro'], 'variacao': None})
+                continue
+            for metrica, minimo in [('segundos', MINIMO_SEGUNDOS), ('pico_memoria_mb', MINIMO_MEMORIA_MB)]:
+                if metrica not in medidas or metrica not in anterior or anterior[metrica] < minimo:
+                    continue
+                variacao = medidas[metrica] / anterior[metrica] - 1
+                if variacao > limite:
+                    regressoes.append({'tamanho': tamanho, 'etapa': etapa, 'metrica': metrica,
+                                       'base': anterior[metrica], 'atual': medidas[metrica], 'variacao': round(variacao, 3)})
+    return regressoes
+
+def _commit_atual() -> str | None:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks de carga, análise e classificação.")
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=TAMANHOS_PADRAO, help="número de linhas de cada dataset")
+    parser.add_argument('--backend', choices=['csv', 'sqlite', 'parquet'], default='csv')
+    parser.add_argument('--repeticoes', type=int, default=1, help="repetições por etapa (vale o menor tempo)")
+    parser.add_argument('--pendentes', type=int, default=1000, help="feedbacks pendentes no benchmark de classificação")
+    parser.add_argument('--sem-memoria', action='store_true', help="não mede o pico de memória (evita a execução extra com tracemalloc)")
+    parser.add_argument('--saida', type=Path, help="arquivo JSON de resultados (padrão: benchmarks/resultados/<commit>-<data>.json)")
+    parser.add_argument('--comparar', type=Path, help="JSON de uma execução anterior usada como base")
+    parser.add_argument('--limite', type=float, default=LIMITE_REGRESSAO, help="piora relativa tolerada antes de falhar (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    commit = _commit_atual()
+    atual = {
+        'commit': commit,
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'backend': args.backend,
+        'resultados': executar_benchmarks(args.tamanhos, args.backend, args.repeticoes, not args.sem_memoria, args.pendentes),
+    }
+
+    saida = args.saida or PASTA_RESULTADOS / f"{commit or 'sem-commit'}-{datetime.now():%Y%m%d-%H%M%S}.json"
+    os.makedirs(saida.parent, exist_ok=True)
+    with open(saida, 'w', encoding='utf-8') as arquivo:
+        json.dump(atual, arquivo, ensure_ascii=False, indent=2)
+    print(f"\n💾 Resultados salvos em '{saida}'.")
+
+    if args.comparar is None:
+        return 0
+    with open(args.comparar, encoding='utf-8') as arquivo:
+        base = json.load(arquivo)
+    regressoes = comparar(atual, base, args.limite)
+    if not regressoes:
+        print(f"✅ Nenhuma regressão acima de {args.limite:.0%} em relação a '{args.comparar}'.")
+        return 0
+    print(f"❌ {len(regressoes)} regressões acima de {args.limite:.0%} em relação a '{args.comparar}':")
+    for regressao in regressoes:
+        if regressao['metrica'] == 'erro':
+            print(f"   - [{regressao['tamanho']}] {regressao['etapa']}: funcionava na base e agora falha ({regressao['atual']})")
+            continue
+        print(f"   - [{regressao['tamanho']}] {regressao['etapa']} ({regressao['metrica']}): "
+              f"{regressao['base']} -> {regressao['atual']} (+{regressao['variacao']:.0%})")
+    return 1
+
+if __name__ == '__main__':
+    sys.exit(main())
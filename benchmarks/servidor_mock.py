@@ -0,0 +1,206 @@
+# Servidor local que imita o endpoint de chat completions da OpenRouter, para medir e ajustar a
+# classificação sem rede nem custo. Responde com JSON de classificação válido e pode injetar
+# latência (fixa e proporcional aos tokens de saída), 429 (com Retry-After), 5xx e respostas com JSON
+# malformado. Com response_format/json_schema, devolve só os campos do esquema, como a saída estruturada.
+#
+#   python benchmarks/servidor_mock.py --porta 8765 --latencia lognormal --latencia-ms 800 --taxa-429 0.05
+#   (depois aponte config.API_URL para http://127.0.0.1:8765/)
+import argparse
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CLASSIFICACOES = [
+    {'Sentimento': 'Negativo', 'Sentiment_Score': 0.1, 'Categoria': 'Atendimento', 'Subcategoria': 'Recepção',
+     'Tags': ['atendimento', 'demora', 'recepção'], 'Menciona_Empregado': 'Não', 'Urgencia': 'Alta',
+     'Palavras_Chave': ['demora', 'atendimento', 'recepção'], 'Sugestao_Acao': 'Treinar equipe da recepção',
+     'Rascunho_Resposta': 'Sentimos muito pela demora. Vamos rever o atendimento da recepção.'},
+    {'Sentimento': 'Positivo', 'Sentiment_Score': 0.9, 'Categoria': 'Instalações', 'Subcategoria': 'Quarto',
+     'Tags': ['conforto', 'quarto', 'vista'], 'Menciona_Empregado': 'Não', 'Urgencia': 'Baixa',
+     'Palavras_Chave': ['conforto', 'vista', 'cama'], 'Sugestao_Acao': 'Manter o padrão dos quartos',
+     'Rascunho_Resposta': 'Ficamos felizes com sua estadia! Esperamos recebê-lo novamente.'},
+    {'Sentimento': 'Neutro', 'Sentiment_Score': 0.5, 'Categoria': 'Preço', 'Subcategoria': 'Preço Alto',
+     'Tags': ['preço', 'variedade'], 'Menciona_Empregado': 'Não', 'Urgencia': 'Média',
+     'Palavras_Chave': ['preço', 'média', 'variedade'], 'Sugestao_Acao': 'Revisar a política de preços',
+     'Rascunho_Resposta': 'Obrigado pelo retorno! Vamos avaliar nossos preços.'},
+]
+
+class ServidorMock(ThreadingHTTPServer):
+    """Servidor HTTP multi-thread com falhas e latência configuráveis (probabilidades entre 0 e 1)."""
+    daemon_threads = True
+
+    def __init__(self, porta: int = 8765, latencia: str = 'fixa', latencia_ms: float = 0, desvio_ms: float = 0,
+                 taxa_429: float = 0, taxa_5xx: float = 0, taxa_json_invalido: float = 0,
+                 retry_after_segundos: float = 1, semente: int | None = None, ms_por_token_saida: float = 0):
+        super().__init__(('127.0.0.1', porta), _ManipuladorMock)
+        self.latencia = latencia
+        self.latencia_ms = latencia_ms
+        self.desvio_ms = desvio_ms
+        self.taxa_429 = taxa_429
+        self.taxa_5xx = taxa_5xx
+        self.taxa_json_invalido = taxa_json_invalido
+        self.retry_after_segundos = retry_after_segundos
+        self.ms_por_token_saida = ms_por_token_saida
+        self._aleatorio = random.Random(semente)
+        self._lock = threading.Lock()
+        self._thread = None
+        self.zerar_estatisticas()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/"
+
+    def sortear(self) -> float:
+        with self._lock:
+            return self._aleatorio.random()
+
+    def sortear_latencia(self) -> float:
+        """Latência simulada em segundos, conforme a distribuição escolhida."""
+        with self._lock:
+            if self.latencia == 'uniforme':
+                ms = self._aleatorio.uniform(max(0, self.latencia_ms - self.desvio_ms), self.latencia_ms + self.desvio_ms)
+            elif self.latencia == 'lognormal' and self.latencia_ms > 0:
+                # média e desvio em ms convertidos para os parâmetros da lognormal
+                variancia = (self.desvio_ms or self.latencia_ms / 2) ** 2
+                sigma2 = math.log(1 + variancia / self.latencia_ms ** 2)
+                mu = math.log(self.latencia_ms) - sigma2 / 2
+                ms = self._aleatorio.lognormvariate(mu, sigma2 ** 0.5)
+            else:
+                ms = self.latencia_ms
+        return ms / 1000
+
+    def registrar(self, resultado: str):
+        with self._lock:
+            self.estatisticas['requisicoes'] += 1
+            self.estatisticas[resultado] = self.estatisticas.get(resultado, 0) + 1
+
+    def zerar_estatisticas(self):
+        self.estatisticas = {'requisicoes': 0}
+
+    def iniciar_em_segundo_plano(self) -> 'ServidorMock':
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self.shutdown()
+        self.server_close()
+
+def _classificacao_para(texto: str, id_feedback: str | None = None) -> dict:
+    """Escolhe uma das respostas de forma determinística pelo conteúdo."""
+    indice = int(hashlib.md5(texto.encode('utf-8')).hexdigest(), 16) % len(CLASSIFICACOES)
+    resposta = dict(CLASSIFICACOES[indice], Status='Classificado')
+    if id_feedback is not None:
+        resposta = {'ID': id_feedback, **resposta}
+    return resposta
+
+def _filtrar_pelo_esquema(resposta: dict, esquema: dict) -> dict:
+    return {campo: resposta[campo] for campo in esquema['properties'] if campo in resposta}
+
+def montar_conteudo(prompt: str, formato_resposta: dict | None = None) -> str:
+    """
+    Um objeto JSON por prompt simples, ou um array com um objeto por ID no prompt em lote.
+    Com esquema JSON, só os campos do esquema (e o lote vem em {"itens": [...]}).
+    """
+    esquema = ((formato_resposta or {}).get('json_schema') or {}).get('schema')
+    itens = re.findall(r'- ID: ([^\s|]+) \| Setor: [^|]* \| Feedback: "(.*)"', prompt)
+    if itens:
+        respostas = [_classificacao_para(texto, id_feedback) for id_feedback, texto in itens]
+        if esquema:
+            esquema_item = esquema['properties']['itens']['items']
+            return json.dumps({'itens': [_filtrar_pelo_esquema(resposta, esquema_item) for resposta in respostas]}, ensure_ascii=False)
+        return json.dumps(respostas, ensure_ascii=False)
+    resposta = _classificacao_para(prompt)
+    return json.dumps(_filtrar_pelo_esquema(resposta, esquema) if esquema else resposta, ensure_ascii=False)
+
+class _ManipuladorMock(BaseHTTPRequestHandler):
+    server: ServidorMock
+
+    def log_message(self, *args):
+        pass
+
+    def _responder(self, status: int, corpo: dict | None = None, cabecalhos: dict | None = None):
+        dados = json.dumps(corpo or {}, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(dados)))
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def do_POST(self):
+        tamanho = int(self.headers.get('Content-Length', 0))
+        try:
+            pedido = json.loads(self.rfile.read(tamanho))
+            prompt = pedido['messages'][-1]['content']
+        except (ValueError, KeyError, IndexError, TypeError):
+            self.server.registrar('400')
+            self._responder(400, {'error': {'message': 'corpo inválido'}})
+            return
+
+        time.sleep(self.server.sortear_latencia())
+
+        sorteio = self.server.sortear()
+        if sorteio < self.server.taxa_429:
+            self.server.registrar('429')
+            self._responder(429, {'error': {'message': 'rate limited'}}, {'Retry-After': str(self.server.retry_after_segundos)})
+            return
+        if sorteio < self.server.taxa_429 + self.server.taxa_5xx:
+            self.server.registrar('5xx')
+            self._responder(503, {'error': {'message': 'upstream indisponível'}})
+            return
+
+        conteudo = montar_conteudo(prompt, pedido.get('response_format'))
+        # geração token a token: respostas mais longas demoram mais
+        time.sleep(len(conteudo) // 4 * self.server.ms_por_token_saida / 1000)
+        if self.server.sortear() < self.server.taxa_json_invalido:
+            self.server.registrar('json_invalido')
+            conteudo = 'Claro! Segue a classificação: ' + conteudo[:len(conteudo) // 2]
+        else:
+            self.server.registrar('200')
+
+        self._responder(200, {
+            'id': f"mock-{time.time_ns()}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': pedido.get('model', 'mock'),
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': conteudo}, 'finish_reason': 'stop'}],
+            'usage': {
+                'prompt_tokens': len(prompt) // 4,
+                'completion_tokens': len(conteudo) // 4,
+                'total_tokens': (len(prompt) + len(conteudo)) // 4,
+            },
+        })
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local compatível com o chat completions da OpenRouter.")
+    parser.add_argument('--porta', type=int, default=8765)
+    parser.add_argument('--latencia', choices=['fixa', 'uniforme', 'lognormal'], default='fixa')
+    parser.add_argument('--latencia-ms', type=float, default=0, help="latência média em milissegundos")
+    parser.add_argument('--desvio-ms', type=float, default=0, help="espalhamento da latência (uniforme e lognormal)")
+    parser.add_argument('--taxa-429', type=float, default=0)
+    parser.add_argument('--taxa-5xx', type=float, default=0)
+    parser.add_argument('--taxa-json-invalido', type=float, default=0)
+    parser.add_argument('--retry-after', type=float, default=1, help="segundos informados no Retry-After dos 429")
+    parser.add_argument('--ms-por-token-saida', type=float, default=0, help="latência extra por token da resposta")
+    parser.add_argument('--semente', type=int)
+    args = parser.parse_args()
+
+    servidor = ServidorMock(args.porta, args.latencia, args.latencia_ms, args.desvio_ms, args.taxa_429, args.taxa_5xx,
+                            args.taxa_json_invalido, args.retry_after, args.semente, args.ms_por_token_saida)
+    print(f"🧪 Servidor mock ouvindo em {servidor.url} (Ctrl+C para parar)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\nEstatísticas: {servidor.estatisticas}")
+    finally:
+        servidor.server_close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+# Teste de carga da classificação: roda classificar_feedbacks_pendentes contra o servidor mock
+# (servidor_mock.py) com diferentes níveis de concorrência e mede vazão, latência (p50/p95/p99)
+# e quanto das falhas injetadas foi recuperado pelas novas tentativas.
+#
+#   python benchmarks/teste_carga_classificador.py --pendentes 500 --simultaneas 1 4 8 --latencia-ms 300 --taxa-429 0.05
+#   python benchmarks/teste_carga_classificador.py --duas-etapas ambos --ms-por-token-saida 15   (antes/depois do prompt compacto)
+import argparse
+import contextlib
+import io
+import json
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+from scripts import config, armazenamento, gerarFeedback
+from scripts import classificador_ia, telemetria_ia
+from servidor_mock import ServidorMock
+
+def preparar_dataset(pasta: Path, pendentes: int, semente: int):
+    """Recria, na pasta temporária, um CSV só com feedbacks pendentes."""
+    shutil.rmtree(pasta, ignore_errors=True)
+    pasta.mkdir(parents=True)
+    config.BACKEND_ARMAZENAMENTO = 'csv'
+    config.NOME_ARQUIVO_CSV = pasta / 'feedbacks_gerados.csv'
+    config.ARQUIVO_DIARIO_IA = pasta / 'diario_classificacoes.jsonl'
+    config.ARQUIVO_TELEMETRIA_IA = pasta / 'telemetria_ia.sqlite'
+    config.ARQUIVO_INDICE_DUPLICATAS = pasta / 'indice_quase_duplicatas.npz'
+    rng = np.random.default_rng(semente)
+    pools = gerarFeedback.criar_pools_de_nomes(semente)
+    bloco = gerarFeedback.gerar_bloco_de_feedbacks(pendentes, 'hotelaria', rng, pools, pd.Timestamp('2024-01-01'), pd.Timestamp('2025-01-01'))
+    with contextlib.redirect_stdout(io.StringIO()):
+        armazenamento.anexar_feedbacks(bloco)
+
+def executar_cenario(servidor: ServidorMock, pasta: Path, pendentes: int, simultaneas: int, modo_lote: bool,
+                     requisicoes_por_segundo: float, semente: int, duas_etapas: bool = False) -> dict:
+    """Uma rodada completa; a latência é medida por chamada de _enviar_prompt (inclui fila do limitador e novas tentativas)."""
+    preparar_dataset(pasta, pendentes, semente)
+    servidor.zerar_estatisticas()
+    config.IA_MAX_REQUISICOES_SIMULTANEAS = simultaneas
+    classificador_ia._sessao = None # o pool de conexões é dimensionado pela concorrência
+
+    latencias, lock = [], threading.Lock()
+    enviar_original = classificador_ia._enviar_prompt
+
+    def enviar_medindo(prompt, limitador=None, formato_resposta=None):
+        inicio = time.perf_counter()
+        try:
+            return enviar_original(prompt, limitador, formato_resposta)
+        finally:
+            with lock:
+                latencias.append(time.perf_counter() - inicio)
+
+    classificador_ia._enviar_prompt = enviar_medindo
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            inicio = time.perf_counter()
+            classificador_ia.classificar_feedbacks_pendentes(
+                max_simultaneas=simultaneas, requisicoes_por_segundo=requisicoes_por_segundo,
+                modo_lote=modo_lote, usar_modelo_local=False, duas_etapas=duas_etapas,
+                agrupar_quase_duplicatas=False
+            )
+            duracao = time.perf_counter() - inicio
+    finally:
+        classificador_ia._enviar_prompt = enviar_original
+
+    status = armazenamento.carregar_feedbacks(colunas=['Status'])['Status']
+    classificados = int((status == config.STATUS_CLASSIFICADO).sum())
+    estatisticas = dict(servidor.estatisticas)
+    telemetria = telemetria_ia.carregar_chamadas()
+    tokens = telemetria['total_tokens'].sum() if telemetria is not None else 0
+    tokens_saida = telemetria['completion_tokens'].sum() if telemetria is not None else 0
+    injetadas = sum(estatisticas.get(chave, 0) for chave in ['429', '5xx', 'json_invalido'])
+    percentis = np.percentile(latencias, [50, 95, 99]) * 1000 if latencias else [np.nan] * 3
+    return {
+        'simultaneas': simultaneas,
+        'lote': modo_lote,
+        'duas_etapas': duas_etapas,
+        'segundos': round(duracao, 2),
+        'feedbacks_por_segundo': round(pendentes / duracao, 2),
+        'chamadas': len(latencias),
+        'requisicoes_http': estatisticas['requisicoes'],
+        'p50_ms': round(float(percentis[0]), 1),
+        'p95_ms': round(float(percentis[1]), 1),
+        'p99_ms': round(float(percentis[2]), 1),
+        'tokens_por_feedback': round(float(tokens) / pendentes, 1),
+        'tokens_saida_por_feedback': round(float(tokens_saida) / pendentes, 1),
+        'falhas_injetadas': injetadas,
+        'detalhe_falhas': {chave: valor for chave, valor in estatisticas.items() if chave not in ('requisicoes', '200')},
+        'classificados': classificados,
+        'falhas_finais': pendentes - classificados,
+        'taxa_sucesso': round(classificados / pendentes, 4),
+    }
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Teste de carga da classificação contra o servidor mock.")
+    parser.add_argument('--pendentes', type=int, default=200)
+    parser.add_argument('--simultaneas', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--lote', choices=['nao', 'sim', 'ambos'], default='nao', help="modo em lote (IA_MODO_LOTE)")
+    parser.add_argument('--duas-etapas', choices=['nao', 'sim', 'ambos'], default='sim', help="prompt compacto + geração (IA_DUAS_ETAPAS)")
+    parser.add_argument('--rps', type=float, default=1000, help="limite do token bucket (req/s)")
+    parser.add_argument('--latencia', choices=['fixa', 'uniforme', 'lognormal'], default='lognormal')
+    parser.add_argument('--latencia-ms', type=float, default=200)
+    parser.add_argument('--desvio-ms', type=float, default=100)
+    parser.add_argument('--taxa-429', type=float, default=0.05)
+    parser.add_argument('--taxa-5xx', type=float, default=0.02)
+    parser.add_argument('--taxa-json-invalido', type=float, default=0.01)
+    parser.add_argument('--retry-after', type=float, default=0.2)
+    parser.add_argument('--ms-por-token-saida', type=float, default=0, help="latência extra do mock por token de saída")
+    parser.add_argument('--espera-base', type=float, default=0.1, help="base do backoff exponencial (IA_ESPERA_BASE_SEGUNDOS)")
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--saida', type=Path, help="grava os resultados em JSON")
+    args = parser.parse_args()
+
+    servidor = ServidorMock(0, args.latencia, args.latencia_ms, args.desvio_ms, args.taxa_429, args.taxa_5xx,
+                            args.taxa_json_invalido, args.retry_after, args.semente, args.ms_por_token_saida).iniciar_em_segundo_plano()
+    config.API_URL = servidor.url
+    config.IA_USAR_CACHE = False # cada rodada precisa chamar o servidor de verdade
+    config.IA_ESPERA_BASE_SEGUNDOS = args.espera_base
+    classificador_ia.OPENROUTER_API_KEY = classificador_ia.OPENROUTER_API_KEY or 'mock'
+    opcoes = {'nao': [False], 'sim': [True], 'ambos': [False, True]}
+    modos = [(modo_lote, duas_etapas) for duas_etapas in opcoes[args.duas_etapas] for modo_lote in opcoes[args.lote]]
+
+    pasta = Path(tempfile.mkdtemp(prefix='carga_classificador_'))
+    resultados = []
+    try:
+        print(f"🧪 {args.pendentes} feedbacks por rodada | servidor {servidor.url} | latência {args.latencia} "
+              f"{args.latencia_ms:.0f}±{args.desvio_ms:.0f} ms | 429 {args.taxa_429:.0%} | 5xx {args.taxa_5xx:.0%} | JSON inválido {args.taxa_json_invalido:.0%}")
+        print(f"{'simult.':>7} {'lote':>5} {'etapas':>6} {'seg':>7} {'fb/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'tok/fb':>7} {'saída':>6} {'injet.':>7} {'falhas':>7} {'sucesso':>8}")
+        for modo_lote, duas_etapas in modos:
+            for simultaneas in args.simultaneas:
+                r = executar_cenario(servidor, pasta, args.pendentes, simultaneas, modo_lote, args.rps, args.semente, duas_etapas)
+                resultados.append(r)
+                print(f"{r['simultaneas']:>7} {'sim' if r['lote'] else 'não':>5} {2 if r['duas_etapas'] else 1:>6} {r['segundos']:>7} {r['feedbacks_por_segundo']:>7} "
+                      f"{r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8} {r['tokens_por_feedback']:>7} {r['tokens_saida_por_feedback']:>6} {r['falhas_injetadas']:>7} {r['falhas_finais']:>7} {r['taxa_sucesso']:>8.1%}")
+    finally:
+        servidor.parar()
+        shutil.rmtree(pasta, ignore_errors=True)
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            json.dump({'parametros': vars(args) | {'saida': str(args.saida)}, 'resultados': resultados}, arquivo, ensure_ascii=False, indent=2)
+        print(f"\n💾 Resultados salvos em '{args.saida}'.")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,83 @@
+# Orçamento de importação: mede, com `python -X importtime`, quanto cada ponto de entrada leva para
+# ser importado e quais bibliotecas ele carrega. Termina com código 1 se algum passar do orçamento
+# ou carregar uma biblioteca pesada que deveria ficar para a opção do menu/aba que a usa.
+#
+#   python benchmarks/verificar_tempo_importacao.py
+#   python benchmarks/verificar_tempo_importacao.py --repeticoes 5 --folga 2   (máquinas mais lentas)
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+PESADAS = ['matplotlib', 'seaborn', 'sklearn', 'scipy', 'faker', 'requests', 'dotenv', 'streamlit']
+# módulo -> (orçamento da importação em ms, bibliotecas que ele não pode carregar)
+ORCAMENTOS = {
+    'main': (100, PESADAS + ['pandas', 'numpy', 'pyarrow']),
+    'scripts.analise': (1500, PESADAS),
+    'scripts.dados_incrementais': (1500, PESADAS),
+    'scripts.classificador_ia': (2000, ['matplotlib', 'seaborn', 'sklearn', 'scipy', 'faker', 'streamlit']),
+}
+ORCAMENTO_MENU_MS = 500 # do `python main.py` até o menu na tela (inclui a subida do interpretador)
+_LINHA = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)')
+
+def medir_importacao(modulo: str) -> tuple[float, set]:
+    """Tempo acumulado (ms) da importação de `modulo` e os pacotes de primeiro nível que ela carregou."""
+    saida = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {modulo}'],
+                           cwd=RAIZ, capture_output=True, text=True, check=True).stderr
+    cumulativo, pacotes = 0.0, set()
+    for _, cumulativo_us, recuo, nome in _LINHA.findall(saida):
+        pacotes.add(nome.split('.')[0])
+        if nome == modulo and not recuo:
+            cumulativo = int(cumulativo_us) / 1000
+    return cumulativo, pacotes
+
+def medir_menu() -> float:
+    """Tempo (ms) até o menu do main.py aparecer: roda o script e escolhe 'Sair' na hora."""
+    inicio = time.perf_counter()
+    subprocess.run([sys.executable, 'main.py'], cwd=RAIZ, input='7\n', capture_output=True, text=True,
+                   env=dict(os.environ, TERM='dumb'), check=True)
+    return (time.perf_counter() - inicio) * 1000
+
+def verificar(repeticoes: int = 3, folga: float = 1.0) -> list:
+    """Lista as violações (vale o menor tempo entre as repetições; a folga multiplica os orçamentos)."""
+    violacoes = []
+    for modulo, (orcamento, proibidas) in ORCAMENTOS.items():
+        medicoes = [medir_importacao(modulo) for _ in range(repeticoes)]
+        tempo, pacotes = min(medicao[0] for medicao in medicoes), medicoes[0][1]
+        carregadas = sorted(set(proibidas) & pacotes)
+        print(f"   ⏱️  import {modulo}: {tempo:,.0f} ms (orçamento {orcamento * folga:,.0f} ms)"
+              + (f"; carregou {', '.join(carregadas)}" if carregadas else ""))
+        if tempo > orcamento * folga:
+            violacoes.append(f"import {modulo} levou {tempo:,.0f} ms (orçamento {orcamento * folga:,.0f} ms)")
+        if carregadas:
+            violacoes.append(f"import {modulo} carregou {', '.join(carregadas)}")
+
+    tempo_menu = min(medir_menu() for _ in range(repeticoes))
+    print(f"   ⏱️  menu do main.py: {tempo_menu:,.0f} ms (orçamento {ORCAMENTO_MENU_MS * folga:,.0f} ms)")
+    if tempo_menu > ORCAMENTO_MENU_MS * folga:
+        violacoes.append(f"o menu do main.py levou {tempo_menu:,.0f} ms para abrir (orçamento {ORCAMENTO_MENU_MS * folga:,.0f} ms)")
+    return violacoes
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Confere o tempo de importação dos pontos de entrada.")
+    parser.add_argument('--repeticoes', type=int, default=3, help="medições por módulo (vale a mais rápida)")
+    parser.add_argument('--folga', type=float, default=1.0, help="multiplica todos os orçamentos de tempo")
+    args = parser.parse_args()
+
+    print("📦 Medindo o tempo de importação...")
+    violacoes = verificar(args.repeticoes, args.folga)
+    if not violacoes:
+        print("✅ Todas as importações dentro do orçamento.")
+        return 0
+    print(f"❌ {len(violacoes)} violações do orçamento de importação:")
+    for violacao in violacoes:
+        print(f"   - {violacao}")
+    return 1
+
+if __name__ == '__main__':
+    sys.exit(main())
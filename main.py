@@ -1,9 +1,10 @@
 import os
+import sys
 import time
+import argparse
 import subprocess # Streamlit de forma independente
-from scripts.gerarFeedback import adicionar_novos_feedbacks
-from scripts.classificador_ia import classificar_feedbacks_pendentes
-from scripts.analise import executar_analise_completa 
+# os módulos de scripts/ (pandas, matplotlib, scikit-learn, Faker, requests) são importados só na
+# opção que os usa, para o menu abrir na hora; benchmarks/verificar_tempo_importacao.py confere isso
 
 def limpar_tela():
     os.system('cls' if os.name == 'nt' else 'clear')
@@ -22,8 +23,11 @@ def exibir_menu():
     print("\n--- FLUXOS AUTOMATIZADOS ---")
     print("  5. 🚀 Pipeline Completo (Classificar + Gerar Relatório)")
     
+    print("\n--- MONITORAMENTO ---")
+    print("  6. 📡 Relatório de Telemetria da IA (latência, tokens e custo)")
+
     print("\n-----------------------------------------------------")
-    print("  6. 🚪 Sair")
+    print("  7. 🚪 Sair")
     print("=====================================================")
     return input("   Escolha uma opção: ")
 
@@ -40,6 +44,7 @@ def main():
                     print("\n❌ Erro: Por favor, insira um número não negativo.")
                 else:
                     print("\n⏳ Iniciando a geração...")
+                    from scripts.gerarFeedback import adicionar_novos_feedbacks
                     adicionar_novos_feedbacks(num_hotel=num_hotel, num_construcao=num_construcao)
                     print("\n✅ Geração concluída!")
             except ValueError:
@@ -48,13 +53,15 @@ def main():
         elif escolha == '2':
             print("\n--- [Opção 2] Classificação com IA ---")
             print("⏳ Iniciando a classificação...")
+            from scripts.classificador_ia import classificar_feedbacks_pendentes
             classificar_feedbacks_pendentes()
             print("\n✅ Classificação concluída!")
             
         elif escolha == '3':
             print("\n--- [Opção 3] Geração de Relatório Estático ---")
             print("⏳ Gerando relatório completo com gráficos e previsões...")
-            executar_analise_completa() 
+            from scripts.analise import executar_analise_completa
+            executar_analise_completa()
             print("\n✅ Relatório estático gerado!")
             
         elif escolha == '4':
@@ -72,14 +79,17 @@ def main():
             
         elif escolha == '5':
             print("\n--- [Opção 5] Executando Pipeline Completo ---")
-            print("\nPasso 1/2: Classificando feedbacks pendentes...")
-            classificar_feedbacks_pendentes()
-            print("✅ Classificação concluída!")
-            print("\nPasso 2/2: Gerando relatório estático...")
-            executar_analise_completa()
+            print("⏳ Classificando e atualizando o relatório a cada leva classificada...")
+            from scripts.pipeline import executar_pipeline
+            executar_pipeline()
             print("\n🚀 Pipeline completo! Agora você pode iniciar o dashboard (opção 4) para ver os resultados.")
 
         elif escolha == '6':
+            print("\n--- [Opção 6] Telemetria das Chamadas à IA ---")
+            from scripts.telemetria_ia import imprimir_relatorio as imprimir_relatorio_telemetria
+            imprimir_relatorio_telemetria()
+
+        elif escolha == '7':
             print("\nSaindo do programa... Até mais! 👋")
             break
             
@@ -90,5 +100,115 @@ def main():
 
         input("\n[Pressione Enter para voltar ao menu]")
 
+# --- USO SEM MENU (cron, CI, containers) ---
+# `python main.py <comando>` executa uma etapa e termina com um código de saída:
+SAIDA_OK = 0
+SAIDA_ERRO = 1 # dados não encontrados ou falha ao gravar
+SAIDA_USO = 2 # argumentos inválidos (código padrão do argparse)
+SAIDA_PARCIAL = 3 # terminou, mas ficaram feedbacks sem classificação ou com falha
+
+def _codigo_de_saida(resumo: dict | None) -> int:
+    """Código de saída a partir do resumo de classificar_feedbacks_pendentes."""
+    if resumo is None:
+        return SAIDA_ERRO
+    if resumo['falhas'] or resumo['classificados'] < resumo['pendentes']:
+        return SAIDA_PARCIAL
+    return SAIDA_OK
+
+def _nao_negativo(valor: str) -> int:
+    numero = int(valor)
+    if numero < 0:
+        raise argparse.ArgumentTypeError("use um número não negativo")
+    return numero
+
+def _inteiro_positivo(valor: str) -> int:
+    numero = int(valor)
+    if numero <= 0:
+        raise argparse.ArgumentTypeError("use um número maior que zero")
+    return numero
+
+def _positivo(valor: str) -> float:
+    numero = float(valor)
+    if numero <= 0:
+        raise argparse.ArgumentTypeError("use um número maior que zero")
+    return numero
+
+def _segundos(valor: str) -> float:
+    numero = float(valor)
+    if numero < 0:
+        raise argparse.ArgumentTypeError("use um número não negativo")
+    return numero
+
+def criar_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Análise de feedbacks. Sem comando, abre o menu interativo.",
+        epilog="códigos de saída: 0 ok; 1 erro (dados não encontrados ou falha ao gravar); "
+               "2 uso incorreto; 3 concluído com feedbacks sem classificação ou com falha",
+    )
+    comandos = parser.add_subparsers(dest='comando', metavar='comando')
+
+    gerar = comandos.add_parser('gerar', aliases=['generate'], help="gera e adiciona novos feedbacks")
+    gerar.add_argument('--hotelaria', type=_nao_negativo, default=0, help="feedbacks de hotelaria (padrão: 0)")
+    gerar.add_argument('--construcao', type=_nao_negativo, default=0, help="feedbacks de material de construção (padrão: 0)")
+    gerar.add_argument('--semente', type=int, help="semente do gerador, para textos reproduzíveis (os IDs são sempre novos)")
+
+    classificar = comandos.add_parser('classificar', aliases=['classify'], help="classifica os feedbacks pendentes com IA")
+    relatorio = comandos.add_parser('relatorio', aliases=['report'], help="gera o relatório estático (.png)")
+    relatorio.add_argument('--forcar', action='store_true', help="redesenha todos os gráficos, mesmo os que não mudaram")
+    pipeline = comandos.add_parser('pipeline', help="classifica e atualiza o relatório a cada leva classificada")
+    trabalhador = comandos.add_parser('trabalhador', aliases=['worker'],
+                                      help="classifica pela fila de trabalho (vários podem rodar em paralelo)")
+    trabalhador.add_argument('--reserva', type=_inteiro_positivo, help="feedbacks reservados de cada vez")
+    for subparser in (classificar, pipeline, trabalhador):
+        subparser.add_argument('--simultaneas', type=_inteiro_positivo, help="requisições simultâneas à IA")
+        subparser.add_argument('--requisicoes-por-segundo', type=_positivo, help="limite de requisições por segundo")
+    pipeline.add_argument('--intervalo-relatorio', type=_segundos,
+                          help="segundos mínimos entre duas atualizações do relatório durante a classificação (0: a cada leva)")
+    comandos.add_parser('telemetria', help="relatório de telemetria das chamadas à IA")
+    # os apelidos em inglês caem no mesmo comando
+    gerar.set_defaults(comando='gerar')
+    classificar.set_defaults(comando='classificar')
+    relatorio.set_defaults(comando='relatorio')
+    trabalhador.set_defaults(comando='trabalhador')
+    return parser
+
+def executar_comando(argv: list) -> int:
+    """Executa um subcomando sem interação e retorna o código de saída."""
+    args = criar_parser().parse_args(argv)
+
+    if args.comando == 'gerar':
+        from scripts.gerarFeedback import adicionar_novos_feedbacks
+        gravados = adicionar_novos_feedbacks(num_hotel=args.hotelaria, num_construcao=args.construcao, semente=args.semente)
+        return SAIDA_ERRO if gravados is None else SAIDA_OK
+
+    if args.comando == 'classificar':
+        from scripts.classificador_ia import classificar_feedbacks_pendentes
+        return _codigo_de_saida(classificar_feedbacks_pendentes(max_simultaneas=args.simultaneas,
+                                                                requisicoes_por_segundo=args.requisicoes_por_segundo))
+
+    if args.comando == 'relatorio':
+        from scripts.analise import executar_analise_completa
+        return SAIDA_OK if executar_analise_completa(forcar=args.forcar) else SAIDA_ERRO
+
+    if args.comando == 'pipeline':
+        from scripts.pipeline import executar_pipeline
+        resumo, relatorio_gerado = executar_pipeline(args.intervalo_relatorio, max_simultaneas=args.simultaneas,
+                                                     requisicoes_por_segundo=args.requisicoes_por_segundo)
+        return _codigo_de_saida(resumo) if relatorio_gerado else SAIDA_ERRO
+
+    if args.comando == 'trabalhador':
+        from scripts.fila_classificacao import executar_trabalhador
+        return _codigo_de_saida(executar_trabalhador(args.reserva, args.simultaneas, args.requisicoes_por_segundo))
+
+    if args.comando == 'telemetria':
+        from scripts.telemetria_ia import imprimir_relatorio as imprimir_relatorio_telemetria
+        imprimir_relatorio_telemetria()
+        return SAIDA_OK
+
+    criar_parser().print_help()
+    return SAIDA_USO
+
 if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        sys.exit(executar_comando(sys.argv[1:]))
     main()
\ No newline at end of file
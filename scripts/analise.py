@@ -1,40 +1,125 @@
+from __future__ import annotations
+import colorsys
+import functools
+import hashlib
+import importlib.metadata
+import json
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-import matplotlib.ticker as mtick
-import seaborn as sns
 import os
 from . import config 
+from . import armazenamento
+from . import cubo
+from . import instrumentacao
 
 # Type Hinting para clareza
-from typing import Optional, Tuple
+from typing import Optional, Tuple, TYPE_CHECKING
+if TYPE_CHECKING:
+    import matplotlib.pyplot as plt
 
-# bibliotecas de IA
-from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
-from sklearn.model_selection import train_test_split
-from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import classification_report
+# matplotlib e scikit-learn custam quase um segundo de importação: entram só na primeira
+# função que desenha um gráfico ou treina um modelo (as bibliotecas de IA, dentro das próprias funções)
+@functools.cache
+def _pyplot():
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+# Os gráficos desenham direto com as primitivas do matplotlib (barras, linhas, malha de células) sobre
+# tabelas já agregadas: o custo depende do número de categorias, não do número de feedbacks.
+def _dessaturar(cor) -> tuple:
+    """Cor das barras com a saturação reduzida (config.SATURACAO_BARRAS), no tom que os gráficos já tinham."""
+    from matplotlib.colors import to_rgb
+    matiz, luminosidade, saturacao = colorsys.rgb_to_hls(*to_rgb(cor))
+    return colorsys.hls_to_rgb(matiz, luminosidade, saturacao * config.SATURACAO_BARRAS)
+
+def _cores(paleta: str, quantidade: int) -> list:
+    """`quantidade` cores espaçadas no colormap (sem os dois extremos), dessaturadas para barras."""
+    mapa = _pyplot().get_cmap(paleta)
+    return [_dessaturar(mapa(posicao)) for posicao in np.linspace(0, 1, quantidade + 2)[1:-1]]
+
+def _ordem(valores: pd.Series) -> list:
+    """Categorias na ordem do tipo categórico, ou na ordem de aparição."""
+    if isinstance(valores.dtype, pd.CategoricalDtype):
+        return list(valores.cat.remove_unused_categories().cat.categories)
+    return list(pd.unique(valores))
+
+def _barras_horizontais(ax, rotulos: list, valores, cores: list):
+    """Uma barra por rótulo, o primeiro no topo."""
+    posicoes = np.arange(len(rotulos))
+    ax.barh(posicoes, valores, height=.8, color=cores)
+    ax.set_yticks(posicoes, [str(rotulo) for rotulo in rotulos])
+    ax.set_ylim(len(rotulos) - .5, -.5)
+
+def _rotulos_espacados(ax, eixo: str, rotulos):
+    """Rótulos no centro das células; com muitos, só um a cada tantos (no máximo config.MAPA_CALOR_MAX_ROTULOS)."""
+    passo = max(1, -(-len(rotulos) // config.MAPA_CALOR_MAX_ROTULOS))
+    posicoes = np.arange(0, len(rotulos), passo)
+    texto = [str(rotulos[posicao]) for posicao in posicoes]
+    if eixo == 'x':
+        ax.set_xticks(posicoes + .5, texto)
+    else:
+        ax.set_yticks(posicoes + .5, texto, va='center')
+
+def _desenhar_mapa_de_calor(ax, tabela: pd.DataFrame, cmap: str, formato: str, anotar: bool, espessura_linhas: float):
+    """Mapa de calor da tabela (uma célula por valor, primeira linha no topo) com a barra de cores."""
+    valores = np.ma.masked_invalid(tabela.to_numpy(dtype=float))
+    malha = ax.pcolormesh(valores, cmap=cmap, edgecolors='white', linewidth=espessura_linhas)
+    ax.set(xlim=(0, tabela.shape[1]), ylim=(tabela.shape[0], 0))
+    for lado in ax.spines.values():
+        lado.set_visible(False)
+    ax.figure.colorbar(malha, ax=ax).outline.set_linewidth(0)
+    _rotulos_espacados(ax, 'x', tabela.columns)
+    _rotulos_espacados(ax, 'y', tabela.index)
+    ax.set(xlabel=tabela.columns.name or '', ylabel=tabela.index.name or '')
+    if not anotar:
+        return
+
+    # texto escuro nas células claras e branco nas escuras (luminância relativa das cores de fundo)
+    malha.update_scalarmappable()
+    rgb = malha.get_facecolors()[:, :3]
+    luminancia = np.where(rgb <= .03928, rgb / 12.92, ((rgb + .055) / 1.055) ** 2.4) @ [.2126, .7152, .0722]
+    for (linha, coluna), valor, clara in zip(np.ndindex(tabela.shape), tabela.to_numpy().flat, luminancia > .408):
+        if not pd.isna(valor):
+            ax.text(coluna + .5, linha + .5, format(valor, formato), ha='center', va='center', color='.15' if clara else 'w')
 
 # LÓGICA DE DADOS
-def carregar_dados() -> Optional[pd.DataFrame]:
-    """Carrega e prepara os dados do CSV."""
-    try:
-        df = pd.read_csv(config.NOME_ARQUIVO_CSV, sep=';', encoding='utf-8')
-        df[config.COLS.DATA] = pd.to_datetime(df[config.COLS.DATA], errors='coerce')
-        df[config.COLS.RATING] = pd.to_numeric(df[config.COLS.RATING], errors='coerce')
-        
-        # Garante que todas as colunas necessárias existam
-        colunas_necessarias = [getattr(config.COLS, attr) for attr in dir(config.COLS) if not attr.startswith('__')]
-        for col in colunas_necessarias:
-            if col not in df.columns:
-                df[col] = None
-                
-        return df.dropna(subset=[config.COLS.DATA, config.COLS.RATING])
-    except FileNotFoundError:
+@instrumentacao.instrumentar()
+def carregar_dados(colunas: Optional[list] = None, setor: Optional[str] = None, local: Optional[str] = None) -> Optional[pd.DataFrame]:
+    """Carrega e prepara os dados (com filtros opcionais aplicados no armazenamento)."""
+    if colunas is not None:
+        colunas = list(dict.fromkeys(list(colunas) + [config.COLS.DATA, config.COLS.RATING]))
+    df = armazenamento.carregar_feedbacks(colunas=colunas, setor=setor, local=local)
+    if df is None:
         return None
+    return preparar_dados(df, colunas)
+
+def preparar_dados(df: pd.DataFrame, colunas: Optional[list] = None) -> pd.DataFrame:
+    """Converte Data e Rating, cria as colunas que faltam e descarta linhas sem data ou rating."""
+    df[config.COLS.DATA] = pd.to_datetime(df[config.COLS.DATA], errors='coerce')
+    df[config.COLS.RATING] = pd.to_numeric(df[config.COLS.RATING], errors='coerce')
+
+    # Garante que todas as colunas necessárias (ou as pedidas) existam
+    colunas_necessarias = colunas or [getattr(config.COLS, attr) for attr in dir(config.COLS) if not attr.startswith('__')]
+    for col in colunas_necessarias:
+        if col not in df.columns:
+            df[col] = None
+
+    return df.dropna(subset=[config.COLS.DATA, config.COLS.RATING])
+
+def _remover_categorias_vazias(df: pd.DataFrame) -> pd.DataFrame:
+    """Depois de um filtro, descarta categorias sem linhas (colunas category do backend Parquet)."""
+    categoricas = df.select_dtypes('category').columns
+    if len(categoricas) == 0:
+        return df
+    return df.assign(**{col: df[col].cat.remove_unused_categories() for col in categoricas})
 
 # FUNÇÕES DE ANÁLISE (TEXTUAL)
+@instrumentacao.instrumentar()
 def analisar_kpis_gerais(df):
     avg_rating = df['Rating'].mean()
     sentiment_distribution = df['Sentimento'].value_counts(normalize=True).mul(100)
@@ -42,15 +127,17 @@ def analisar_kpis_gerais(df):
     print(f"📊 Índice de Satisfação Médio (Rating): {avg_rating:.2f} de 5")
     print("📊 Distribuição de Sentimento:"); print(sentiment_distribution.round(2).to_string())
 
+@instrumentacao.instrumentar()
 def analisar_pontos_fortes(df: pd.DataFrame) -> Optional[pd.DataFrame]:
     """Retorna um DataFrame com as subcategorias mais elogiadas."""
-    df_positivo = df[(df[config.COLS.SENTIMENTO] == config.SENTIMENTS.POS) & (df[config.COLS.SUBCATEGORIA].notna())].copy()
+    df_positivo = _remover_categorias_vazias(df[(df[config.COLS.SENTIMENTO] == config.SENTIMENTS.POS) & (df[config.COLS.SUBCATEGORIA].notna())])
     if df_positivo.empty: return None
     
     pontos_fortes = df_positivo[config.COLS.SUBCATEGORIA].value_counts().head(10).reset_index()
     pontos_fortes.columns = ['Subcategoria', 'Quantidade de Elogios']
     return pontos_fortes
 
+@instrumentacao.instrumentar()
 def criar_quadro_honra(df: pd.DataFrame) -> Optional[pd.DataFrame]:
     """Retorna um DataFrame com o ranking de funcionários elogiados."""
     df_funcionarios = df[(df[config.COLS.SENTIMENTO] == config.SENTIMENTS.POS) & (df[config.COLS.FUNCIONARIO].notna()) & (df[config.COLS.FUNCIONARIO] != 'Não')].copy()
@@ -64,11 +151,12 @@ def criar_quadro_honra(df: pd.DataFrame) -> Optional[pd.DataFrame]:
     return quadro_honra
 
 # FUNÇÕES DE PLOTAGEM (GRÁFICOS)
-def plotar_tendencia_rating_mensal(df: pd.DataFrame) -> Optional[plt.Figure]:
-    """Gera um gráfico da tendência mensal do rating."""
-    df_temporal = df.set_index(config.COLS.DATA).copy()
-    rating_mensal = df_temporal[config.COLS.RATING].resample('ME').mean()
-    
+# As funções plotar_* aceitam o DataFrame de feedbacks ou o cubo de agregados (cubo.py);
+# as funções desenhar_* recebem a tabela já agregada.
+@instrumentacao.instrumentar()
+def desenhar_tendencia_rating_mensal(rating_mensal: pd.Series) -> Optional[plt.Figure]:
+    """Desenha a tendência mensal a partir do rating médio por mês."""
+    plt = _pyplot()
     fig, ax = plt.subplots(figsize=config.FIGSIZE_PADRAO)
     ax.plot(rating_mensal.index, rating_mensal, marker='o', linestyle='-')
     ax.set_title('Tendência de Satisfação (Rating Médio Mensal)')
@@ -78,22 +166,28 @@ def plotar_tendencia_rating_mensal(df: pd.DataFrame) -> Optional[plt.Figure]:
     fig.tight_layout()
     return fig
 
-def plotar_grafico_pareto(df: pd.DataFrame) -> Optional[plt.Figure]:
-    """Gera um gráfico de Pareto para as causas de reclamações."""
-    df_negativo = df[(df[config.COLS.SENTIMENTO] == config.SENTIMENTS.NEG) & (df[config.COLS.SUBCATEGORIA].notna())]
-    if df_negativo.empty: return None
+@instrumentacao.instrumentar()
+def plotar_tendencia_rating_mensal(df: pd.DataFrame) -> Optional[plt.Figure]:
+    """Gera um gráfico da tendência mensal do rating."""
+    return desenhar_tendencia_rating_mensal(cubo.agregar_rating_mensal(df))
 
-    contagem = df_negativo[config.COLS.SUBCATEGORIA].value_counts().reset_index()
-    contagem.columns = ['Subcategoria', 'Contagem']
-    contagem['Percentual_Acumulado'] = (contagem['Contagem'].cumsum() / contagem['Contagem'].sum()) * 100
-    
+@instrumentacao.instrumentar()
+def desenhar_grafico_pareto(contagem: pd.DataFrame) -> Optional[plt.Figure]:
+    """Desenha o Pareto a partir da contagem por subcategoria (com percentual acumulado)."""
+    plt = _pyplot()
+    from matplotlib import ticker as mtick
+    if contagem.empty: return None
+
+    posicoes = np.arange(len(contagem))
     fig, ax1 = plt.subplots(figsize=config.FIGSIZE_GRANDE)
-    sns.barplot(data=contagem, x='Subcategoria', y='Contagem', color='cornflowerblue', ax=ax1)
+    ax1.bar(posicoes, contagem['Contagem'], width=.8, color=_dessaturar('cornflowerblue'))
+    ax1.set_xticks(posicoes, contagem['Subcategoria'].astype(str))
+    ax1.set_xlim(-.5, len(contagem) - .5)
     ax1.set_xlabel('Causa do Problema'); ax1.set_ylabel('Ocorrências', color='cornflowerblue')
     ax1.tick_params(axis='x', rotation=45)
 
     ax2 = ax1.twinx()
-    sns.lineplot(data=contagem, x='Subcategoria', y='Percentual_Acumulado', color='crimson', marker='o', sort=False, ax=ax2)
+    ax2.plot(posicoes, contagem['Percentual_Acumulado'], color='crimson', marker='o', markeredgecolor='w', markeredgewidth=.75)
     ax2.set_ylabel('Percentual Acumulado (%)', color='crimson')
     ax2.yaxis.set_major_formatter(mtick.PercentFormatter(xmax=100.0))
     ax2.set_ylim(0, 110)
@@ -102,23 +196,22 @@ def plotar_grafico_pareto(df: pd.DataFrame) -> Optional[plt.Figure]:
     fig.tight_layout()
     return fig
 
-def plotar_mapa_calor_problemas_loja(df: pd.DataFrame) -> Optional[plt.Figure]:
-    """
-    Gera um mapa de calor mostrando a relação entre unidades e subcategorias de problemas.
-    """
-    df_negativo = df[
-        (df[config.COLS.SENTIMENTO] == config.SENTIMENTS.NEG) &
-        (df[config.COLS.SUBCATEGORIA].notna()) &
-        (df[config.COLS.LOCAL].notna())
-    ].copy()
+@instrumentacao.instrumentar()
+def plotar_grafico_pareto(df: pd.DataFrame) -> Optional[plt.Figure]:
+    """Gera um gráfico de Pareto para as causas de reclamações."""
+    return desenhar_grafico_pareto(cubo.agregar_reclamacoes_por_subcategoria(df))
 
-    if df_negativo.empty or len(df_negativo[config.COLS.LOCAL].unique()) < 2:
+@instrumentacao.instrumentar()
+def desenhar_mapa_calor_problemas_loja(crosstab: pd.DataFrame) -> Optional[plt.Figure]:
+    """Desenha o mapa de calor a partir da tabela Loja × Subcategoria (números nas células só se couberem)."""
+    plt = _pyplot()
+    if crosstab.empty or len(crosstab.index) < 2:
         return None
-    
-    crosstab = pd.crosstab(df_negativo[config.COLS.LOCAL], df_negativo[config.COLS.SUBCATEGORIA])
-    
+
+    # com muitas células, os números ficariam ilegíveis e o desenho lento: a cor basta
+    anotar = crosstab.size <= config.MAPA_CALOR_MAX_CELULAS_ANOTADAS
     fig, ax = plt.subplots(figsize=config.FIGSIZE_GRANDE)
-    sns.heatmap(crosstab, annot=True, fmt='d', cmap='Reds', linewidths=.5, ax=ax)
+    _desenhar_mapa_de_calor(ax, crosstab, 'Reds', 'd', anotar, .5 if anotar else 0)
     ax.set_title('Mapa de Calor: Ocorrências de Problemas por Unidade', fontsize=16)
     ax.set_xlabel('Subcategoria do Problema')
     ax.set_ylabel('Unidade')
@@ -126,21 +219,22 @@ def plotar_mapa_calor_problemas_loja(df: pd.DataFrame) -> Optional[plt.Figure]:
     fig.tight_layout()
     return fig
 
-def plotar_rating_por_dia_semana(df: pd.DataFrame) -> Optional[plt.Figure]:
+@instrumentacao.instrumentar()
+def plotar_mapa_calor_problemas_loja(df: pd.DataFrame, so_maiores: bool | None = None) -> Optional[plt.Figure]:
     """
-    Gera um gráfico de linha da média de satisfação por dia da semana.
+    Gera um mapa de calor mostrando a relação entre unidades e subcategorias de problemas.
+    `so_maiores` liga ou desliga o corte nas maiores lojas/subcategorias (None: config.MAPA_CALOR_SO_MAIORES).
     """
-    if df.empty or config.COLS.DATA not in df.columns:
-        return None
-        
-    df_copy = df.copy()
-    df_copy['Dia_Semana'] = df_copy[config.COLS.DATA].dt.day_name()
-    
-    rating_por_dia = df_copy.groupby('Dia_Semana')[config.COLS.RATING].mean().reindex(config.DIAS_SEMANA_ORDEM)
-    rating_por_dia.index = rating_por_dia.index.map(config.DIAS_SEMANA_PT)
-    
+    so_maiores = config.MAPA_CALOR_SO_MAIORES if so_maiores is None else so_maiores
+    limites = (config.MAPA_CALOR_MAX_LOJAS, config.MAPA_CALOR_MAX_SUBCATEGORIAS) if so_maiores else (None, None)
+    return desenhar_mapa_calor_problemas_loja(cubo.agregar_problemas_por_loja(df, *limites))
+
+@instrumentacao.instrumentar()
+def desenhar_rating_por_dia_semana(rating_por_dia: pd.Series) -> Optional[plt.Figure]:
+    """Desenha a média de satisfação por dia da semana (índice já em português e ordenado)."""
+    plt = _pyplot()
     fig, ax = plt.subplots(figsize=config.FIGSIZE_PADRAO)
-    rating_por_dia.plot(kind='line', marker='o', linestyle='--', color='indigo', ax=ax)
+    ax.plot(rating_por_dia.index.astype(str), rating_por_dia.to_numpy(), marker='o', linestyle='--', color='indigo')
     ax.set_title('Média de Satisfação por Dia da Semana', fontsize=16)
     ax.set_xlabel('Dia da Semana')
     ax.set_ylabel('Rating Médio (1-5)')
@@ -149,74 +243,110 @@ def plotar_rating_por_dia_semana(df: pd.DataFrame) -> Optional[plt.Figure]:
     fig.tight_layout()
     return fig
 
-def plotar_problemas_por_canal(df: pd.DataFrame) -> Optional[plt.Figure]:
+@instrumentacao.instrumentar()
+def plotar_rating_por_dia_semana(df: pd.DataFrame) -> Optional[plt.Figure]:
     """
-    Gera gráficos de barras dos problemas por categoria para cada canal.
+    Gera um gráfico de linha da média de satisfação por dia da semana.
     """
-
-    df_negativo = df[
-        (df[config.COLS.SENTIMENTO] == config.SENTIMENTS.NEG) &
-        (df[config.COLS.CATEGORIA].notna())
-    ].copy()
-
-    if df_negativo.empty or config.COLS.CANAL not in df_negativo.columns:
+    if df.empty or (config.COLS.DATA not in df.columns and cubo.DIA not in df.columns):
         return None
-        
-    g = sns.catplot(
-        data=df_negativo, 
-        y=config.COLS.CATEGORIA, 
-        col=config.COLS.CANAL, 
-        col_wrap=3,
-        kind='count', 
-        palette=config.PALETA_PROBLEMAS_CANAL, 
-        sharex=False,
-        height=5,
-        aspect=1.2
-    )
-    g.fig.suptitle('Perfil de Problemas por Canal de Comunicação', y=1.03, fontsize=16)
-    g.set_titles("Canal: {col_name}")
-    g.set_xlabels("Nº de Reclamações")
-    g.set_ylabels("Categoria do Problema")
-    plt.tight_layout(rect=[0, 0, 1, 0.97])
-    return g.fig
+    return desenhar_rating_por_dia_semana(cubo.agregar_rating_por_dia_semana(df))
 
-def calcular_e_exibir_health_score(df: pd.DataFrame) -> Optional[Tuple[pd.DataFrame, plt.Figure]]:
-    """
-    Calcula e plota o Health Score para cada unidade.
-    """
-    resultados = []
-    pesos = config.PESOS_HEALTH_SCORE
+@instrumentacao.instrumentar()
+def desenhar_problemas_por_canal(contagem: pd.DataFrame) -> Optional[plt.Figure]:
+    """Desenha um painel por canal a partir da contagem Canal × Categoria."""
+    plt = _pyplot()
+    if contagem.empty:
+        return None
 
-    for loja in df[config.COLS.LOCAL].unique():
-        df_loja = df[df[config.COLS.LOCAL] == loja]
-        if len(df_loja) < 3:
-            continue
+    canais = _ordem(contagem[config.COLS.CANAL])
+    categorias = _ordem(contagem[config.COLS.CATEGORIA])
+    cores = _cores(config.PALETA_PROBLEMAS_CANAL, len(categorias)) # a mesma cor para a categoria em todos os painéis
+    qtd = contagem.pivot_table(index=config.COLS.CATEGORIA, columns=config.COLS.CANAL, values=cubo.QTD,
+                               aggfunc='sum', observed=True).reindex(index=categorias, columns=canais)
 
-        rating_norm = (df_loja[config.COLS.RATING].mean() - 1) / 4
-        pct_negativo = (df_loja[config.COLS.SENTIMENTO] == config.SENTIMENTS.NEG).sum() / len(df_loja)
-        pct_urg_alta = (df_loja[config.COLS.URGENCIA] == config.URGENCIA.ALTA).sum() / len(df_loja)
-        
-        score = (pesos['rating'] * rating_norm) - (pesos['negativo'] * pct_negativo) - (pesos['urgencia'] * pct_urg_alta)
-        resultados.append({'Loja/Hotel': loja, 'Health_Score': score * 100})
+    # um painel por canal, três por linha, eixo das categorias compartilhado
+    colunas = min(3, len(canais))
+    linhas = -(-len(canais) // colunas)
+    fig = plt.figure(figsize=(6 * colunas, 5 * linhas))
+    primeiro = None
+    for i, canal in enumerate(canais):
+        ax = fig.add_subplot(linhas, colunas, i + 1, sharey=primeiro)
+        primeiro = primeiro or ax
+        _barras_horizontais(ax, categorias, qtd[canal].to_numpy(), cores)
+        ax.set_title(f"Canal: {canal}", fontsize='medium')
+        ax.spines[['top', 'right']].set_visible(False)
+        if i % colunas == 0:
+            ax.set_ylabel("Categoria do Problema")
+        else:
+            ax.tick_params(labelleft=False)
+        if i + colunas >= len(canais): # nenhum painel abaixo
+            ax.set_xlabel("Nº de Reclamações")
+    fig.suptitle('Perfil de Problemas por Canal de Comunicação', y=1.03, fontsize=16)
+    fig.tight_layout(rect=[0, 0, 1, 0.97])
+    return fig
 
-    if not resultados:
-        return None, None
+@instrumentacao.instrumentar()
+def plotar_problemas_por_canal(df: pd.DataFrame) -> Optional[plt.Figure]:
+    """
+    Gera gráficos de barras dos problemas por categoria para cada canal.
+    """
+    if config.COLS.CANAL not in df.columns:
+        return None
+    return desenhar_problemas_por_canal(cubo.agregar_problemas_por_canal(df))
 
-    health_scores = pd.DataFrame(resultados).sort_values(by='Health_Score', ascending=False).round(2)
-    
+@instrumentacao.instrumentar()
+def desenhar_health_score(health_scores: pd.DataFrame) -> plt.Figure:
+    """Desenha o ranking de Health Score."""
+    plt = _pyplot()
     fig, ax = plt.subplots(figsize=config.FIGSIZE_GRANDE)
-    sns.barplot(data=health_scores, x='Health_Score', y='Loja/Hotel', palette=config.PALETA_HEALTH_SCORE, hue='Loja/Hotel', legend=False, ax=ax)
+    lojas = health_scores['Loja/Hotel'].to_numpy()
+    _barras_horizontais(ax, lojas, health_scores['Health_Score'].to_numpy(), _cores(config.PALETA_HEALTH_SCORE, len(lojas)))
     ax.set_title('Ranking de Saúde por Loja/Hotel', fontsize=16)
     ax.set_xlabel('Health Score (quanto maior, melhor)')
     ax.set_ylabel('Loja / Hotel')
     fig.tight_layout()
-    return health_scores, fig
+    return fig
+
+@instrumentacao.instrumentar()
+def calcular_health_score(df: pd.DataFrame) -> Optional[pd.DataFrame]:
+    """Calcula o Health Score de cada unidade com pelo menos 3 feedbacks."""
+    pesos = config.PESOS_HEALTH_SCORE
+
+    # uma única agregação por loja (na ordem de aparição, como o antigo laço sobre unique())
+    por_loja = cubo.agregar_indicadores_por_loja(df)
+    por_loja = por_loja[por_loja['qtd'] >= 3]
+    if por_loja.empty:
+        return None
+
+    rating_norm = (por_loja['soma_rating'] / por_loja['qtd'] - 1) / 4
+    pct_negativo = por_loja['qtd_negativo'] / por_loja['qtd']
+    pct_urg_alta = por_loja['qtd_urgencia_alta'] / por_loja['qtd']
+    score = (pesos['rating'] * rating_norm) - (pesos['negativo'] * pct_negativo) - (pesos['urgencia'] * pct_urg_alta)
+
+    resultados = pd.DataFrame({
+        'Loja/Hotel': por_loja.index.astype(object),
+        'Health_Score': (score * 100).to_numpy()
+    })
+    return resultados.sort_values(by='Health_Score', ascending=False).round(2)
+
+@instrumentacao.instrumentar()
+def calcular_e_exibir_health_score(df: pd.DataFrame) -> Optional[Tuple[pd.DataFrame, plt.Figure]]:
+    """
+    Calcula e plota o Health Score para cada unidade.
+    """
+    health_scores = calcular_health_score(df)
+    if health_scores is None:
+        return None, None
+    return health_scores, desenhar_health_score(health_scores)
 
 # FUNÇÕES DE ANÁLISE DIAGNÓSTICA E PREDITIVA
+@instrumentacao.instrumentar()
 def analisar_principais_termos_negativos(df: pd.DataFrame, n_termos: int = 15) -> Optional[pd.DataFrame]:
     """
     Extrai os termos (n-gramas) mais comuns de feedbacks negativos.
     """
+    from sklearn.feature_extraction.text import CountVectorizer
     textos_negativos = df[df[config.COLS.SENTIMENTO] == config.SENTIMENTS.NEG][config.COLS.TEXTO].dropna()
     if textos_negativos.empty:
         return None
@@ -229,35 +359,51 @@ def analisar_principais_termos_negativos(df: pd.DataFrame, n_termos: int = 15) -
     except Exception:
         return None
 
-def plotar_matriz_correlacao(df: pd.DataFrame) -> Optional[plt.Figure]:
-    """
-    Cria um mapa de calor com as correlações entre as métricas numéricas.
-    """
+@instrumentacao.instrumentar()
+def calcular_matriz_correlacao(df: pd.DataFrame) -> Optional[pd.DataFrame]:
+    """Correlações entre as métricas numéricas (sentimento e urgência convertidos em números)."""
     df_corr = df.copy()
     
     mapa_sentimento = {config.SENTIMENTS.POS: 1, config.SENTIMENTS.NEUTRO: 0, config.SENTIMENTS.NEG: -1}
     mapa_urgencia = {config.URGENCIA.ALTA: 3, config.URGENCIA.MEDIA: 2, config.URGENCIA.BAIXA: 1}
     
-    df_corr['Sentimento_Num'] = df_corr[config.COLS.SENTIMENTO].map(mapa_sentimento)
-    df_corr['Urgencia_Num'] = df_corr[config.COLS.URGENCIA].map(mapa_urgencia)
+    # float: lidas como category (backend parquet), as colunas mapeadas continuariam category e sairiam da seleção abaixo
+    df_corr['Sentimento_Num'] = df_corr[config.COLS.SENTIMENTO].map(mapa_sentimento).astype(float)
+    df_corr['Urgencia_Num'] = df_corr[config.COLS.URGENCIA].map(mapa_urgencia).astype(float)
     
     colunas_numericas = df_corr.select_dtypes(include=['number']).columns
     if len(colunas_numericas) < 2:
         return None
-        
-    correlacoes = df_corr[colunas_numericas].corr()
-    
+    return df_corr[colunas_numericas].corr()
+
+@instrumentacao.instrumentar()
+def desenhar_matriz_correlacao(correlacoes: pd.DataFrame) -> plt.Figure:
+    """Desenha o mapa de calor da matriz de correlação."""
+    plt = _pyplot()
     fig, ax = plt.subplots(figsize=config.FIGSIZE_GRANDE)
-    sns.heatmap(correlacoes, annot=True, cmap='coolwarm', fmt=".2f", linewidths=.5, ax=ax)
+    _desenhar_mapa_de_calor(ax, correlacoes, 'coolwarm', '.2f', True, .5)
     ax.set_title('Matriz de Correlação das Métricas', fontsize=16)
     fig.tight_layout()
     return fig
 
+@instrumentacao.instrumentar()
+def plotar_matriz_correlacao(df: pd.DataFrame) -> Optional[plt.Figure]:
+    """
+    Cria um mapa de calor com as correlações entre as métricas numéricas.
+    """
+    correlacoes = calcular_matriz_correlacao(df)
+    return None if correlacoes is None else desenhar_matriz_correlacao(correlacoes)
+
+@instrumentacao.instrumentar()
 def treinar_e_avaliar_modelo_urgencia(df: pd.DataFrame) -> Optional[Tuple[object, object, str]]:
     """
     Treina um modelo para prever a 'Urgencia' com base no texto.
     Retorna o modelo, o vetorizador e o relatório de classificação.
     """
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.model_selection import train_test_split
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.metrics import classification_report
 
     df_modelo = df[[config.COLS.TEXTO, config.COLS.URGENCIA]].dropna()
     
@@ -282,16 +428,102 @@ def treinar_e_avaliar_modelo_urgencia(df: pd.DataFrame) -> Optional[Tuple[object
     return model, tfidf, report
 
 # FUNÇÃO PRINCIPAL PARA RELATÓRIO ESTÁTICO
-def executar_analise_completa():
-    """Orquestra a geração completa do relatório de análise estática."""
+@instrumentacao.instrumentar()
+def executar_analise_completa(forcar: bool = False) -> bool:
+    """Orquestra a geração completa do relatório de análise estática (`forcar` redesenha todos os gráficos)."""
     print("--- INICIANDO GERAÇÃO DE RELATÓRIO ESTÁTICO ---")
-    if not os.path.exists(config.PASTA_GRAFICOS):
-        os.makedirs(config.PASTA_GRAFICOS)
-    
-    df = carregar_dados()
+    df = carregar_dados(colunas=config.COLUNAS_RELATORIO_ESTATICO)
     if df is None:
         print("\nAnálise interrompida: dados não carregados.")
-        return
+        return False
+    gerar_relatorio_estatico(df, forcar=forcar)
+    return True
+
+# gráficos do relatório estático: arquivo -> (agregação, desenho, se a agregação aceita o cubo)
+GRAFICOS_RELATORIO = {
+    '01_tendencia_mensal.png': (cubo.agregar_rating_mensal, desenhar_tendencia_rating_mensal, True),
+    '02_pareto_reclamacoes.png': (cubo.agregar_reclamacoes_por_subcategoria, desenhar_grafico_pareto, True),
+    '03_mapa_calor_problemas.png': (cubo.agregar_problemas_por_loja, desenhar_mapa_calor_problemas_loja, True),
+    '04_correlacao.png': (calcular_matriz_correlacao, desenhar_matriz_correlacao, False),
+}
+
+# lidas por este módulo, mas sem efeito no PNG: mudar uma delas não obriga a redesenhar
+_CONFIG_FORA_DO_DESENHO = {'ARQUIVO_IMPRESSOES_RELATORIO', 'PASTA_GRAFICOS', 'RELATORIO_PROCESSOS', 'COLUNAS_RELATORIO_ESTATICO'}
+
+@functools.cache
+def _codigo_do_desenho() -> tuple[bytes, tuple]:
+    """
+    Hash do código-fonte deste arquivo (funções de desenho e todos os auxiliares que elas chamam) e da
+    versão do matplotlib, mais os nomes das constantes do config que o arquivo lê.
+    """
+    with open(__file__, 'rb') as arquivo:
+        fonte = arquivo.read()
+    try:
+        versao_matplotlib = importlib.metadata.version('matplotlib')
+    except importlib.metadata.PackageNotFoundError:
+        versao_matplotlib = ''
+    nomes = sorted(set(re.findall(rb'config\.([A-Z][A-Z0-9_]*)', fonte)) - {nome.encode() for nome in _CONFIG_FORA_DO_DESENHO})
+    return hashlib.sha256(fonte + versao_matplotlib.encode()).digest(), tuple(nome.decode() for nome in nomes)
+
+def _impressao_digital(funcao_desenho, dados) -> str:
+    """
+    Hash dos dados agregados de um gráfico, do código que o desenha e dos valores do config usados no
+    desenho (lidos agora, não na importação): se nada disso mudou, o PNG também não.
+    """
+    codigo, nomes_config = _codigo_do_desenho()
+    valores_config = {nome: getattr(config, nome, None) for nome in nomes_config}
+    tabela = dados.to_frame() if isinstance(dados, pd.Series) else dados
+    hash_ = hashlib.sha256()
+    for parte in (codigo, repr((funcao_desenho.__name__, sorted(valores_config.items()))).encode(),
+                  repr((list(tabela.columns), list(tabela.index.names))).encode(),
+                  pd.util.hash_pandas_object(tabela, index=True).to_numpy().tobytes()):
+        hash_.update(parte)
+    return hash_.hexdigest()
+
+def _ler_impressoes() -> dict:
+    try:
+        with open(config.ARQUIVO_IMPRESSOES_RELATORIO, encoding='utf-8') as arquivo:
+            return json.load(arquivo)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def _gravar_impressoes(impressoes: dict):
+    os.makedirs(os.path.dirname(os.path.abspath(config.ARQUIVO_IMPRESSOES_RELATORIO)), exist_ok=True)
+    temporario = f"{config.ARQUIVO_IMPRESSOES_RELATORIO}.{os.getpid()}.tmp"
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        json.dump(impressoes, arquivo, indent=1)
+    os.replace(temporario, config.ARQUIVO_IMPRESSOES_RELATORIO)
+
+def _salvar_grafico(funcao_desenho, dados, caminho: str) -> bool:
+    """Desenha e grava um PNG (também nos processos do pool); retorna False se não havia o que desenhar."""
+    figura = funcao_desenho(dados)
+    if not figura:
+        return False
+    # troca de uma vez, para quem abre a pasta nunca ver um PNG pela metade
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    figura.savefig(temporario, format='png')
+    _pyplot().close(figura)
+    os.replace(temporario, caminho)
+    return True
+
+def _salvar_graficos(tarefas: list) -> list:
+    """Grava os gráficos das tarefas (função, dados, caminho) em um pool de processos; só os dados agregados trafegam."""
+    processos = min(config.RELATORIO_PROCESSOS, len(tarefas))
+    # com outras threads rodando (ex.: o pipeline classificando), criar processos por fork pode travar
+    if processos <= 1 or threading.active_count() > 1:
+        return [_salvar_grafico(*tarefa) for tarefa in tarefas]
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        return list(executor.map(_salvar_grafico, *zip(*tarefas)))
+
+@instrumentacao.instrumentar()
+def gerar_relatorio_estatico(df: pd.DataFrame, tabela: Optional[pd.DataFrame] = None, forcar: bool = False):
+    """
+    Imprime as análises textuais e salva os gráficos; se vier o cubo (`tabela`), os gráficos agregados usam ele.
+    Só são redesenhados os PNGs cujos dados agregados mudaram desde a última geração (todos, com `forcar`).
+    """
+    if not os.path.exists(config.PASTA_GRAFICOS):
+        os.makedirs(config.PASTA_GRAFICOS)
+    tabela = df if tabela is None else tabela
 
     # análises textuais
     print("\n--- [1.2] Principais Pontos Fortes ---")
@@ -302,19 +534,27 @@ def executar_analise_completa():
     df_honra = criar_quadro_honra(df)
     print(df_honra.to_string(index=False) if df_honra is not None else "N/A")
     
-    # gráficos
-    print("\nGerando e salvando gráficos...")
-    graficos_a_gerar = {
-        '01_tendencia_mensal.png': plotar_tendencia_rating_mensal,
-        '02_pareto_reclamacoes.png': plotar_grafico_pareto,
-        '03_mapa_calor_problemas.png': plotar_mapa_calor_problemas_loja,
-        '04_correlacao.png': plotar_matriz_correlacao
-    }
-    for nome_arquivo, funcao_plotagem in graficos_a_gerar.items():
-        figura = funcao_plotagem(df)
-        if figura:
-            figura.savefig(os.path.join(config.PASTA_GRAFICOS, nome_arquivo))
-            plt.close(figura)
+    # gráficos: agrega aqui (barato) e compara com a impressão digital da última geração
+    impressoes = _ler_impressoes()
+    tarefas, impressoes_tarefas = [], []
+    for nome_arquivo, (agregar, desenhar, aceita_cubo) in GRAFICOS_RELATORIO.items():
+        caminho = os.path.abspath(os.path.join(config.PASTA_GRAFICOS, nome_arquivo))
+        dados = agregar(tabela if aceita_cubo else df)
+        if dados is None:
+            impressoes.pop(caminho, None)
+            continue
+        impressao = _impressao_digital(desenhar, dados)
+        if not forcar and impressoes.get(caminho) == impressao and os.path.exists(caminho):
+            continue
+        impressoes.pop(caminho, None)
+        tarefas.append((desenhar, dados, caminho))
+        impressoes_tarefas.append(impressao)
+
+    print(f"\nGerando e salvando gráficos ({len(tarefas)} de {len(GRAFICOS_RELATORIO)} com dados novos)...")
+    for (_, _, caminho), impressao, salvo in zip(tarefas, impressoes_tarefas, _salvar_graficos(tarefas)):
+        if salvo:
+            impressoes[caminho] = impressao
+    _gravar_impressoes(impressoes)
 
     print(f"\n✅ Análise concluída! Gráficos salvos em: '{config.PASTA_GRAFICOS}'")
 
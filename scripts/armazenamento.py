@@ -0,0 +1,500 @@
+# Camada única de acesso aos feedbacks. O backend é escolhido em config.BACKEND_ARMAZENAMENTO:
+# 'csv' (arquivo compartilhado original), 'sqlite' (upsert por ID e consultas indexadas) ou
+# 'parquet' (dataset colunar particionado por Setor e mês, com projeção de colunas e filtros no arquivo).
+import io
+import os
+import shutil
+import sqlite3
+import tempfile
+import uuid
+from contextlib import contextmanager
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from . import config
+from . import instrumentacao
+
+COLUNAS_NUMERICAS = {'Rating': 'INTEGER', 'Sentiment_Score': 'REAL'}
+COLUNAS_INDEXADAS = ['Status', 'Local_Loja', 'Setor', 'Data']
+
+def _todas_colunas() -> list:
+    # mesma ordem do CSV: colunas base, Status e os demais campos da IA
+    return config.COLUNAS_BASE + ['Status'] + [col for col in config.COLUNAS_IA if col != 'Status']
+
+# BACKEND CSV
+def _ler_csv(colunas: list | None = None) -> pd.DataFrame:
+    usecols = (lambda col: col in colunas) if colunas else None
+    return pd.read_csv(config.NOME_ARQUIVO_CSV, sep=';', encoding='utf-8', usecols=usecols)
+
+def _ler_csv_a_partir_de(posicao: int, colunas: list | None = None) -> tuple[pd.DataFrame, int]:
+    """Linhas completas acrescentadas depois do byte `posicao` (anexar_feedbacks só escreve no fim); retorna também onde a leitura parou."""
+    with open(config.NOME_ARQUIVO_CSV, 'rb') as arquivo:
+        cabecalho = arquivo.readline().decode('utf-8').rstrip('\r\n').split(';')
+        arquivo.seek(posicao)
+        trecho = arquivo.read()
+    # uma linha ainda sendo escrita fica para a próxima leitura
+    fim = trecho.rfind(b'\n') + 1
+    usecols = (lambda col: col in colunas) if colunas else None
+    if fim == 0:
+        return pd.DataFrame(columns=[col for col in cabecalho if usecols is None or usecols(col)]), posicao
+    df = pd.read_csv(io.BytesIO(trecho[:fim]), sep=';', encoding='utf-8', header=None, names=cabecalho, usecols=usecols)
+    return df, posicao + fim
+
+def _geracao_csv() -> int:
+    """Contador de gravações do CSV que não são só acréscimo no fim (ver versao_dados)."""
+    try:
+        with open(f"{config.NOME_ARQUIVO_CSV}.geracao", encoding='utf-8') as arquivo:
+            return int(arquivo.read().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+def _nova_geracao_csv():
+    """
+    Avança o contador antes de reescrever ou recriar o CSV: quem lê entre as duas coisas vê uma geração
+    nova e relê o arquivo inteiro, nunca a partir de uma posição que não vale mais.
+    """
+    caminho = f"{config.NOME_ARQUIVO_CSV}.geracao"
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        arquivo.write(str(_geracao_csv() + 1))
+    os.replace(temporario, caminho)
+
+def _gravar_csv_atomico(df: pd.DataFrame):
+    """Grava em um arquivo temporário e troca de uma vez, para leitores nunca verem o CSV pela metade."""
+    pasta = os.path.dirname(os.path.abspath(config.NOME_ARQUIVO_CSV))
+    descritor, temporario = tempfile.mkstemp(dir=pasta, suffix='.csv.tmp')
+    try:
+        with os.fdopen(descritor, 'w', encoding='utf-8', newline='') as arquivo:
+            df.to_csv(arquivo, index=False, sep=';')
+        _nova_geracao_csv()
+        os.replace(temporario, config.NOME_ARQUIVO_CSV)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+# BACKEND SQLITE
+@contextmanager
+def _conectar():
+    """Abre o banco (criando tabela e índices, e importando o CSV existente na primeira vez)."""
+    novo = not os.path.exists(config.ARQUIVO_SQLITE)
+    conexao = sqlite3.connect(config.ARQUIVO_SQLITE, timeout=30)
+    conexao.execute("PRAGMA journal_mode=WAL")
+    definicoes = [
+        f'"{col}" ' + ('TEXT PRIMARY KEY' if col == 'ID' else COLUNAS_NUMERICAS.get(col, 'TEXT'))
+        for col in _todas_colunas()
+    ]
+    conexao.execute(f"CREATE TABLE IF NOT EXISTS feedbacks ({', '.join(definicoes)})")
+    for col in COLUNAS_INDEXADAS:
+        conexao.execute(f'CREATE INDEX IF NOT EXISTS "idx_feedbacks_{col}" ON feedbacks ("{col}")')
+    # registro de alterações: cada INSERT/UPDATE dá à linha uma versão nova, para o dashboard reler só o que mudou
+    conexao.execute('CREATE TABLE IF NOT EXISTS alteracoes_feedbacks ("ID" TEXT PRIMARY KEY, "versao" INTEGER NOT NULL)')
+    conexao.execute('CREATE INDEX IF NOT EXISTS "idx_alteracoes_versao" ON alteracoes_feedbacks ("versao")')
+    for evento in ('INSERT', 'UPDATE'):
+        conexao.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS "feedbacks_{evento.lower()}" AFTER {evento} ON feedbacks BEGIN
+                INSERT OR REPLACE INTO alteracoes_feedbacks ("ID", "versao")
+                VALUES (NEW."ID", (SELECT COALESCE(MAX("versao"), 0) + 1 FROM alteracoes_feedbacks));
+            END
+        """)
+    conexao.commit()
+    if novo and os.path.exists(config.NOME_ARQUIVO_CSV):
+        print(f"Importando '{config.NOME_ARQUIVO_CSV}' para o banco '{config.ARQUIVO_SQLITE}'...")
+        _upsert_sqlite(conexao, _ler_csv())
+    try:
+        yield conexao
+    finally:
+        conexao.close()
+
+def _valor_sql(valor):
+    """Converte NaN/NaT do pandas em NULL e tipos numpy em tipos nativos."""
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return None
+    return valor.item() if hasattr(valor, 'item') else valor
+
+def _versao_sqlite(conexao: sqlite3.Connection) -> int:
+    return conexao.execute('SELECT COALESCE(MAX("versao"), 0) FROM alteracoes_feedbacks').fetchone()[0]
+
+def _upsert_sqlite(conexao: sqlite3.Connection, df: pd.DataFrame):
+    """Insere ou atualiza (por ID) todas as linhas do DataFrame em uma única transação."""
+    colunas = [col for col in df.columns if col in _todas_colunas()]
+    nomes = ', '.join(f'"{col}"' for col in colunas)
+    marcadores = ', '.join('?' for _ in colunas)
+    atualizacoes = ', '.join(f'"{col}" = excluded."{col}"' for col in colunas if col != 'ID')
+    sql = f'INSERT INTO feedbacks ({nomes}) VALUES ({marcadores}) ON CONFLICT(ID) DO UPDATE SET {atualizacoes}'
+    linhas = ([_valor_sql(valor) for valor in linha] for linha in df[colunas].itertuples(index=False, name=None))
+    with conexao:
+        conexao.executemany(sql, linhas)
+
+def _montar_filtros(setor=None, local=None, data_inicio=None, data_fim=None) -> tuple[str, list]:
+    condicoes, parametros = [], []
+    for coluna, valor in (('Setor', setor), ('Local_Loja', local)):
+        if valor is not None:
+            condicoes.append(f'"{coluna}" = ?')
+            parametros.append(valor)
+    if data_inicio is not None:
+        condicoes.append('"Data" >= ?')
+        parametros.append(pd.Timestamp(data_inicio).strftime('%Y-%m-%d %H:%M:%S'))
+    if data_fim is not None:
+        condicoes.append('"Data" <= ?')
+        parametros.append(pd.Timestamp(data_fim).strftime('%Y-%m-%d %H:%M:%S'))
+    return (' WHERE ' + ' AND '.join(condicoes) if condicoes else ''), parametros
+
+def _filtrar_dataframe(df: pd.DataFrame, setor=None, local=None, data_inicio=None, data_fim=None) -> pd.DataFrame:
+    if setor is not None:
+        df = df[df['Setor'] == setor]
+    if local is not None:
+        df = df[df['Local_Loja'] == local]
+    if data_inicio is not None or data_fim is not None:
+        datas = pd.to_datetime(df['Data'], errors='coerce')
+        if data_inicio is not None:
+            df = df[datas >= pd.Timestamp(data_inicio)]
+        if data_fim is not None:
+            df = df[datas <= pd.Timestamp(data_fim)]
+    return df
+
+# BACKEND PARQUET
+COLUNAS_PARTICAO = ['Setor', 'Mes']
+
+def _esquema_parquet() -> pa.Schema:
+    """Esquema fixo dos arquivos (sem as colunas de partição), igual em todos os fragmentos."""
+    tipos = {'Data': pa.timestamp('s'), 'Rating': pa.int64(), 'Sentiment_Score': pa.float64()}
+    return pa.schema([(col, tipos.get(col, pa.string())) for col in _todas_colunas() if col != 'Setor'])
+
+def _particionamento():
+    return ds.partitioning(pa.schema([('Setor', pa.string()), ('Mes', pa.string())]), flavor='hive')
+
+def _dataset_parquet():
+    return ds.dataset(config.PASTA_PARQUET, format='parquet', partitioning=_particionamento())
+
+def _para_tabela_parquet(df: pd.DataFrame) -> pa.Table:
+    """Normaliza tipos e acrescenta a coluna de partição Mes (AAAA-MM)."""
+    df = df.copy()
+    for col in _todas_colunas():
+        if col not in df.columns:
+            df[col] = None
+    df['Data'] = pd.to_datetime(df['Data'], errors='coerce')
+    df['Rating'] = pd.to_numeric(df['Rating'], errors='coerce').astype('Int64')
+    df['Sentiment_Score'] = pd.to_numeric(df['Sentiment_Score'], errors='coerce')
+    for campo in _esquema_parquet():
+        if pa.types.is_string(campo.type):
+            df[campo.name] = df[campo.name].where(df[campo.name].isna(), df[campo.name].astype(str))
+    df['Setor'] = df['Setor'].astype(str)
+    df['Mes'] = df['Data'].dt.strftime('%Y-%m').fillna('sem-data')
+    esquema = _esquema_parquet().append(pa.field('Setor', pa.string())).append(pa.field('Mes', pa.string()))
+    return pa.Table.from_pandas(df[esquema.names], schema=esquema, preserve_index=False)
+
+def _gravar_parquet(tabela: pa.Table, pasta=None):
+    """
+    Cada gravação cria arquivos novos; os existentes nunca são reescritos no lugar. Os arquivos são
+    escritos com nome oculto (o dataset ignora o prefixo '.') e renomeados prontos, para que outro
+    processo lendo ao mesmo tempo nunca encontre um arquivo pela metade.
+    """
+    escritos = []
+    ds.write_dataset(
+        tabela, pasta or config.PASTA_PARQUET, format='parquet', partitioning=_particionamento(),
+        basename_template=f'.parte-{uuid.uuid4().hex}-{{i}}.parquet',
+        existing_data_behavior='overwrite_or_ignore',
+        file_visitor=lambda arquivo: escritos.append(arquivo.path)
+    )
+    for caminho in escritos:
+        pasta_arquivo, nome = os.path.split(caminho)
+        os.replace(caminho, os.path.join(pasta_arquivo, nome.lstrip('.')))
+
+def _garantir_parquet() -> bool:
+    """Importa o CSV existente na primeira vez. Retorna False se não houver dados."""
+    if os.path.isdir(config.PASTA_PARQUET):
+        return True
+    if not os.path.exists(config.NOME_ARQUIVO_CSV):
+        return False
+    print(f"Convertendo '{config.NOME_ARQUIVO_CSV}' para o dataset Parquet '{config.PASTA_PARQUET}'...")
+    # converte numa pasta temporária e a renomeia de uma vez: processos que começam juntos
+    # (ex.: trabalhadores da fila) não leem a conversão de outro pela metade
+    pasta_pai = os.path.dirname(os.path.abspath(config.PASTA_PARQUET))
+    os.makedirs(pasta_pai, exist_ok=True)
+    temporaria = tempfile.mkdtemp(dir=pasta_pai, prefix='.parquet-')
+    try:
+        _gravar_parquet(_para_tabela_parquet(_ler_csv()), temporaria)
+        os.rename(temporaria, config.PASTA_PARQUET)
+    except OSError:
+        # outro processo terminou a conversão antes
+        if not os.path.isdir(config.PASTA_PARQUET):
+            raise
+    finally:
+        shutil.rmtree(temporaria, ignore_errors=True)
+    return True
+
+def _filtro_parquet(setor=None, local=None, data_inicio=None, data_fim=None):
+    """Expressão de filtro: Setor e Mes podam partições; Local e Data usam as estatísticas dos arquivos."""
+    condicoes = []
+    if setor is not None:
+        condicoes.append(ds.field('Setor') == setor)
+    if local is not None:
+        condicoes.append(ds.field('Local_Loja') == local)
+    if data_inicio is not None:
+        inicio = pd.Timestamp(data_inicio)
+        condicoes += [ds.field('Mes') >= inicio.strftime('%Y-%m'), ds.field('Data') >= inicio.to_pydatetime()]
+    if data_fim is not None:
+        fim = pd.Timestamp(data_fim)
+        condicoes += [ds.field('Mes') <= fim.strftime('%Y-%m'), ds.field('Data') <= fim.to_pydatetime()]
+    filtro = None
+    for condicao in condicoes:
+        filtro = condicao if filtro is None else filtro & condicao
+    return filtro
+
+def _ler_parquet(colunas: list | None = None, filtro=None) -> pd.DataFrame:
+    dataset = _dataset_parquet()
+    nomes = [col for col in dataset.schema.names if col != 'Mes']
+    selecionadas = [col for col in (colunas or nomes) if col in nomes]
+    tabela = dataset.to_table(columns=selecionadas, filter=filtro)
+    categoricas = [col for col in config.COLUNAS_CATEGORICAS if col in selecionadas]
+    return tabela.to_pandas(categories=categoricas)
+
+def _ler_arquivos_parquet(arquivos: list, colunas: list | None = None) -> pd.DataFrame:
+    """Lê só os arquivos indicados, mantendo as colunas de partição (Setor)."""
+    dataset = ds.dataset(arquivos, format='parquet', partitioning=_particionamento(), partition_base_dir=str(config.PASTA_PARQUET))
+    nomes = [col for col in dataset.schema.names if col != 'Mes']
+    selecionadas = [col for col in (colunas or nomes) if col in nomes]
+    categoricas = [col for col in config.COLUNAS_CATEGORICAS if col in selecionadas]
+    return dataset.to_table(columns=selecionadas).to_pandas(categories=categoricas)
+
+def _salvar_classificacoes_parquet(resultados: dict):
+    """Reescreve só as partições que contêm os IDs atualizados."""
+    dataset = _dataset_parquet()
+    ids = pa.array([str(id_feedback) for id_feedback in resultados])
+    localizacao = dataset.to_table(columns=['ID', 'Setor', 'Mes'], filter=ds.field('ID').isin(ids)).to_pandas()
+    for (setor, mes), _ in localizacao.groupby(['Setor', 'Mes']):
+        filtro = (ds.field('Setor') == setor) & (ds.field('Mes') == mes)
+        arquivos = [fragmento.path for fragmento in dataset.get_fragments(filter=filtro)]
+        particao = dataset.to_table(filter=filtro).to_pandas()
+        particao = particao.astype({col: object for col in config.COLUNAS_IA if col in particao.columns})
+        posicoes = dict(zip(particao['ID'].astype(str), particao.index))
+        for id_feedback, campos in resultados.items():
+            index = posicoes.get(str(id_feedback))
+            if index is None:
+                continue
+            for coluna, valor in campos.items():
+                particao.at[index, coluna] = valor
+        # grava a nova versão antes de remover a antiga: numa queda, sobra duplicata, nunca perda
+        _gravar_parquet(_para_tabela_parquet(particao))
+        for arquivo in arquivos:
+            os.remove(arquivo)
+
+def converter_csv_para_parquet(sobrescrever: bool = False):
+    """Gera (ou regenera) o dataset Parquet a partir do CSV."""
+    if sobrescrever and os.path.isdir(config.PASTA_PARQUET):
+        shutil.rmtree(config.PASTA_PARQUET)
+    _garantir_parquet()
+
+# API PÚBLICA
+@instrumentacao.instrumentar()
+def carregar_feedbacks(colunas: list | None = None, setor=None, local=None, data_inicio=None, data_fim=None) -> pd.DataFrame | None:
+    """Lê os feedbacks (opcionalmente só algumas colunas e com filtros). Retorna None se não houver dados."""
+    if config.BACKEND_ARMAZENAMENTO == 'sqlite':
+        if not os.path.exists(config.ARQUIVO_SQLITE) and not os.path.exists(config.NOME_ARQUIVO_CSV):
+            return None
+        with _conectar() as conexao:
+            existentes = [linha[1] for linha in conexao.execute("PRAGMA table_info(feedbacks)")]
+            selecionadas = [col for col in (colunas or existentes) if col in existentes]
+            where, parametros = _montar_filtros(setor, local, data_inicio, data_fim)
+            nomes = ', '.join(f'"{col}"' for col in selecionadas)
+            return pd.read_sql_query(f"SELECT {nomes} FROM feedbacks{where}", conexao, params=parametros)
+
+    if config.BACKEND_ARMAZENAMENTO == 'parquet':
+        if not _garantir_parquet():
+            return None
+        return _ler_parquet(colunas, _filtro_parquet(setor, local, data_inicio, data_fim))
+
+    try:
+        df = _ler_csv(colunas)
+    except FileNotFoundError:
+        return None
+    return _filtrar_dataframe(df, setor, local, data_inicio, data_fim).reset_index(drop=True)
+
+def versao_dados() -> tuple | None:
+    """
+    Identificador barato do estado atual dos dados (não lê as linhas); muda a cada gravação.
+    CSV: arquivo (inode), geração (reescritas), tamanho e horário de modificação; SQLite: última versão
+    do registro de alterações; Parquet: conjunto de arquivos.
+    """
+    if config.BACKEND_ARMAZENAMENTO == 'sqlite':
+        if not os.path.exists(config.ARQUIVO_SQLITE) and not os.path.exists(config.NOME_ARQUIVO_CSV):
+            return None
+        with _conectar() as conexao:
+            return ('sqlite', os.stat(config.ARQUIVO_SQLITE).st_ino, _versao_sqlite(conexao))
+
+    if config.BACKEND_ARMAZENAMENTO == 'parquet':
+        if not _garantir_parquet():
+            return None
+        return ('parquet', tuple(sorted(_dataset_parquet().files)))
+
+    try:
+        estado = os.stat(config.NOME_ARQUIVO_CSV)
+    except FileNotFoundError:
+        return None
+    return ('csv', estado.st_ino, _geracao_csv(), estado.st_size, estado.st_mtime_ns)
+
+@instrumentacao.instrumentar()
+def carregar_alteracoes(versao_anterior: tuple | None, colunas: list | None = None) -> tuple[pd.DataFrame | None, tuple | None, bool]:
+    """
+    Linhas novas ou alteradas desde `versao_anterior` (de versao_dados ou de uma chamada anterior).
+    Retorna (linhas, nova versão, completo); completo=True quando não dá para ler só a diferença
+    (primeira leitura, arquivo reescrito, troca de backend) e as linhas são o conjunto inteiro.
+    Uma mesma linha pode vir de novo numa leitura seguinte; quem junta deve ficar com a última por ID.
+    """
+    versao = versao_dados()
+    if versao is None:
+        return None, None, True
+    mesma_origem = versao_anterior is not None and versao_anterior[0] == versao[0]
+
+    if versao[0] == 'sqlite' and mesma_origem and versao_anterior[1] == versao[1]:
+        with _conectar() as conexao:
+            existentes = [linha[1] for linha in conexao.execute("PRAGMA table_info(feedbacks)")]
+            selecionadas = [col for col in (colunas or existentes) if col in existentes]
+            atual = _versao_sqlite(conexao)
+            nomes = ', '.join(f'f."{col}"' for col in selecionadas)
+            df = pd.read_sql_query(
+                f'SELECT {nomes} FROM alteracoes_feedbacks a JOIN feedbacks f ON f."ID" = a."ID" WHERE a."versao" > ? AND a."versao" <= ?',
+                conexao, params=[versao_anterior[2], atual]
+            )
+        return df, ('sqlite', versao[1], atual), False
+
+    if versao[0] == 'parquet' and mesma_origem:
+        anteriores = set(versao_anterior[1])
+        novos = [arquivo for arquivo in versao[1] if arquivo not in anteriores]
+        # partições reescritas aparecem como arquivos novos com todas as linhas da partição
+        if novos or anteriores == set(versao[1]):
+            df = _ler_arquivos_parquet(novos, colunas) if novos else None
+            return df, versao, False
+
+    # CSV: só dá para ler a diferença se desde então houve apenas acréscimos no fim (mesmo arquivo e geração)
+    if versao[0] == 'csv' and mesma_origem and versao_anterior[1:3] == versao[1:3] and versao[3] >= versao_anterior[3]:
+        df, posicao = _ler_csv_a_partir_de(versao_anterior[3], colunas)
+        # lido até outro ponto (linha pela metade ou acréscimo depois do stat): a próxima leitura continua dali
+        return df, versao if posicao == versao[3] else ('csv', versao[1], versao[2], posicao, None), False
+
+    return carregar_feedbacks(colunas=colunas), versao, True
+
+@instrumentacao.instrumentar()
+def carregar_por_ids(ids: list, colunas: list | None = None) -> pd.DataFrame | None:
+    """Só as linhas dos IDs pedidos (filtro no SQL ou nos arquivos Parquet; o CSV é lido em blocos e filtrado)."""
+    ids = list(dict.fromkeys(map(str, ids)))
+    colunas = list(dict.fromkeys(['ID'] + colunas)) if colunas else None
+    if config.BACKEND_ARMAZENAMENTO == 'sqlite':
+        if not os.path.exists(config.ARQUIVO_SQLITE) and not os.path.exists(config.NOME_ARQUIVO_CSV):
+            return None
+        with _conectar() as conexao:
+            existentes = [linha[1] for linha in conexao.execute("PRAGMA table_info(feedbacks)")]
+            nomes = ', '.join(f'"{col}"' for col in (colunas or existentes) if col in existentes)
+            partes = [
+                pd.read_sql_query(f'SELECT {nomes} FROM feedbacks WHERE "ID" IN ({", ".join("?" for _ in trecho)})', conexao, params=trecho)
+                for trecho in (ids[inicio:inicio + 500] for inicio in range(0, len(ids), 500)) # limite de parâmetros do SQLite
+            ]
+            return pd.concat(partes, ignore_index=True) if partes else pd.read_sql_query(f"SELECT {nomes} FROM feedbacks LIMIT 0", conexao)
+
+    if config.BACKEND_ARMAZENAMENTO == 'parquet':
+        if not _garantir_parquet():
+            return None
+        return _ler_parquet(colunas, ds.field('ID').isin(pa.array(ids, pa.string())))
+
+    usecols = (lambda col: col in colunas) if colunas else None
+    procurados = set(ids)
+    try:
+        blocos = pd.read_csv(config.NOME_ARQUIVO_CSV, sep=';', encoding='utf-8', usecols=usecols, chunksize=config.CSV_LINHAS_POR_BLOCO)
+        return pd.concat([bloco[bloco['ID'].astype(str).isin(procurados)] for bloco in blocos], ignore_index=True)
+    except FileNotFoundError:
+        return None
+
+@instrumentacao.instrumentar()
+def carregar_pendentes(colunas: list | None = None) -> pd.DataFrame | None:
+    """Feedbacks ainda não classificados (nem pela IA nem pelo modelo local)."""
+    colunas = colunas or ['ID', 'Texto_Original', 'Setor', 'Status']
+    if config.BACKEND_ARMAZENAMENTO == 'sqlite':
+        if not os.path.exists(config.ARQUIVO_SQLITE) and not os.path.exists(config.NOME_ARQUIVO_CSV):
+            return None
+        with _conectar() as conexao:
+            nomes = ', '.join(f'"{col}"' for col in colunas)
+            marcadores = ', '.join('?' for _ in config.STATUS_CONCLUIDOS)
+            return pd.read_sql_query(
+                f"SELECT {nomes} FROM feedbacks WHERE \"Status\" IS NULL OR \"Status\" NOT IN ({marcadores})",
+                conexao, params=config.STATUS_CONCLUIDOS
+            )
+
+    if config.BACKEND_ARMAZENAMENTO == 'parquet':
+        if not _garantir_parquet():
+            return None
+        filtro = ds.field('Status').is_null() | ~ds.field('Status').isin(config.STATUS_CONCLUIDOS)
+        return _dataset_parquet().to_table(columns=colunas, filter=filtro).to_pandas()
+
+    try:
+        df = _ler_csv()
+    except FileNotFoundError:
+        return None
+    if 'Status' not in df.columns:
+        df['Status'] = None
+    for col in colunas:
+        if col not in df.columns:
+            df[col] = None
+    return df.loc[~df['Status'].isin(config.STATUS_CONCLUIDOS), colunas].reset_index(drop=True)
+
+@instrumentacao.instrumentar()
+def anexar_feedbacks(novos_feedbacks: pd.DataFrame):
+    """Acrescenta novos feedbacks ao armazenamento (upsert por ID no SQLite, arquivos novos no Parquet)."""
+    if config.BACKEND_ARMAZENAMENTO == 'sqlite':
+        with _conectar() as conexao:
+            _upsert_sqlite(conexao, novos_feedbacks)
+        return
+
+    if config.BACKEND_ARMAZENAMENTO == 'parquet':
+        _garantir_parquet()
+        _gravar_parquet(_para_tabela_parquet(novos_feedbacks))
+        return
+
+    if os.path.exists(config.NOME_ARQUIVO_CSV):
+        print(f"Adicionando {len(novos_feedbacks)} novos feedbacks ao arquivo existente...")
+        novos_feedbacks.to_csv(config.NOME_ARQUIVO_CSV, mode='a', index=False, sep=';', header=False, encoding='utf-8')
+    else:
+        print(f"Arquivo '{config.NOME_ARQUIVO_CSV}' não encontrado. Criando novo arquivo...")
+        _nova_geracao_csv()
+        novos_feedbacks.to_csv(config.NOME_ARQUIVO_CSV, index=False, sep=';', encoding='utf-8')
+
+@instrumentacao.instrumentar()
+def salvar_classificacoes(resultados: dict):
+    """Grava os campos da IA (ID -> {coluna: valor}); no SQLite, tudo numa transação com um UPDATE por ID."""
+    if not resultados:
+        return
+
+    if config.BACKEND_ARMAZENAMENTO == 'sqlite':
+        with _conectar() as conexao, conexao:
+            for id_feedback, campos in resultados.items():
+                atribuicoes = ', '.join(f'"{col}" = ?' for col in campos)
+                conexao.execute(
+                    f'UPDATE feedbacks SET {atribuicoes} WHERE "ID" = ?',
+                    [_valor_sql(valor) for valor in campos.values()] + [str(id_feedback)]
+                )
+        return
+
+    if config.BACKEND_ARMAZENAMENTO == 'parquet':
+        _salvar_classificacoes_parquet(resultados)
+        return
+
+    df = _ler_csv()
+    for col in config.COLUNAS_IA:
+        # para aceitar tipos mistos
+        df[col] = df[col].astype(object) if col in df.columns else pd.Series(dtype='object')
+    posicoes = dict(zip(df['ID'].astype(str), df.index))
+    for id_feedback, campos in resultados.items():
+        index = posicoes.get(str(id_feedback))
+        if index is None:
+            continue
+        for coluna, valor in campos.items():
+            df.at[index, coluna] = valor
+    _gravar_csv_atomico(df)
+
+def listar_valores(coluna: str) -> list:
+    """Valores distintos de uma coluna (consulta indexada no SQLite)."""
+    if config.BACKEND_ARMAZENAMENTO == 'sqlite':
+        with _conectar() as conexao:
+            return [linha[0] for linha in conexao.execute(f'SELECT DISTINCT "{coluna}" FROM feedbacks WHERE "{coluna}" IS NOT NULL')]
+    df = carregar_feedbacks(colunas=[coluna])
+    return [] if df is None else list(df[coluna].dropna().unique())
@@ -0,0 +1,73 @@
+import io
+import threading
+from collections import OrderedDict
+from . import config
+from . import instrumentacao
+
+# Gráficos do dashboard já renderizados em PNG. A chave leva o nome do gráfico, os filtros e a versão dos
+# dados: trocar de aba ou clicar num botão reaproveita a imagem, sem redesenhar a figura no matplotlib.
+# O tamanho total dos PNGs é limitado; passando do limite, os menos usados recentemente saem primeiro.
+
+class CacheDeGraficos:
+    """LRU de PNGs limitado em bytes, compartilhado entre as sessões do dashboard (via st.cache_resource)."""
+
+    def __init__(self, max_bytes: int | None = None):
+        self.max_bytes = max_bytes if max_bytes is not None else config.DASHBOARD_CACHE_GRAFICOS_MAX_MB * 1024 ** 2
+        self.bytes_usados = 0
+        self.acertos = 0
+        self.falhas = 0
+        self._imagens = OrderedDict()
+        self._lock = threading.Lock()
+
+    @instrumentacao.instrumentar('CacheDeGraficos.obter')
+    def obter(self, chave: tuple, desenhar) -> bytes | None:
+        """
+        PNG guardado para a chave; se não houver, chama `desenhar()` (que retorna uma figura ou None),
+        renderiza, fecha a figura e guarda. None quando não há o que desenhar (também fica guardado).
+        """
+        with self._lock:
+            if chave in self._imagens:
+                self._imagens.move_to_end(chave)
+                self.acertos += 1
+                return self._imagens[chave]
+            self.falhas += 1
+        # desenha fora do lock: duas sessões pedindo o mesmo gráfico no máximo o desenham duas vezes
+        imagem = _renderizar(desenhar())
+        self._guardar(chave, imagem)
+        return imagem
+
+    def _guardar(self, chave: tuple, imagem: bytes | None):
+        tamanho = len(imagem) if imagem else 0
+        if tamanho > self.max_bytes:
+            return
+        with self._lock:
+            anterior = self._imagens.pop(chave, None)
+            self.bytes_usados -= len(anterior) if anterior else 0
+            self._imagens[chave] = imagem
+            self.bytes_usados += tamanho
+            while self.bytes_usados > self.max_bytes:
+                _, removida = self._imagens.popitem(last=False)
+                self.bytes_usados -= len(removida) if removida else 0
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            consultas = self.acertos + self.falhas
+            return {
+                'itens': len(self._imagens),
+                'mb': self.bytes_usados / 1024 ** 2,
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'taxa_acerto': self.acertos / consultas if consultas else 0.0,
+            }
+
+def _renderizar(figura) -> bytes | None:
+    """PNG da figura (com as mesmas opções do st.pyplot); a figura é fechada para não acumular no pyplot."""
+    if not figura:
+        return None
+    import matplotlib.pyplot as plt # já carregado por quem desenhou a figura
+    buffer = io.BytesIO()
+    try:
+        figura.savefig(buffer, format='png', bbox_inches='tight', dpi=config.DASHBOARD_GRAFICOS_DPI)
+    finally:
+        plt.close(figura)
+    return buffer.getvalue()
@@ -0,0 +1,106 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from . import config
+
+def normalizar_texto(texto: str) -> str:
+    """Normaliza o texto para que variações de caixa, acentuação unicode e espaços caiam na mesma chave."""
+    texto = unicodedata.normalize('NFKC', str(texto)).casefold()
+    return re.sub(r'\s+', ' ', texto).strip()
+
+def chave_cache(texto: str, setor: str, template: str) -> str:
+    """Hash do texto normalizado + setor + parâmetros do modelo + template do prompt."""
+    partes = [
+        normalizar_texto(texto),
+        normalizar_texto(setor),
+        config.MODELO_IA,
+        str(config.IA_TEMPERATURE),
+        hashlib.sha256(template.encode('utf-8')).hexdigest(),
+    ]
+    return hashlib.sha256('\x1f'.join(partes).encode('utf-8')).hexdigest()
+
+class CacheClassificacoes:
+    """
+    Cache persistente (SQLite) das respostas da IA, endereçado pelo conteúdo.
+    Itens mais antigos que `max_idade_dias` expiram e, acima de `max_itens`, os menos acessados são removidos.
+    """
+
+    def __init__(self, caminho=None, max_itens: int | None = None, max_idade_dias: float | None = None):
+        self.caminho = caminho or config.ARQUIVO_CACHE_IA
+        self.max_itens = max_itens if max_itens is not None else config.CACHE_IA_MAX_ITENS
+        self.max_idade_segundos = (max_idade_dias if max_idade_dias is not None else config.CACHE_IA_MAX_IDADE_DIAS) * 86400
+        self.acertos = 0
+        self.falhas = 0
+        self._lock = threading.Lock()
+        self._conexao = sqlite3.connect(self.caminho, check_same_thread=False)
+        self._conexao.execute("""
+            CREATE TABLE IF NOT EXISTS classificacoes (
+                chave TEXT PRIMARY KEY,
+                resultado TEXT NOT NULL,
+                criado_em REAL NOT NULL,
+                ultimo_acesso REAL NOT NULL
+            )""")
+        self._conexao.execute("CREATE INDEX IF NOT EXISTS idx_ultimo_acesso ON classificacoes (ultimo_acesso)")
+        self._conexao.commit()
+        self.remover_excedentes()
+
+    def obter(self, chaves: str | list) -> dict | None:
+        """
+        Retorna o JSON guardado para a chave (ou None), contabilizando acerto/falha. Com uma lista de
+        chaves (ex.: uma por template que pode ter produzido o resultado), vale qualquer uma delas.
+        """
+        chaves = [chaves] if isinstance(chaves, str) else list(chaves)
+        agora = time.time()
+        with self._lock:
+            linha = self._conexao.execute(
+                f"SELECT chave, resultado FROM classificacoes WHERE chave IN ({', '.join('?' for _ in chaves)}) AND criado_em >= ? LIMIT 1",
+                (*chaves, agora - self.max_idade_segundos)
+            ).fetchone()
+            if linha is None:
+                self.falhas += 1
+                return None
+            self._conexao.execute("UPDATE classificacoes SET ultimo_acesso = ? WHERE chave = ?", (agora, linha[0]))
+            self._conexao.commit()
+            self.acertos += 1
+        return json.loads(linha[1])
+
+    def salvar(self, chave: str, resultado: dict):
+        """Guarda (ou substitui) a resposta associada à chave."""
+        agora = time.time()
+        with self._lock:
+            self._conexao.execute(
+                "INSERT OR REPLACE INTO classificacoes (chave, resultado, criado_em, ultimo_acesso) VALUES (?, ?, ?, ?)",
+                (chave, json.dumps(resultado, ensure_ascii=False), agora, agora)
+            )
+            self._conexao.commit()
+
+    def remover_excedentes(self):
+        """Aplica as políticas de idade e de tamanho máximo."""
+        with self._lock:
+            self._conexao.execute("DELETE FROM classificacoes WHERE criado_em < ?", (time.time() - self.max_idade_segundos,))
+            self._conexao.execute("""
+                DELETE FROM classificacoes WHERE chave IN (
+                    SELECT chave FROM classificacoes ORDER BY ultimo_acesso DESC LIMIT -1 OFFSET ?
+                )""", (self.max_itens,))
+            self._conexao.commit()
+
+    def estatisticas(self) -> dict:
+        """Contadores da execução atual e tamanho do cache."""
+        with self._lock:
+            itens = self._conexao.execute("SELECT COUNT(*) FROM classificacoes").fetchone()[0]
+        consultas = self.acertos + self.falhas
+        return {
+            'acertos': self.acertos,
+            'falhas': self.falhas,
+            'taxa_acerto': self.acertos / consultas if consultas else 0.0,
+            'itens': itens,
+        }
+
+    def fechar(self):
+        self.remover_excedentes()
+        with self._lock:
+            self._conexao.close()
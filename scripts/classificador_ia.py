@@ -1,117 +1,617 @@
-import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
 import json
 import os
 from dotenv import load_dotenv
 import time
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from . import config
+from . import armazenamento
+from . import quase_duplicatas
+from .cache_ia import CacheClassificacoes, chave_cache
+from .diario_classificacao import DiarioDeClassificacoes
+from . import instrumentacao
+from . import telemetria_ia
 
 # configurações
 load_dotenv(dotenv_path=config.NOME_ARQUIVO_ENV)
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 
-def classificar_feedback_com_ia(texto_feedback: str, setor: str) -> dict | None:
-    """Envia o texto para a API e retorna o JSON classificado."""
-    if not OPENROUTER_API_KEY:
-        print(f"Erro: Chave de API da OpenRouter não encontrada. Verifique seu arquivo '{config.NOME_ARQUIVO_ENV}'")
+# sessão HTTP compartilhada (reaproveita conexões entre as threads)
+_sessao = None
+_sessao_lock = threading.Lock()
+# vira True se o modelo recusar o response_format com esquema; daí em diante só o prompt orienta o JSON
+_esquema_recusado = False
+
+class LimitadorDeTaxa:
+    """Token bucket thread-safe: libera até `rajada` chamadas de uma vez e repõe `taxa` fichas por segundo."""
+
+    def __init__(self, taxa: float, rajada: int = 1):
+        self.taxa = taxa
+        self.capacidade = max(1, rajada)
+        self._fichas = float(self.capacidade)
+        self._ultima_reposicao = time.monotonic()
+        self._lock = threading.Lock()
+
+    def adquirir(self):
+        """Bloqueia até haver uma ficha disponível. Taxa <= 0 desativa o limite."""
+        if self.taxa <= 0:
+            return
+        while True:
+            with self._lock:
+                agora = time.monotonic()
+                self._fichas = min(self.capacidade, self._fichas + (agora - self._ultima_reposicao) * self.taxa)
+                self._ultima_reposicao = agora
+                if self._fichas >= 1:
+                    self._fichas -= 1
+                    return
+                espera = (1 - self._fichas) / self.taxa
+            time.sleep(espera)
+
+def _obter_sessao() -> requests.Session:
+    """Cria (uma única vez) a sessão com pool de conexões do tamanho da concorrência."""
+    global _sessao
+    with _sessao_lock:
+        if _sessao is None:
+            _sessao = requests.Session()
+            adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, config.IA_MAX_REQUISICOES_SIMULTANEAS))
+            _sessao.mount("https://", adaptador)
+            _sessao.mount("http://", adaptador)
+        return _sessao
+
+def _tempo_de_espera(tentativa: int, response: requests.Response | None = None) -> float:
+    """Usa o cabeçalho Retry-After quando houver; senão, backoff exponencial."""
+    if response is not None:
+        try:
+            return float(response.headers.get("Retry-After"))
+        except (TypeError, ValueError):
+            pass
+    return config.IA_ESPERA_BASE_SEGUNDOS * (2 ** (tentativa - 1))
+
+def _formato_resposta(propriedades: dict, nome: str, lote: bool) -> dict | None:
+    """response_format com esquema JSON estrito; no lote, um objeto {"itens": [...]} com um item (e seu ID) por feedback."""
+    if not config.IA_USAR_ESQUEMA_JSON or _esquema_recusado:
         return None
-    
-    # prompt usando o template e os dados do config
-    prompt = config.PROMPT_CLASSIFICADOR.format(setor=setor, texto_feedback=texto_feedback)
-    
+    if lote:
+        propriedades = {"ID": {"type": "string"}, **propriedades}
+    esquema = {"type": "object", "properties": propriedades, "required": list(propriedades), "additionalProperties": False}
+    if lote:
+        esquema = {"type": "object", "properties": {"itens": {"type": "array", "items": esquema}}, "required": ["itens"], "additionalProperties": False}
+    return {"type": "json_schema", "json_schema": {"name": nome, "strict": True, "schema": esquema}}
+
+def _enviar_prompt(prompt: str, limitador: LimitadorDeTaxa | None = None, formato_resposta: dict | None = None) -> tuple[str | None, dict]:
+    """
+    Envia o prompt para a API, com novas tentativas em 429/5xx. Retorna o conteúdo da resposta
+    e os metadados da chamada (latência, espera, tentativas, status e o `usage` de tokens).
+    """
+    global _esquema_recusado
+    metadados = {'inicio': time.time(), 'latencia_ms': 0.0, 'espera_ms': 0.0, 'tentativas': 0, 'status_http': None, 'usage': {}, 'erro': None}
+    for tentativa in range(1, config.IA_MAX_TENTATIVAS + 1):
+        metadados['tentativas'] = tentativa
+        if limitador:
+            inicio_espera = time.perf_counter()
+            limitador.adquirir()
+            metadados['espera_ms'] += (time.perf_counter() - inicio_espera) * 1000
+        response = None
+        inicio = time.perf_counter()
+        try:
+            response = _obter_sessao().post(
+                url=config.API_URL,
+                headers={
+                    "Authorization": f"Bearer {OPENROUTER_API_KEY}",
+                    "Content-Type": "application/json"
+                },
+                data=json.dumps({
+                    "model": config.MODELO_IA,
+                    "messages": [{"role": "user", "content": prompt}],
+                    "temperature": config.IA_TEMPERATURE,
+                    "usage": {"include": True}, # pede à OpenRouter o custo junto com os tokens
+                    **({"response_format": formato_resposta} if formato_resposta else {}),
+                }),
+                timeout=config.IA_TIMEOUT_SEGUNDOS
+            )
+            metadados['status_http'] = response.status_code
+            if response.status_code == 429 or response.status_code >= 500:
+                print(f"Aviso: API respondeu {response.status_code} (tentativa {tentativa}/{config.IA_MAX_TENTATIVAS}).")
+            else:
+                response.raise_for_status()
+                corpo = response.json()
+                conteudo = corpo['choices'][0]['message']['content']
+                metadados['usage'] = corpo.get('usage') or {}
+                return conteudo, metadados
+        except requests.exceptions.HTTPError as e:
+            if formato_resposta and response.status_code == 400:
+                print(f"Aviso: o modelo {config.MODELO_IA} recusou o esquema JSON (400); seguindo sem response_format.")
+                _esquema_recusado, formato_resposta = True, None
+                continue
+            # erros 4xx (exceto 429) não melhoram com novas tentativas
+            print(f"Erro na chamada da API: {e}")
+            print(f"Response Body: {response.text}")
+            metadados['erro'] = 'http'
+            return None, metadados
+        except (KeyError, IndexError, ValueError):
+            print(f"Erro: Formato da resposta da API inesperado. Resposta recebida:\n{response.text}")
+            metadados['erro'] = 'formato_resposta'
+            return None, metadados
+        except requests.exceptions.RequestException as e:
+            print(f"Erro na chamada da API (tentativa {tentativa}/{config.IA_MAX_TENTATIVAS}): {e}")
+        finally:
+            metadados['latencia_ms'] += (time.perf_counter() - inicio) * 1000
+
+        if tentativa < config.IA_MAX_TENTATIVAS:
+            espera = _tempo_de_espera(tentativa, response)
+            metadados['espera_ms'] += espera * 1000
+            time.sleep(espera)
+    metadados['erro'] = 'tentativas_esgotadas'
+    return None, metadados
+
+def _interpretar_json(ai_response_str: str):
+    """Remove a cerca ```json (se houver) e converte a resposta da IA."""
+    if ai_response_str.strip().startswith("```json"):
+        ai_response_str = ai_response_str.strip()[7:-3]
     try:
-        response = requests.post(
-            url=config.API_URL,
-            headers={
-                "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-                "Content-Type": "application/json"
-            },
-            data=json.dumps({
-                "model": config.MODELO_IA,
-                "messages": [{"role": "user", "content": prompt}],
-                "temperature": config.IA_TEMPERATURE,
-            })
-        )
-        response.raise_for_status()
-        ai_response_str = response.json()['choices'][0]['message']['content']
-        if ai_response_str.strip().startswith("```json"):
-            ai_response_str = ai_response_str.strip()[7:-3]
         return json.loads(ai_response_str)
-    except requests.exceptions.RequestException as e:
-        print(f"Erro na chamada da API: {e}")
-        print(f"Response Body: {response.text if 'response' in locals() else 'N/A'}")
-        return None
     except json.JSONDecodeError:
         print(f"Erro: A IA não retornou um JSON válido. Resposta recebida:\n{ai_response_str}")
         return None
-    except (KeyError, IndexError):
-        print(f"Erro: Formato da resposta da API inesperado. Resposta recebida:\n{response.text}")
+
+def _precisa_de_resposta(resultado: dict) -> bool:
+    """Só negativos ou urgentes (config.GERACAO_*) passam pela etapa de geração."""
+    return resultado.get('Sentimento') in config.GERACAO_SENTIMENTOS or resultado.get('Urgencia') in config.GERACAO_URGENCIAS
+
+def _prompts_classificacao(duas_etapas: bool) -> tuple[str, str]:
+    """Templates (individual, lote) da etapa de classificação."""
+    if duas_etapas:
+        return config.PROMPT_CLASSIFICADOR_COMPACTO, config.PROMPT_CLASSIFICADOR_COMPACTO_LOTE
+    return config.PROMPT_CLASSIFICADOR, config.PROMPT_CLASSIFICADOR_LOTE
+
+def _template_cache(duas_etapas: bool, em_lote: bool) -> str:
+    """
+    Templates que produzem um resultado, para a chave do cache: o de classificação usado (individual ou lote)
+    e, em duas etapas, os de geração que ele pode ter passado (no lote, a geração pode ir em lote ou sozinha).
+    """
+    template = _prompts_classificacao(duas_etapas)[1 if em_lote else 0]
+    if duas_etapas:
+        template += config.PROMPT_GERACAO_RESPOSTA + (config.PROMPT_GERACAO_RESPOSTA_LOTE if em_lote else '')
+    return template
+
+def _sem_chave_de_api() -> bool:
+    if not OPENROUTER_API_KEY:
+        print(f"Erro: Chave de API da OpenRouter não encontrada. Verifique seu arquivo '{config.NOME_ARQUIVO_ENV}'")
+        return True
+    return False
+
+def _enviar_individual(prompt: str, limitador: LimitadorDeTaxa | None, formato_resposta: dict | None, id_feedback, etapa: str) -> dict | None:
+    """Uma requisição com um feedback; registra a chamada na telemetria e retorna o objeto JSON (ou None)."""
+    ai_response_str, metadados = _enviar_prompt(prompt, limitador, formato_resposta)
+    resultado = _interpretar_json(ai_response_str) if ai_response_str is not None else None
+    valido = isinstance(resultado, dict)
+    erro = 'json_invalido' if ai_response_str is not None and not valido else None
+    telemetria_ia.registrar_chamada(metadados, [id_feedback], int(valido), erro, etapa)
+    return resultado if valido else None
+
+def _enviar_lote(prompt: str, ids_pedidos: list[str], limitador: LimitadorDeTaxa | None, formato_resposta: dict | None,
+                 valido, etapa: str) -> dict:
+    """Uma requisição com vários feedbacks; retorna ID -> objeto apenas para os itens aceitos por `valido`."""
+    ai_response_str, metadados = _enviar_prompt(prompt, limitador, formato_resposta)
+    if ai_response_str is None:
+        telemetria_ia.registrar_chamada(metadados, ids_pedidos, 0, etapa=etapa)
+        return {}
+    resposta = _interpretar_json(ai_response_str)
+    if isinstance(resposta, dict):
+        # alguns modelos (e o esquema estrito) embrulham o array em um objeto
+        resposta = next((valor for valor in resposta.values() if isinstance(valor, list)), [resposta])
+    if not isinstance(resposta, list):
+        telemetria_ia.registrar_chamada(metadados, ids_pedidos, 0, 'json_invalido', etapa)
+        return {}
+
+    pedidos = set(ids_pedidos)
+    validos = {
+        str(item['ID']): item
+        for item in resposta
+        if valido(item) and str(item.get('ID')) in pedidos
+    }
+    telemetria_ia.registrar_chamada(metadados, ids_pedidos, len(validos), None if validos else 'json_invalido', etapa)
+    return validos
+
+@instrumentacao.instrumentar()
+def classificar_feedback_com_ia(texto_feedback: str, setor: str, limitador: LimitadorDeTaxa | None = None,
+                                id_feedback: str | None = None, duas_etapas: bool | None = None) -> dict | None:
+    """
+    Envia o texto para a API e retorna o JSON classificado; o ID (se houver) só identifica a chamada na telemetria.
+    Em duas etapas, usa o prompt compacto e só gera sugestão e rascunho de resposta se o feedback precisar.
+    """
+    if _sem_chave_de_api():
         return None
+    if duas_etapas is None:
+        duas_etapas = config.IA_DUAS_ETAPAS
+
+    # prompt usando o template e os dados do config
+    prompt = _prompts_classificacao(duas_etapas)[0].format(setor=setor, texto_feedback=texto_feedback)
+    formato = _formato_resposta(config.ESQUEMA_CAMPOS_COMPACTOS, 'classificacao', lote=False) if duas_etapas else None
+    resultado = _enviar_individual(prompt, limitador, formato, id_feedback, 'compacta' if duas_etapas else 'completa')
+    if resultado is not None and duas_etapas and _precisa_de_resposta(resultado):
+        _gerar_respostas([(id_feedback, texto_feedback, setor, resultado)], limitador)
+    return resultado
+
+def _estimar_tokens(texto: str) -> int:
+    """Estimativa grosseira de tokens a partir do número de caracteres."""
+    return len(texto) // config.IA_CARACTERES_POR_TOKEN + 1
+
+def _resultado_valido(resultado) -> bool:
+    """Um item só é aceito se for um objeto com os campos obrigatórios preenchidos."""
+    return isinstance(resultado, dict) and all(resultado.get(campo) not in (None, '') for campo in config.CAMPOS_OBRIGATORIOS_IA)
+
+def _geracao_valida(resultado) -> bool:
+    return isinstance(resultado, dict) and all(resultado.get(campo) not in (None, '') for campo in config.CAMPOS_GERACAO_IA)
+
+@instrumentacao.instrumentar()
+def classificar_lote_com_ia(itens: list[tuple[str, str, str]], limitador: LimitadorDeTaxa | None = None,
+                            duas_etapas: bool | None = None) -> dict:
+    """
+    Classifica vários feedbacks (ID, texto, setor) em uma única requisição.
+    Retorna um dicionário ID -> JSON apenas com os itens válidos; os ausentes ficam para o chamador.
+    Em duas etapas, só a classificação compacta é feita aqui (a geração fica com _gerar_respostas).
+    """
+    if _sem_chave_de_api():
+        return {}
+    if duas_etapas is None:
+        duas_etapas = config.IA_DUAS_ETAPAS
+
+    linhas = [config.ITEM_PROMPT_LOTE.format(id=id_feedback, setor=setor, texto_feedback=texto) for id_feedback, texto, setor in itens]
+    prompt = _prompts_classificacao(duas_etapas)[1].format(feedbacks="\n".join(linhas))
+    formato = _formato_resposta(config.ESQUEMA_CAMPOS_COMPACTOS, 'classificacao_lote', lote=True) if duas_etapas else None
+    ids_pedidos = [str(id_feedback) for id_feedback, _, _ in itens]
+    return _enviar_lote(prompt, ids_pedidos, limitador, formato, _resultado_valido, 'compacta' if duas_etapas else 'completa')
+
+@instrumentacao.instrumentar()
+def gerar_respostas_com_ia(itens: list[tuple[str, str, str, dict]], limitador: LimitadorDeTaxa | None = None) -> dict:
+    """
+    Etapa de geração: sugestão de ação e rascunho de resposta para feedbacks já classificados
+    (ID, texto, setor, classificação). Um item vai no prompt individual; vários, no prompt em lote.
+    Retorna ID -> {Sugestao_Acao, Rascunho_Resposta} apenas com os itens gerados.
+    """
+    if _sem_chave_de_api():
+        return {}
+
+    def dados(id_feedback, texto, setor, classificacao):
+        return dict(id=id_feedback, setor=setor, texto_feedback=texto, sentimento=classificacao.get('Sentimento'),
+                    categoria=classificacao.get('Categoria'), subcategoria=classificacao.get('Subcategoria'),
+                    urgencia=classificacao.get('Urgencia'))
+
+    if len(itens) == 1:
+        id_feedback = itens[0][0]
+        prompt = config.PROMPT_GERACAO_RESPOSTA.format(**dados(*itens[0]))
+        formato = _formato_resposta(config.ESQUEMA_CAMPOS_GERACAO, 'geracao', lote=False)
+        gerado = _enviar_individual(prompt, limitador, formato, id_feedback, 'geracao')
+        return {str(id_feedback): gerado} if _geracao_valida(gerado) else {}
+
+    linhas = [config.ITEM_PROMPT_GERACAO_LOTE.format(**dados(*item)) for item in itens]
+    prompt = config.PROMPT_GERACAO_RESPOSTA_LOTE.format(feedbacks="\n".join(linhas))
+    formato = _formato_resposta(config.ESQUEMA_CAMPOS_GERACAO, 'geracao_lote', lote=True)
+    return _enviar_lote(prompt, [str(item[0]) for item in itens], limitador, formato, _geracao_valida, 'geracao')
+
+def _gerar_respostas(itens: list[tuple[str, str, str, dict]], limitador: LimitadorDeTaxa | None = None):
+    """Completa as classificações (in-place) com os campos gerados; quem faltar no lote é reenviado sozinho."""
+    gerados = gerar_respostas_com_ia(itens, limitador)
+    for item in itens:
+        id_feedback, classificacao = item[0], item[3]
+        gerado = gerados.get(str(id_feedback))
+        if gerado is None and len(itens) > 1:
+            gerado = gerar_respostas_com_ia([item], limitador).get(str(id_feedback))
+        if gerado is None:
+            # a classificação continua válida; só o rascunho fica em branco
+            print(f"Aviso: rascunho de resposta não gerado para o ID {id_feedback}.")
+            continue
+        classificacao.update({campo: gerado[campo] for campo in config.CAMPOS_GERACAO_IA})
+
+def _montar_lotes(itens: list[tuple], tamanho_maximo: int, template_lote: str, tokens_saida_por_feedback: int) -> list[list[tuple]]:
+    """
+    Agrupa (index, ID, texto, setor) em lotes que cabem no orçamento de tokens.
+    O tamanho de cada lote se adapta ao comprimento dos textos.
+    """
+    custo_fixo = _estimar_tokens(template_lote)
+    lotes, atual, custo_atual = [], [], custo_fixo
+    for item in itens:
+        _, id_feedback, texto, setor = item
+        custo_item = _estimar_tokens(config.ITEM_PROMPT_LOTE.format(id=id_feedback, setor=setor, texto_feedback=texto)) + tokens_saida_por_feedback
+        if atual and (len(atual) >= tamanho_maximo or custo_atual + custo_item > config.IA_ORCAMENTO_TOKENS_LOTE):
+            lotes.append(atual)
+            atual, custo_atual = [], custo_fixo
+        atual.append(item)
+        custo_atual += custo_item
+    if atual:
+        lotes.append(atual)
+    return lotes
 
-def classificar_feedbacks_pendentes():
-    """Lê o CSV, classifica feedbacks pendentes com a IA e salva o arquivo."""
+def _classificar_lote(lote: list[tuple], limitador: LimitadorDeTaxa | None = None, duas_etapas: bool = False) -> dict:
+    """
+    Classifica um lote e reenvia individualmente os itens ausentes ou malformados.
+    Retorna index -> (JSON | None, se o resultado veio da requisição em lote).
+    """
+    if len(lote) == 1:
+        index, id_feedback, texto, setor = lote[0]
+        return {index: (classificar_feedback_com_ia(texto, setor, limitador, id_feedback, duas_etapas), False)}
+
+    respostas = classificar_lote_com_ia([(id_feedback, texto, setor) for _, id_feedback, texto, setor in lote], limitador, duas_etapas)
+    if duas_etapas:
+        # a geração do lote também vai em uma requisição só, com os itens que precisam de resposta
+        precisam = [(id_feedback, texto, setor, respostas[str(id_feedback)]) for _, id_feedback, texto, setor in lote
+                    if str(id_feedback) in respostas and _precisa_de_resposta(respostas[str(id_feedback)])]
+        if precisam:
+            _gerar_respostas(precisam, limitador)
+
+    resultados = {}
+    for index, id_feedback, texto, setor in lote:
+        resultado_ia = respostas.get(str(id_feedback))
+        if resultado_ia is not None:
+            resultados[index] = (resultado_ia, True)
+            continue
+        print(f"Aviso: ID {id_feedback} ausente ou inválido na resposta do lote; reenviando sozinho.")
+        resultados[index] = (classificar_feedback_com_ia(texto, setor, limitador, id_feedback, duas_etapas), False)
+    return resultados
+
+def _converter_resultado(resultado_ia: dict, status: str = config.STATUS_CLASSIFICADO) -> dict:
+    """Converte o JSON da IA nos valores gravados nas colunas de config.COLUNAS_IA."""
+    campos = {}
+    for coluna in config.COLUNAS_IA:
+        valor = resultado_ia.get(coluna)
+
+        # converter para número se for um texto que parece número
+        if isinstance(valor, str):
+            try:
+                valor = float(valor)
+            except ValueError:
+                pass # texto se não for um número
+
+        # listas viram texto separado por vírgula
+        if isinstance(valor, list):
+            valor = ", ".join(map(str, valor))
+        campos[coluna] = valor
+
+    campos['Status'] = status
+    return campos
+
+def _salvar_resultados(resultados: dict) -> bool:
+    """Grava os resultados no armazenamento; retorna False se não conseguir (o diário é mantido)."""
     try:
-        df = pd.read_csv(config.NOME_ARQUIVO_CSV, sep=';', encoding='utf-8')
-    except FileNotFoundError:
-        print(f"Erro: O arquivo '{config.NOME_ARQUIVO_CSV}' não foi encontrado.")
-        return
-    
-    # colunas necessárias existem
-    if 'Status' not in df.columns:
-        df['Status'] = 'Pendente'
-    else:
-        df['Status'] = df['Status'].fillna('Pendente')
-
-    for col in config.COLUNAS_IA:
-        if col not in df.columns:
-            # para aceitar tipos mistos inicialmente
-            df[col] = pd.Series(dtype='object') 
-            
-    # feedbacks que precisam de classificação
-    feedbacks_para_classificar = df[df['Status'] != 'Classificado'].copy()
+        armazenamento.salvar_classificacoes(resultados)
+        print(f"\n💾 {len(resultados)} feedbacks atualizados no armazenamento ({config.BACKEND_ARMAZENAMENTO}).")
+        return True
+    except Exception as e:
+        print(f"\n❌ Erro ao salvar os resultados. Verifique se o arquivo não está aberto. Erro: {e}")
+        print(f"   Os resultados continuam salvos em '{config.ARQUIVO_DIARIO_IA}' e serão recuperados na próxima execução.")
+        return False
 
-    if feedbacks_para_classificar.empty:
-        print("✅ Nenhum novo feedback para classificar.")
-        return
+def _classificar_com_modelo_local(itens: list, registrar) -> list:
+    """Registra as previsões confiantes do modelo local e retorna os itens que ainda precisam da IA."""
+    from . import classificador_local # scikit-learn só quando o modelo local é usado
+    classificador = classificador_local.carregar_ou_treinar_classificador_local()
+    if classificador is None:
+        print(f"🤖 Modelo local indisponível (menos de {config.MODELO_LOCAL_MIN_AMOSTRAS} feedbacks classificados pela IA); tudo segue para a API.")
+        return itens
+
+    previsoes, confianca = classificador_local.prever(classificador, [item[2] for item in itens], [item[3] for item in itens])
+    restantes, evitadas = [], 0
+    for item, previsao, confianca_item in zip(itens, previsoes, confianca):
+        index = item[0]
+        if confianca_item < config.MODELO_LOCAL_CONFIANCA_MINIMA:
+            restantes.append(item)
+            continue
+        evitadas += 1
+        registrar(index, previsao, " (modelo local)", config.STATUS_CLASSIFICADO_LOCAL)
+
+    print(f"🤖 Modelo local: {evitadas} de {len(itens)} chamadas evitadas; {classificador_local.resumo_concordancia(classificador)}.")
+    return restantes
+
+def _agrupar_quase_duplicatas(itens: list, registrar, representantes: dict) -> list:
+    """
+    Deixa seguir só um representante por grupo de quase duplicatas e retorna esses itens.
+    Se o representante já foi classificado em outra execução, os membros são registrados na hora;
+    senão, ficam em `representantes` (index do representante -> (texto, membros)) à espera do resultado dele.
+    """
+    indice = quase_duplicatas.IndiceQuaseDuplicatas()
+    novos = indice.atualizar([item[1] for item in itens], [item[2] for item in itens])
+    por_id = {str(item[1]): item for item in itens}
+    grupos = indice.agrupar(list(por_id))
+    indice.salvar()
+
+    classificados = quase_duplicatas.carregar_classificados([id_rep for id_rep in grupos if id_rep not in por_id])
+    agrupados, reaproveitados = set(), 0
+    for id_rep, ids_membros in grupos.items():
+        if id_rep in por_id:
+            _, _, texto_rep, setor_rep = por_id[id_rep]
+        elif id_rep in classificados:
+            texto_rep, setor_rep, resultado_rep = classificados[id_rep]
+        else:
+            continue
+        # o prompt leva o setor: membros de outro setor seguem sozinhos
+        membros = [por_id[id_membro] for id_membro in ids_membros if por_id[id_membro][3] == setor_rep]
+        agrupados.update(str(membro[1]) for membro in membros)
+        if id_rep in por_id:
+            representantes[por_id[id_rep][0]] = (texto_rep, membros)
+            continue
+        reaproveitados += len(membros)
+        for index, _, texto, _ in membros:
+            registrar(index, quase_duplicatas.adaptar_resultado(resultado_rep, texto_rep, texto), f" (quase duplicata de {id_rep})")
+
+    print(f"🧬 Quase duplicatas: {len(agrupados)} de {len(itens)} feedbacks reaproveitam a classificação de outro do grupo "
+          f"({reaproveitados} copiados de feedbacks já classificados); {novos} textos novos no índice ({len(indice)} no total).")
+    return [item for item in itens if str(item[1]) not in agrupados]
+
+def resumir_resultados(total: int, resultados: dict) -> dict:
+    """Contagens de uma execução: feedbacks pendentes, classificados e com falha."""
+    falhas = sum(1 for campos in resultados.values() if campos['Status'] == config.STATUS_FALHA)
+    return {'pendentes': total, 'classificados': len(resultados) - falhas, 'falhas': falhas}
 
-    print(f"🔎 Encontrados {len(feedbacks_para_classificar)} feedbacks para classificar...")
-    for index, row in feedbacks_para_classificar.iterrows():
-        id_feedback = row.get('ID', f'índice {index}')
-        print(f"\n🧠 Processando feedback ID: {id_feedback}...")
+def classificar_feedbacks(feedbacks_para_classificar, max_simultaneas: int | None = None, requisicoes_por_segundo: float | None = None,
+                          modo_lote: bool | None = None, usar_modelo_local: bool | None = None, duas_etapas: bool | None = None,
+                          agrupar_quase_duplicatas: bool | None = None, ao_classificar_lote=None,
+                          diario: DiarioDeClassificacoes | None = None) -> dict:
+    """
+    Classifica os feedbacks (colunas ID, Texto_Original e Setor) com cache, quase duplicatas, modelo local
+    e a IA em paralelo, e retorna ID -> campos, sem gravar no armazenamento. Com Ctrl+C, retorna o que já terminou.
+    `ao_classificar_lote`, se informado, recebe cada leva de resultados ({ID: campos}) assim que ela termina.
+    """
+    max_simultaneas = max_simultaneas or config.IA_MAX_REQUISICOES_SIMULTANEAS
+    if requisicoes_por_segundo is None:
+        requisicoes_por_segundo = config.IA_REQUISICOES_POR_SEGUNDO
+    if modo_lote is None:
+        modo_lote = config.IA_MODO_LOTE
+    if usar_modelo_local is None:
+        usar_modelo_local = config.IA_USAR_MODELO_LOCAL
+    if duas_etapas is None:
+        duas_etapas = config.IA_DUAS_ETAPAS
+    if agrupar_quase_duplicatas is None:
+        agrupar_quase_duplicatas = config.IA_AGRUPAR_QUASE_DUPLICATAS
+    limitador = LimitadorDeTaxa(requisicoes_por_segundo, config.IA_RAJADA_MAXIMA)
 
-        resultado_ia = classificar_feedback_com_ia(row['Texto_Original'], row['Setor'])
+    itens = list(zip(
+        feedbacks_para_classificar.index,
+        feedbacks_para_classificar['ID'],
+        feedbacks_para_classificar['Texto_Original'],
+        feedbacks_para_classificar['Setor']
+    ))
+    total = len(itens)
+    resultados = {}
+    representantes = {}
+    leva = {}
 
+    def entregar_leva():
+        """Passa os resultados novos ao gancho; um erro nele não interrompe a classificação."""
+        if ao_classificar_lote is None or not leva:
+            return
+        try:
+            ao_classificar_lote(dict(leva))
+        except Exception as e:
+            print(f"⚠️  Erro ao repassar os resultados classificados: {e}")
+        leva.clear()
+
+    def registrar(index, resultado_ia, origem='', status=config.STATUS_CLASSIFICADO):
+        """Guarda um resultado (apenas na thread principal) e o repassa aos repetidos e aos membros do grupo de quase duplicatas."""
+        id_feedback = feedbacks_para_classificar.at[index, 'ID']
         if resultado_ia:
-            for coluna in config.COLUNAS_IA:
-                valor = resultado_ia.get(coluna)
-
-                # converter para número se for um texto que parece número
-                if isinstance(valor, str):
-                    try:
-                        valor = float(valor)
-                    except ValueError:
-                        pass # texto se não for um número
-                
-                # valor ao DataFrame
-                if isinstance(valor, list):
-                    df.loc[index, coluna] = ", ".join(map(str, valor))
-                else:
-                    df.loc[index, coluna] = valor
-            
-            # status para Classificado
-            df.loc[index, 'Status'] = 'Classificado'
-            print(f"  -> ✅ Status: Classificado com sucesso!")
+            campos = resultados[id_feedback] = leva[id_feedback] = _converter_resultado(resultado_ia, status)
+            if diario is not None:
+                diario.registrar(id_feedback, campos)
+            print(f"  -> ✅ [{len(resultados)}/{total}] ID {id_feedback}: Classificado com sucesso!{origem}")
         else:
-            df.loc[index, 'Status'] = 'Falha na Classificação'
-            print(f"  -> ❌ Status: Falha na classificação.")
-        
-        time.sleep(config.API_CALL_DELAY_SECONDS)
+            resultados[id_feedback] = {'Status': config.STATUS_FALHA}
+            print(f"  -> ❌ [{len(resultados)}/{total}] ID {id_feedback}: Falha na classificação.")
+        for index_repetido in repetidos.pop(chaves.get(index), []):
+            registrar(index_repetido, resultado_ia, " (repetido)", status)
+        texto_rep, membros = representantes.pop(index, (None, []))
+        for index_membro, _, texto_membro, _ in membros:
+            copia = quase_duplicatas.adaptar_resultado(resultado_ia, texto_rep, texto_membro) if resultado_ia else None
+            registrar(index_membro, copia, f" (quase duplicata de {id_feedback})", status)
+
+    # cache: feedbacks já vistos não vão para a API; repetidos na mesma execução esperam o primeiro
+    # a chave leva o template que produziu o resultado: no modo lote, um item reenviado sozinho usa o individual
+    cache = CacheClassificacoes() if config.IA_USAR_CACHE else None
+    templates = {em_lote: _template_cache(duas_etapas, em_lote) for em_lote in ((False, True) if modo_lote else (False,))}
+    chaves, chaves_por_template, repetidos, itens_para_api = {}, {}, {}, []
+    for item in itens:
+        index, _, texto, setor = item
+        if cache is None:
+            itens_para_api.append(item)
+            continue
+        chaves_por_template[index] = {em_lote: chave_cache(texto, setor, template) for em_lote, template in templates.items()}
+        chave = chaves[index] = chaves_por_template[index][False] # identifica o texto, para juntar os repetidos
+        if chave in repetidos:
+            repetidos[chave].append(index)
+            continue
+        resultado_em_cache = cache.obter(list(chaves_por_template[index].values()))
+        if resultado_em_cache is not None:
+            registrar(index, resultado_em_cache, " (cache)")
+            continue
+        repetidos[chave] = []
+        itens_para_api.append(item)
+
+    # quase duplicatas: um representante por grupo segue adiante; os membros copiam o resultado dele
+    if agrupar_quase_duplicatas and itens_para_api:
+        itens_para_api = _agrupar_quase_duplicatas(itens_para_api, registrar, representantes)
 
+    # modelo local: o que ele classifica com confiança não vai para a API
+    if usar_modelo_local and itens_para_api:
+        itens_para_api = _classificar_com_modelo_local(itens_para_api, registrar)
+    entregar_leva()
+
+    tokens_saida = config.IA_TOKENS_SAIDA_COMPACTA_POR_FEEDBACK if duas_etapas else config.IA_TOKENS_SAIDA_POR_FEEDBACK
+    lotes = _montar_lotes(itens_para_api, config.IA_TAMANHO_MAXIMO_LOTE if modo_lote else 1, _prompts_classificacao(duas_etapas)[1], tokens_saida)
+    print(f"🔎 Encontrados {total} feedbacks; {len(itens_para_api)} vão para a API em {len(lotes)} requisições ({max_simultaneas} em paralelo, até {requisicoes_por_segundo} req/s)...")
+    telemetria_ia.iniciar_execucao()
+    executor = ThreadPoolExecutor(max_workers=max_simultaneas)
     try:
-        df.to_csv(config.NOME_ARQUIVO_CSV, index=False, sep=';', encoding='utf-8')
-        print(f"\n💾 Planilha '{config.NOME_ARQUIVO_CSV}' atualizada com sucesso.")
-    except Exception as e:
-        print(f"\n❌ Erro ao salvar o CSV. Verifique se ele não está aberto. Erro: {e}")
+        futuros = {executor.submit(_classificar_lote, lote, limitador, duas_etapas) for lote in lotes}
+        while futuros:
+            # acorda no prazo do diário mesmo sem resultado novo (API lenta ou em backoff), para confirmar o que já chegou
+            prazo = diario.segundos_para_confirmar() if diario is not None else None
+            prontos, futuros = wait(futuros, timeout=prazo, return_when=FIRST_COMPLETED)
+            for futuro in prontos:
+                for index, (resultado_ia, em_lote) in futuro.result().items():
+                    if cache is not None and resultado_ia:
+                        cache.salvar(chaves_por_template[index][em_lote], resultado_ia)
+                    registrar(index, resultado_ia)
+            if prontos:
+                entregar_leva()
+            if diario is not None:
+                diario.confirmar_se_vencido()
+    except KeyboardInterrupt:
+        print("\n⚠️ Interrompido pelo usuário. Salvando o que já foi classificado...")
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        if diario is not None:
+            diario.confirmar()
+
+    if cache is not None:
+        estatisticas = cache.estatisticas()
+        cache.fechar()
+        print(f"\n♻️ Cache: {estatisticas['acertos']} acertos, {estatisticas['falhas']} falhas ({estatisticas['taxa_acerto']:.0%}), {estatisticas['itens']} itens guardados.")
+
+    if config.IA_REGISTRAR_TELEMETRIA and (telemetria := telemetria_ia.finalizar_execucao()):
+        print(f"📡 Telemetria ({telemetria['execucao']}): {telemetria['chamadas']} chamadas, {telemetria['feedbacks_por_minuto']} feedbacks/min, "
+              f"latência p50 {telemetria['latencia_p50_ms']:.0f} ms / p95 {telemetria['latencia_p95_ms']:.0f} ms, "
+              f"{telemetria['tokens_entrada_por_feedback']} + {telemetria['tokens_saida_por_feedback']} tokens por feedback, "
+              f"{telemetria['novas_tentativas']} novas tentativas, {telemetria['falhas_json']} respostas sem JSON válido.")
+
+    return resultados
+
+@instrumentacao.instrumentar()
+def classificar_feedbacks_pendentes(max_simultaneas: int | None = None, requisicoes_por_segundo: float | None = None, modo_lote: bool | None = None,
+                                    usar_modelo_local: bool | None = None, duas_etapas: bool | None = None,
+                                    agrupar_quase_duplicatas: bool | None = None, ao_classificar_lote=None) -> dict | None:
+    """
+    Lê os feedbacks pendentes, classifica com a IA (em paralelo) e grava os resultados.
+    `ao_classificar_lote`, se informado, recebe cada leva de resultados ({ID: campos}) assim que ela
+    termina, antes da gravação final (ex.: o pipeline atualiza os agregados do relatório).
+    Retorna as contagens da execução, ou None se os dados não puderam ser lidos ou gravados.
+    Só um processo por vez: para vários em paralelo, use fila_classificacao.executar_trabalhador.
+    """
+    # retomada: resultados confirmados no diário de uma execução interrompida
+    diario = DiarioDeClassificacoes()
+    recuperados = diario.ler()
+    if recuperados:
+        print(f"♻️ Retomando execução anterior: {len(recuperados)} resultados recuperados do diário.")
+        if not _salvar_resultados(recuperados):
+            return None
+        diario.descartar()
+
+    feedbacks_para_classificar = armazenamento.carregar_pendentes()
+    if feedbacks_para_classificar is None:
+        print(f"Erro: O arquivo '{config.NOME_ARQUIVO_CSV}' não foi encontrado.")
+        return None
+
+    if feedbacks_para_classificar.empty:
+        print("✅ Nenhum novo feedback para classificar.")
+        return {'pendentes': 0, 'classificados': 0, 'falhas': 0}
+
+    resultados = classificar_feedbacks(feedbacks_para_classificar, max_simultaneas, requisicoes_por_segundo, modo_lote,
+                                       usar_modelo_local, duas_etapas, agrupar_quase_duplicatas, ao_classificar_lote, diario)
+    if not _salvar_resultados(resultados):
+        return None
+    diario.descartar()
+    return resumir_resultados(len(feedbacks_para_classificar), resultados)
 
 if __name__ == '__main__':
-    classificar_feedbacks_pendentes()
\ No newline at end of file
+    classificar_feedbacks_pendentes()
@@ -0,0 +1,143 @@
+import os
+import time
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+from sklearn.multioutput import MultiOutputClassifier
+from . import config
+from . import armazenamento
+from . import instrumentacao
+
+# Modelo local "destilado" da IA: aprende Sentimento, Categoria, Subcategoria e Urgência
+# com as linhas que a IA já classificou e responde de uma vez por todos os pendentes.
+# O modelo treinado fica em PASTA_MODELOS e só é refeito quando o histórico cresce o bastante.
+ALVOS = config.CAMPOS_OBRIGATORIOS_IA
+NOME_ARQUIVO_MODELO = 'classificador-local.joblib'
+_em_memoria = {} # caminho -> versão já carregada neste processo (ex.: o trabalhador da fila, lote após lote)
+
+def _vetorizar(textos, setores):
+    """O setor entra como um token a mais, já que a mesma frase pode ter categorias diferentes por setor."""
+    vetorizador = HashingVectorizer(n_features=config.MODELO_LOCAL_N_FEATURES, ngram_range=(1, 2), alternate_sign=False)
+    documentos = [f"setor_{str(setor).replace(' ', '_')} {texto}" for texto, setor in zip(textos, setores)]
+    return vetorizador.transform(documentos)
+
+def _confianca(probabilidades: list) -> np.ndarray:
+    """Confiança de cada linha: a menor das probabilidades máximas entre os alvos."""
+    return np.min([proba.max(axis=1) for proba in probabilidades], axis=0)
+
+@instrumentacao.instrumentar()
+def treinar_classificador_local(df_historico: pd.DataFrame | None = None) -> dict | None:
+    """
+    Treina o modelo com o histórico classificado pela IA e mede, numa validação separada,
+    quanto ele concorda com a IA nas linhas em que passaria do limiar de confiança.
+    """
+    if df_historico is None:
+        df_historico = armazenamento.carregar_feedbacks(colunas=['ID', 'Texto_Original', 'Setor', 'Status'] + ALVOS)
+        if df_historico is None:
+            return None
+
+    if 'Status' not in df_historico.columns:
+        return None
+    df = df_historico[df_historico['Status'] == config.STATUS_CLASSIFICADO]
+    df = df.dropna(subset=['Texto_Original'] + ALVOS).astype({alvo: str for alvo in ALVOS})
+    if len(df) < config.MODELO_LOCAL_MIN_AMOSTRAS:
+        return None
+
+    validacao = pd.util.hash_pandas_object(df['ID'].astype(str), index=False).to_numpy() % 100 < config.MODELO_LOCAL_PERCENTUAL_VALIDACAO
+    treino = df[~validacao]
+    if not validacao.any() or any(treino[alvo].nunique() < 2 for alvo in ALVOS):
+        return None
+
+    modelo = MultiOutputClassifier(SGDClassifier(loss='log_loss', alpha=1e-5, random_state=42))
+    modelo.fit(_vetorizar(treino['Texto_Original'], treino['Setor']), treino[ALVOS].to_numpy())
+
+    df_validacao = df[validacao]
+    X_validacao = _vetorizar(df_validacao['Texto_Original'], df_validacao['Setor'])
+    confiantes = _confianca(modelo.predict_proba(X_validacao)) >= config.MODELO_LOCAL_CONFIANCA_MINIMA
+    previsto = modelo.predict(X_validacao)
+    concordancia = {
+        alvo: float((previsto[confiantes, i] == df_validacao[alvo].to_numpy()[confiantes]).mean()) if confiantes.any() else None
+        for i, alvo in enumerate(ALVOS)
+    }
+    return {
+        'modelo': modelo,
+        'amostras_treino': len(treino),
+        'amostras_validacao': len(df_validacao),
+        'cobertura_validacao': float(confiantes.mean()),
+        'concordancia': concordancia,
+    }
+
+def _caminho_modelo() -> str:
+    return os.path.join(config.PASTA_MODELOS, NOME_ARQUIVO_MODELO)
+
+def _parametros() -> tuple:
+    """O que muda o modelo além dos dados: com outros valores, o salvo não serve."""
+    return (tuple(ALVOS), config.STATUS_CLASSIFICADO, config.MODELO_LOCAL_N_FEATURES,
+            config.MODELO_LOCAL_PERCENTUAL_VALIDACAO, config.MODELO_LOCAL_CONFIANCA_MINIMA)
+
+def _carregar_versao(caminho: str) -> dict | None:
+    if caminho in _em_memoria:
+        return _em_memoria[caminho]
+    if not os.path.exists(caminho):
+        return None
+    try:
+        return joblib.load(caminho)
+    except Exception as e:
+        print(f"⚠️  Não foi possível ler o modelo local salvo em '{caminho}': {e}")
+        return None
+
+def _salvar_versao(caminho: str, versao: dict):
+    """Grava de forma atômica (trabalhadores da fila podem treinar ao mesmo tempo)."""
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    joblib.dump(versao, temporario, compress=3)
+    os.replace(temporario, caminho)
+
+@instrumentacao.instrumentar()
+def carregar_ou_treinar_classificador_local() -> dict | None:
+    """
+    Modelo local pronto para `prever`. O salvo é reaproveitado enquanto o histórico classificado pela IA
+    não diminuiu nem cresceu mais que MODELO_LOCAL_RETREINAR_CRESCIMENTO desde o treino; aí só a coluna
+    Status é lida. Retorna None se não há histórico suficiente.
+    """
+    df_status = armazenamento.carregar_feedbacks(colunas=['Status'])
+    if df_status is None or 'Status' not in df_status.columns:
+        return None
+    amostras = int((df_status['Status'] == config.STATUS_CLASSIFICADO).sum())
+    if amostras < config.MODELO_LOCAL_MIN_AMOSTRAS:
+        return None
+
+    caminho = _caminho_modelo()
+    versao = _carregar_versao(caminho)
+    if (versao is not None and versao['parametros'] == _parametros()
+            and versao['amostras_historico'] <= amostras <= versao['amostras_historico'] * (1 + config.MODELO_LOCAL_RETREINAR_CRESCIMENTO)):
+        _em_memoria[caminho] = versao
+        return versao['classificador']
+
+    print(f"🧠 Treinando o modelo local com o histórico de {amostras} feedbacks classificados pela IA...")
+    classificador = treinar_classificador_local()
+    if classificador is None:
+        return None
+    versao = {'classificador': classificador, 'amostras_historico': amostras, 'parametros': _parametros(), 'criado_em': time.time()}
+    _salvar_versao(caminho, versao)
+    _em_memoria[caminho] = versao
+    return classificador
+
+@instrumentacao.instrumentar()
+def prever(classificador: dict, textos, setores) -> tuple[list, np.ndarray]:
+    """Classifica todos os textos de uma vez; retorna os campos previstos e a confiança de cada linha."""
+    modelo = classificador['modelo']
+    probabilidades = modelo.predict_proba(_vetorizar(textos, setores))
+    rotulos = {
+        alvo: estimador.classes_[proba.argmax(axis=1)]
+        for alvo, estimador, proba in zip(ALVOS, modelo.estimators_, probabilidades)
+    }
+    return pd.DataFrame(rotulos).to_dict('records'), _confianca(probabilidades)
+
+def resumo_concordancia(classificador: dict) -> str:
+    """Texto curto com a concordância com a IA na validação (linhas acima do limiar)."""
+    partes = [f"{alvo} {valor:.0%}" if valor is not None else f"{alvo} -" for alvo, valor in classificador['concordancia'].items()]
+    return (f"concordância com a IA na validação ({classificador['amostras_validacao']} linhas, "
+            f"{classificador['cobertura_validacao']:.0%} acima do limiar): " + ', '.join(partes))
@@ -6,12 +6,34 @@ NOME_ARQUIVO_CSV = DATA_DIR / 'feedbacks_gerados.csv'
 NOME_ARQUIVO_ENV = Path(__file__).resolve().parent.parent / 'chave.env'
 PASTA_GRAFICOS = 'relatorio_de_analise'
 
+# Armazenamento dos feedbacks (armazenamento.py): 'csv', 'sqlite' ou 'parquet'
+BACKEND_ARMAZENAMENTO = 'csv'
+ARQUIVO_SQLITE = DATA_DIR / 'feedbacks.sqlite'
+PASTA_PARQUET = DATA_DIR / 'feedbacks_parquet'
+COLUNAS_BASE = ['ID', 'Setor', 'Canal', 'Data', 'Rating', 'Local_Loja', 'Texto_Original']
+# colunas de baixa cardinalidade lidas como category no backend Parquet
+COLUNAS_CATEGORICAS = ['Setor', 'Canal', 'Local_Loja', 'Status', 'Sentimento', 'Categoria', 'Subcategoria', 'Urgencia']
+# colunas usadas pelo relatório estático (evita ler Texto_Original e os rascunhos)
+COLUNAS_RELATORIO_ESTATICO = ['ID', 'Data', 'Rating', 'Local_Loja', 'Sentimento', 'Sentiment_Score', 'Subcategoria', 'Urgencia', 'Menciona_Empregado']
+CSV_LINHAS_POR_BLOCO = 200_000 # leituras filtradas do CSV (carregar_por_ids) guardam só um bloco por vez
+
+# Instrumentação (instrumentacao.py): tempos, linhas e memória dos pontos quentes, gravados em JSON Lines
+INSTRUMENTACAO_ATIVA = False # no dashboard, o painel de performance liga só para a execução atual
+INSTRUMENTACAO_MEDIR_MEMORIA = False # usa tracemalloc, que deixa tudo mais lento enquanto estiver ligado
+ARQUIVO_INSTRUMENTACAO = DATA_DIR / 'instrumentacao.jsonl'
+
 # 2. CONFIGURAÇÕES DO GERADOR DE FEEDBACK (gerarFeedback.py)
 NOVOS_FEEDBACKS_HOTELARIA = 5
 NOVOS_FEEDBACKS_CONSTRUCAO = 5
 FAKER_LOCALE = 'pt_BR'
 FEEDBACK_START_DATE = '-1y' # data para geração
 
+# Geração em blocos (vetorizada com NumPy), para testes de carga com milhões de linhas
+GERADOR_SEMENTE = None # inteiro para gerar sempre os mesmos feedbacks
+GERADOR_TAMANHO_BLOCO = 100_000 # linhas geradas e gravadas por vez
+GERADOR_PROCESSOS = 1 # acima de 1, os blocos são gerados em paralelo por um pool de processos
+GERADOR_TAMANHO_POOL_NOMES = 5_000 # nomes e sobrenomes sorteados uma vez pelo Faker e reutilizados
+
 # Listas de Conteúdo para Geração
 CANAIS_FEEDBACK = ['Website', 'Aplicativo', 'Email', 'Totem na Loja', 'Telefone', 'Redes Sociais', 'Reclame Aqui']
 LISTA_PRODUTOS_CONSTRUCAO = ['cimento', 'tijolos', 'porcelanato', 'tinta', 'argamassa', 'torneiras']
@@ -38,7 +60,14 @@ TEXTOS_FEEDBACK = {
 MODELO_IA = 'z-ai/glm-4.5-air:free'
 API_URL = "https://openrouter.ai/api/v1/chat/completions"
 IA_TEMPERATURE = 0.2
-API_CALL_DELAY_SECONDS = 5
+IA_TIMEOUT_SEGUNDOS = 60
+
+# Concorrência e limite de taxa (substituem o antigo atraso fixo de 5 s entre chamadas)
+IA_MAX_REQUISICOES_SIMULTANEAS = 4 # chamadas em andamento ao mesmo tempo
+IA_REQUISICOES_POR_SEGUNDO = 0.33 # taxa média do token bucket (~20/min, limite dos modelos gratuitos)
+IA_RAJADA_MAXIMA = 4 # fichas acumuladas que podem ser gastas de uma vez
+IA_MAX_TENTATIVAS = 3 # novas tentativas em erro de rede, 429 ou 5xx
+IA_ESPERA_BASE_SEGUNDOS = 2 # base do backoff exponencial entre tentativas
 
 # Estrutura e Prompt da IA
 COLUNAS_IA = [
@@ -69,6 +98,154 @@ Sua resposta DEVE ser um único e válido objeto JSON, sem nenhum texto adiciona
 }}
 """
 
+# Cache de classificações: feedbacks idênticos (após normalização) não geram nova chamada
+IA_USAR_CACHE = True
+ARQUIVO_CACHE_IA = DATA_DIR / 'cache_classificacoes.sqlite'
+CACHE_IA_MAX_ITENS = 100_000
+CACHE_IA_MAX_IDADE_DIAS = 90
+
+# Diário de checkpoints: resultados confirmados a cada K linhas ou T segundos
+ARQUIVO_DIARIO_IA = DATA_DIR / 'diario_classificacoes.jsonl'
+DIARIO_CONFIRMAR_A_CADA_LINHAS = 20
+DIARIO_CONFIRMAR_A_CADA_SEGUNDOS = 10
+
+# Fila de trabalho (fila_classificacao.py): vários trabalhadores (`python main.py trabalhador`, em processos ou
+# máquinas com a pasta data/ compartilhada) reservam lotes de pendentes por um prazo renovado enquanto trabalham
+ARQUIVO_FILA_IA = DATA_DIR / 'fila_classificacoes.sqlite'
+FILA_IA_TAMANHO_RESERVA = 200 # feedbacks reservados de cada vez por trabalhador
+FILA_IA_DURACAO_RESERVA_SEGUNDOS = 120 # sem renovação nesse prazo (trabalhador caiu), o lote volta para a fila
+FILA_IA_RENOVAR_A_CADA_SEGUNDOS = 30
+
+# Telemetria das chamadas (telemetria_ia.py): latência, tokens de `usage`, tentativas e falhas de cada requisição
+IA_REGISTRAR_TELEMETRIA = True
+ARQUIVO_TELEMETRIA_IA = DATA_DIR / 'telemetria_ia.sqlite'
+TELEMETRIA_IA_MAX_IDADE_DIAS = 90
+# preço em US$ por milhão de tokens, usado quando a API não informa `usage.cost` (o modelo gratuito não cobra)
+IA_CUSTO_POR_MILHAO_TOKENS_ENTRADA = 0.0
+IA_CUSTO_POR_MILHAO_TOKENS_SAIDA = 0.0
+
+# Modo em lote: vários feedbacks no mesmo prompt, pagando as instruções uma só vez
+IA_MODO_LOTE = False
+IA_TAMANHO_MAXIMO_LOTE = 20 # limite de feedbacks por requisição
+IA_ORCAMENTO_TOKENS_LOTE = 6000 # prompt + resposta esperada, abaixo do contexto do modelo
+IA_TOKENS_SAIDA_POR_FEEDBACK = 250 # estimativa do JSON devolvido para cada feedback
+IA_CARACTERES_POR_TOKEN = 4 # aproximação usada para estimar tokens sem tokenizador
+CAMPOS_OBRIGATORIOS_IA = ['Sentimento', 'Categoria', 'Subcategoria', 'Urgencia']
+
+PROMPT_CLASSIFICADOR_LOTE = """
+Você é um especialista em análise de feedback de clientes. Sua tarefa é analisar CADA um dos feedbacks abaixo.
+Cada linha traz o ID do feedback, o setor a que ele pertence e o texto.
+
+{feedbacks}
+
+Sua resposta DEVE ser um único e válido array JSON, sem nenhum texto adicional antes ou depois, com exatamente um objeto por feedback.
+Cada objeto DEVE repetir o "ID" recebido e seguir esta estrutura:
+{{
+  "ID": "O ID exatamente como informado.",
+  "Sentimento": "Positivo, Negativo ou Neutro.",
+  "Sentiment_Score": "Um número de 0.0 (totalmente negativo) a 1.0 (totalmente positivo).",
+  "Categoria": "A principal categoria do feedback (ex: Atendimento, Instalações, Produto, Preço, Entrega, Limpeza, Processos).",
+  "Subcategoria": "Um detalhe da categoria (ex: Recepção, Qualidade do Cimento, Atraso na Entrega, Limpeza do Quarto).",
+  "Tags": "Uma lista de 3 a 5 palavras-chave ou termos curtos em formato de lista Python, como ['tag1', 'tag2'].",
+  "Menciona_Empregado": "Se um nome de funcionário for mencionado, coloque o nome exato. Caso contrário, coloque 'Não'.",
+  "Urgencia": "Avalie a urgência para a empresa resolver isso como 'Alta', 'Média' ou 'Baixa'.",
+  "Palavras_Chave": "Uma lista com as 3 palavras ou expressões mais importantes do texto, como ['palavra1', 'palavra2'].",
+  "Sugestao_Acao": "Uma sugestão de ação concreta e curta para a empresa (ex: 'Treinar equipe da recepção', 'Verificar estoque do produto X').",
+  "Rascunho_Resposta": "Escreva um rascunho de resposta amigável e profissional para o cliente, com no máximo 40 palavras.",
+  "Status": "Classificado"
+}}
+"""
+ITEM_PROMPT_LOTE = '- ID: {id} | Setor: {setor} | Feedback: "{texto_feedback}"'
+
+# Classificação em duas etapas: a etapa compacta devolve só os campos estruturados; a de geração
+# (sugestão de ação e rascunho de resposta) roda apenas para os feedbacks que precisam de resposta
+IA_DUAS_ETAPAS = True
+IA_USAR_ESQUEMA_JSON = True # envia o esquema em response_format; se o modelo recusar, segue só com o prompt
+IA_TOKENS_SAIDA_COMPACTA_POR_FEEDBACK = 90 # estimativa do JSON compacto, usada para montar os lotes
+GERACAO_SENTIMENTOS = ['Negativo'] # feedbacks que recebem rascunho de resposta...
+GERACAO_URGENCIAS = ['Alta'] # ...ou que têm esta urgência
+CAMPOS_GERACAO_IA = ['Sugestao_Acao', 'Rascunho_Resposta']
+
+# propriedades do esquema JSON estrito de cada etapa (no lote, cada objeto ganha também o "ID")
+ESQUEMA_CAMPOS_COMPACTOS = {
+    "Sentimento": {"type": "string", "enum": ["Positivo", "Negativo", "Neutro"]},
+    "Sentiment_Score": {"type": "number"},
+    "Categoria": {"type": "string"},
+    "Subcategoria": {"type": "string"},
+    "Urgencia": {"type": "string", "enum": ["Alta", "Média", "Baixa"]},
+    "Menciona_Empregado": {"type": "string"},
+    "Tags": {"type": "array", "items": {"type": "string"}},
+    "Palavras_Chave": {"type": "array", "items": {"type": "string"}},
+}
+ESQUEMA_CAMPOS_GERACAO = {
+    "Sugestao_Acao": {"type": "string"},
+    "Rascunho_Resposta": {"type": "string"},
+}
+
+PROMPT_CLASSIFICADOR_COMPACTO = """
+Classifique o feedback de cliente abaixo, do setor de "{setor}".
+
+Texto do Feedback: "{texto_feedback}"
+
+Responda só com um objeto JSON, sem texto antes ou depois:
+{{"Sentimento": "Positivo|Negativo|Neutro", "Sentiment_Score": 0.0 (negativo) a 1.0 (positivo), "Categoria": "ex: Atendimento, Instalações, Produto, Preço, Entrega, Limpeza, Processos", "Subcategoria": "detalhe da categoria, ex: Recepção, Atraso na Entrega", "Urgencia": "Alta|Média|Baixa", "Menciona_Empregado": "nome exato do funcionário citado ou Não", "Tags": ["3 a 5 termos curtos"], "Palavras_Chave": ["as 3 palavras ou expressões mais importantes do texto"]}}
+"""
+
+PROMPT_CLASSIFICADOR_COMPACTO_LOTE = """
+Classifique CADA feedback de cliente abaixo (ID, setor e texto).
+
+{feedbacks}
+
+Responda só com um objeto JSON {{"itens": [...]}}, sem texto antes ou depois, com um objeto por feedback:
+{{"ID": "o ID exatamente como informado", "Sentimento": "Positivo|Negativo|Neutro", "Sentiment_Score": 0.0 (negativo) a 1.0 (positivo), "Categoria": "ex: Atendimento, Instalações, Produto, Preço, Entrega, Limpeza, Processos", "Subcategoria": "detalhe da categoria, ex: Recepção, Atraso na Entrega", "Urgencia": "Alta|Média|Baixa", "Menciona_Empregado": "nome exato do funcionário citado ou Não", "Tags": ["3 a 5 termos curtos"], "Palavras_Chave": ["as 3 palavras ou expressões mais importantes do texto"]}}
+"""
+
+PROMPT_GERACAO_RESPOSTA = """
+Você cuida do relacionamento com clientes do setor de "{setor}". O feedback abaixo foi classificado como {sentimento}, {categoria} / {subcategoria}, urgência {urgencia}.
+
+Texto do Feedback: "{texto_feedback}"
+
+Responda só com um objeto JSON, sem texto antes ou depois:
+{{"Sugestao_Acao": "uma ação concreta e curta para a empresa", "Rascunho_Resposta": "resposta amigável e profissional ao cliente, com no máximo 40 palavras"}}
+"""
+
+PROMPT_GERACAO_RESPOSTA_LOTE = """
+Você cuida do relacionamento com clientes. Para CADA feedback abaixo (ID, setor, texto e classificação), escreva a ação sugerida e um rascunho de resposta.
+
+{feedbacks}
+
+Responda só com um objeto JSON {{"itens": [...]}}, sem texto antes ou depois, com um objeto por feedback:
+{{"ID": "o ID exatamente como informado", "Sugestao_Acao": "uma ação concreta e curta para a empresa", "Rascunho_Resposta": "resposta amigável e profissional ao cliente, com no máximo 40 palavras"}}
+"""
+ITEM_PROMPT_GERACAO_LOTE = '- ID: {id} | Setor: {setor} | Feedback: "{texto_feedback}" | {sentimento}, {categoria} / {subcategoria}, urgência {urgencia}'
+
+# Quase duplicatas (quase_duplicatas.py): MinHash + LSH sobre o texto; só um representante por grupo vai para a API
+IA_AGRUPAR_QUASE_DUPLICATAS = True
+ARQUIVO_INDICE_DUPLICATAS = DATA_DIR / 'indice_quase_duplicatas.npz'
+DUPLICATAS_NUM_PERMUTACOES = 32
+DUPLICATAS_LINHAS_POR_BANDA = 4 # 8 bandas de 4: pares com Jaccard 0.7 viram candidatos ~90% das vezes
+DUPLICATAS_TAMANHO_SHINGLE = 2 # n-gramas de palavras
+DUPLICATAS_MIN_PALAVRAS = 6 # textos mais curtos sempre vão sozinhos para a API
+DUPLICATAS_LIMIAR_JACCARD = 0.7 # similaridade estimada mínima entre cada membro e o representante
+DUPLICATAS_CAMPOS_POR_LINHA = ['Menciona_Empregado'] # extraídos do texto de cada membro, em vez de copiados
+
+# Status gravados pela classificação (os dois contam como concluídos)
+STATUS_CLASSIFICADO = 'Classificado'
+STATUS_CLASSIFICADO_LOCAL = 'Classificado (Local)'
+STATUS_CONCLUIDOS = [STATUS_CLASSIFICADO, STATUS_CLASSIFICADO_LOCAL]
+STATUS_FALHA = 'Falha na Classificação' # volta para a fila na próxima execução
+
+# Modelo local (classificador_local.py): aprende com o histórico classificado pela IA
+# e só manda para a API os feedbacks em que está pouco confiante. Opcional: as linhas que ele aceita
+# (STATUS_CLASSIFICADO_LOCAL) ficam só com Sentimento, Categoria, Subcategoria e Urgência, sem
+# Sentiment_Score, Tags, Palavras_Chave, Menciona_Empregado, sugestão e rascunho, e não voltam para a API
+IA_USAR_MODELO_LOCAL = False
+MODELO_LOCAL_CONFIANCA_MINIMA = 0.85 # menor probabilidade entre Sentimento, Categoria, Subcategoria e Urgência
+MODELO_LOCAL_MIN_AMOSTRAS = 200 # abaixo disso todo feedback vai para a IA
+MODELO_LOCAL_PERCENTUAL_VALIDACAO = 20 # separação fixa por hash do ID, usada para medir a concordância
+MODELO_LOCAL_N_FEATURES = 2 ** 18
+MODELO_LOCAL_RETREINAR_CRESCIMENTO = 0.1 # o modelo salvo é refeito quando o histórico cresce mais que 10%
+
 # 4. CONFIGURAÇÕES DO DASHBOARD (analise.py)
 # Pesos para Métricas
 PESOS_HEALTH_SCORE = {
@@ -77,6 +254,30 @@ PESOS_HEALTH_SCORE = {
     'urgencia': 0.2
 }
 
+# Modelo de urgência (modelo_urgencia.py): registro em disco, atualizado só com as linhas novas
+PASTA_MODELOS = DATA_DIR / 'modelos'
+MODELOS_MANTIDOS = 3 # versões antigas além destas são apagadas do registro
+MODELO_URGENCIA_MIN_AMOSTRAS = 50
+MODELO_URGENCIA_PERCENTUAL_TESTE = 25 # separação fixa por hash do ID
+MODELO_URGENCIA_N_FEATURES = 2 ** 18
+MODELO_URGENCIA_EPOCAS_INICIAIS = 5 # passadas do partial_fit no primeiro treino
+
+# Mapa de calor Loja × Subcategoria: só as maiores por volume de reclamações; as demais somam em "Outros"
+MAPA_CALOR_SO_MAIORES = True # False: todas as lojas e subcategorias (relatório estático; no dashboard, é o valor inicial da chave)
+MAPA_CALOR_MAX_LOJAS = 20 # None mostra todas
+MAPA_CALOR_MAX_SUBCATEGORIAS = 12 # None mostra todas
+MAPA_CALOR_ROTULO_OUTROS = 'Outros'
+MAPA_CALOR_MAX_CELULAS_ANOTADAS = 300 # acima disso, as células ficam sem o número
+MAPA_CALOR_MAX_ROTULOS = 50 # por eixo; acima disso, só um rótulo a cada tantas células
+
+# Cache dos gráficos renderizados no dashboard (cache_graficos.py): PNG por gráfico, filtro e versão dos dados
+DASHBOARD_CACHE_GRAFICOS_MAX_MB = 64 # acima disso, os menos usados recentemente saem
+DASHBOARD_GRAFICOS_DPI = 200 # o mesmo que o st.pyplot usa
+
+# Pipeline em fluxo (pipeline.py): o relatório estático é refeito durante a classificação com as levas já
+# classificadas, no máximo uma vez a cada intervalo, e uma última vez no fim
+PIPELINE_INTERVALO_RELATORIO_SEGUNDOS = 60
+
 # CONSTANTES DO DATAFRAME
 class COLS:
     """Centraliza os nomes de todas as colunas importantes."""
@@ -109,5 +310,10 @@ FIGSIZE_PADRAO = (10, 6)
 FIGSIZE_GRANDE = (12, 8)
 PALETA_HEALTH_SCORE = 'coolwarm_r'
 PALETA_PROBLEMAS_CANAL = 'viridis'
+SATURACAO_BARRAS = 0.75 # as barras saem um pouco menos saturadas que a paleta
 DIAS_SEMANA_ORDEM = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
 DIAS_SEMANA_PT = {'Monday': 'Segunda', 'Tuesday': 'Terça', 'Wednesday': 'Quarta', 'Thursday': 'Quinta', 'Friday': 'Sexta', 'Saturday': 'Sábado', 'Sunday': 'Domingo'}
+
+# Relatório estático (analise.gerar_relatorio_estatico): gráficos desenhados em paralelo e só os que mudaram
+RELATORIO_PROCESSOS = 4 # 1 desenha tudo no próprio processo
+ARQUIVO_IMPRESSOES_RELATORIO = DATA_DIR / 'impressoes_relatorio.json' # hash dos dados de cada PNG já gerado
@@ -0,0 +1,178 @@
+import pandas as pd
+from . import config
+from . import instrumentacao
+
+# Cubo de agregados: uma linha por combinação das dimensões, com contagem e soma dos ratings.
+# As funções agregar_* aceitam tanto o cubo quanto o DataFrame de feedbacks (cada linha pesa 1),
+# então o custo delas depende do número de grupos quando recebem o cubo.
+DIA = 'Dia'
+QTD = 'Qtd'
+SOMA_RATING = 'Soma_Rating'
+_PADRAO = object() # parâmetro não informado (None já quer dizer "sem limite")
+DIMENSOES = ['Setor', config.COLS.LOCAL, DIA, config.COLS.CANAL, config.COLS.SENTIMENTO,
+             config.COLS.CATEGORIA, config.COLS.SUBCATEGORIA, config.COLS.URGENCIA]
+
+@instrumentacao.instrumentar()
+def construir_cubo(df: pd.DataFrame) -> pd.DataFrame:
+    """Agrega os feedbacks por Setor × Loja × dia × Canal × Sentimento × Categoria/Subcategoria × Urgência."""
+    chaves = [
+        df[config.COLS.DATA].dt.normalize().rename(DIA) if dim == DIA else df[dim]
+        for dim in DIMENSOES if dim == DIA or dim in df.columns
+    ]
+    cubo = df[config.COLS.RATING].groupby(chaves, sort=False, dropna=False, observed=True).agg(['size', 'sum'])
+    cubo.columns = [QTD, SOMA_RATING]
+    return cubo.reset_index()
+
+def concatenar_mantendo_categorias(base: pd.DataFrame, novas: pd.DataFrame) -> pd.DataFrame:
+    """Acrescenta linhas sem perder as colunas category da base (as categorias que faltarem são adicionadas)."""
+    # colunas ainda vazias nas linhas novas assumem o tipo da base
+    novas = novas.astype({col: base[col].dtype for col in novas.columns if col in base.columns and novas[col].isna().all()})
+    for col in base.select_dtypes('category').columns:
+        if col not in novas.columns:
+            continue
+        faltantes = pd.Index(novas[col].dropna().unique()).difference(base[col].cat.categories)
+        if len(faltantes):
+            base = base.assign(**{col: base[col].cat.add_categories(faltantes)})
+        novas = novas.assign(**{col: pd.Categorical(novas[col], categories=base[col].cat.categories)})
+    return pd.concat([base, novas], ignore_index=True)
+
+@instrumentacao.instrumentar()
+def atualizar_cubo(cubo: pd.DataFrame, linhas_novas: pd.DataFrame, linhas_removidas: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aplica uma diferença ao cubo sem reagregar tudo: soma os grupos das linhas novas e subtrai os das
+    linhas removidas (versões antigas das linhas alteradas). Só os grupos dos dias tocados são refeitos.
+    """
+    diferenca = [construir_cubo(linhas_novas)] if len(linhas_novas) else []
+    if len(linhas_removidas):
+        removidos = construir_cubo(linhas_removidas)
+        diferenca.append(removidos.assign(**{QTD: -removidos[QTD], SOMA_RATING: -removidos[SOMA_RATING]}))
+    if not diferenca:
+        return cubo
+
+    afetados = cubo[DIA].isin(pd.concat([parte[DIA] for parte in diferenca]).unique())
+    dimensoes = [dim for dim in DIMENSOES if dim in cubo.columns]
+    # dimensões em object: categorias diferentes (ou colunas ainda vazias) não mudam o agrupamento por valor
+    rotulos = {dim: object for dim in dimensoes if dim != DIA}
+    juntos = pd.concat([parte.astype(rotulos) for parte in [cubo[afetados]] + diferenca if len(parte)], ignore_index=True)
+    refeitos = juntos.groupby(dimensoes, sort=False, dropna=False)[[QTD, SOMA_RATING]].sum().reset_index()
+    return concatenar_mantendo_categorias(cubo[~afetados], refeitos[refeitos[QTD] != 0])
+
+def filtrar_cubo(cubo: pd.DataFrame, setor=None, loja=None) -> pd.DataFrame:
+    """Aplica os filtros da barra lateral sobre os grupos (não sobre as linhas originais)."""
+    if setor is not None:
+        cubo = cubo[cubo['Setor'] == setor]
+    if loja is not None:
+        cubo = cubo[cubo[config.COLS.LOCAL] == loja]
+    return cubo
+
+def _pesos(tabela: pd.DataFrame) -> pd.Series:
+    return tabela[QTD] if QTD in tabela.columns else pd.Series(1, index=tabela.index)
+
+def _soma_rating(tabela: pd.DataFrame) -> pd.Series:
+    return tabela[SOMA_RATING] if SOMA_RATING in tabela.columns else tabela[config.COLS.RATING]
+
+def _dia(tabela: pd.DataFrame) -> pd.Series:
+    return tabela[DIA] if DIA in tabela.columns else tabela[config.COLS.DATA].dt.normalize()
+
+def agregar_kpis(tabela: pd.DataFrame) -> dict:
+    """Total de feedbacks, rating médio e quantidade de negativos."""
+    pesos = _pesos(tabela)
+    total = int(pesos.sum())
+    return {
+        'total': total,
+        'rating_medio': _soma_rating(tabela).sum() / total if total else float('nan'),
+        'negativos': int(pesos[tabela[config.COLS.SENTIMENTO] == config.SENTIMENTS.NEG].sum()),
+    }
+
+def agregar_rating_diario(tabela: pd.DataFrame) -> pd.DataFrame:
+    """Quantidade e soma dos ratings por dia (base das tendências semanal e mensal)."""
+    diario = pd.DataFrame({QTD: _pesos(tabela), SOMA_RATING: _soma_rating(tabela)}).groupby(_dia(tabela)).sum()
+    diario.index.name = DIA
+    return diario
+
+def agregar_rating_mensal(tabela: pd.DataFrame) -> pd.Series:
+    """Rating médio por mês (meses sem feedback ficam NaN, como no resample das linhas)."""
+    mensal = agregar_rating_diario(tabela).resample('ME').sum()
+    return (mensal[SOMA_RATING] / mensal[QTD]).rename(config.COLS.RATING)
+
+def agregar_rating_por_dia_semana(tabela: pd.DataFrame) -> pd.Series:
+    """Rating médio por dia da semana, na ordem de config.DIAS_SEMANA_ORDEM e com nomes em português."""
+    diario = agregar_rating_diario(tabela)
+    semanal = diario.groupby(diario.index.day_name()).sum().reindex(config.DIAS_SEMANA_ORDEM)
+    rating_por_dia = semanal[SOMA_RATING] / semanal[QTD]
+    rating_por_dia.index = rating_por_dia.index.map(config.DIAS_SEMANA_PT)
+    return rating_por_dia
+
+def agregar_reclamacoes_por_subcategoria(tabela: pd.DataFrame) -> pd.DataFrame:
+    """Contagem de reclamações por subcategoria, em ordem decrescente, com o percentual acumulado (Pareto)."""
+    negativos = (tabela[config.COLS.SENTIMENTO] == config.SENTIMENTS.NEG) & tabela[config.COLS.SUBCATEGORIA].notna()
+    contagem = (
+        _pesos(tabela)[negativos]
+        .groupby(tabela.loc[negativos, config.COLS.SUBCATEGORIA], sort=False, observed=True).sum()
+        .sort_values(ascending=False, kind='stable')
+        .reset_index()
+    )
+    contagem.columns = ['Subcategoria', 'Contagem']
+    contagem['Percentual_Acumulado'] = (contagem['Contagem'].cumsum() / contagem['Contagem'].sum()) * 100
+    return contagem
+
+def _manter_maiores(chaves: pd.Series, pesos: pd.Series, maximo: int | None) -> pd.Series:
+    """Troca pelo rótulo de "Outros" as chaves fora das `maximo` de maior volume (o próprio "Outros" nunca é mantido)."""
+    chaves = chaves.astype(object)
+    volume = pesos.groupby(chaves).sum().drop(config.MAPA_CALOR_ROTULO_OUTROS, errors='ignore')
+    if maximo is None or len(volume) <= maximo:
+        return chaves
+    mantidas = volume.sort_values(ascending=False, kind='stable').index[:maximo]
+    return chaves.where(chaves.isin(mantidas), config.MAPA_CALOR_ROTULO_OUTROS)
+
+def _ordem_por_volume(totais: pd.Series) -> list:
+    """Rótulos do maior para o menor volume, com "Outros" no fim."""
+    ordem = totais.drop(config.MAPA_CALOR_ROTULO_OUTROS, errors='ignore').sort_values(ascending=False, kind='stable').index.tolist()
+    return ordem + [config.MAPA_CALOR_ROTULO_OUTROS] if config.MAPA_CALOR_ROTULO_OUTROS in totais.index else ordem
+
+def agregar_problemas_por_loja(tabela: pd.DataFrame, max_lojas: int | None = _PADRAO, max_subcategorias: int | None = _PADRAO) -> pd.DataFrame:
+    """
+    Tabela Loja × Subcategoria com a contagem de reclamações, das maiores para as menores. Só as `max_lojas`
+    lojas e `max_subcategorias` subcategorias de maior volume ganham linha ou coluna; as demais somam em
+    "Outros" (None: sem limite). Sem os parâmetros, vale config.MAPA_CALOR_MAX_* se config.MAPA_CALOR_SO_MAIORES
+    estiver ligado, e nenhum limite se não. A contagem é feita só sobre os pares que existem.
+    """
+    if max_lojas is _PADRAO:
+        max_lojas = config.MAPA_CALOR_MAX_LOJAS if config.MAPA_CALOR_SO_MAIORES else None
+    if max_subcategorias is _PADRAO:
+        max_subcategorias = config.MAPA_CALOR_MAX_SUBCATEGORIAS if config.MAPA_CALOR_SO_MAIORES else None
+    negativos = (
+        (tabela[config.COLS.SENTIMENTO] == config.SENTIMENTS.NEG) &
+        tabela[config.COLS.SUBCATEGORIA].notna() &
+        tabela[config.COLS.LOCAL].notna()
+    )
+    chaves = [tabela.loc[negativos, config.COLS.LOCAL], tabela.loc[negativos, config.COLS.SUBCATEGORIA]]
+    # contagem esparsa: uma linha por par (loja, subcategoria) que aparece nos dados
+    contagem = _pesos(tabela)[negativos].groupby(chaves, observed=True).sum()
+    if contagem.empty:
+        return pd.DataFrame(dtype='int64').rename_axis(index=config.COLS.LOCAL, columns=config.COLS.SUBCATEGORIA)
+    lojas = _manter_maiores(contagem.index.get_level_values(0).to_series(index=contagem.index), contagem, max_lojas)
+    subcategorias = _manter_maiores(contagem.index.get_level_values(1).to_series(index=contagem.index), contagem, max_subcategorias)
+    contagem = contagem.groupby([lojas.to_numpy(), subcategorias.to_numpy()]).sum()
+    # Int64 (ratings do Parquet) vira object no heatmap; a contagem cabe em int64
+    tabela_densa = contagem.unstack(fill_value=0).astype('int64')
+    tabela_densa = tabela_densa.loc[_ordem_por_volume(tabela_densa.sum(axis=1)), _ordem_por_volume(tabela_densa.sum(axis=0))]
+    return tabela_densa.rename_axis(index=config.COLS.LOCAL, columns=config.COLS.SUBCATEGORIA)
+
+def agregar_problemas_por_canal(tabela: pd.DataFrame) -> pd.DataFrame:
+    """Contagem de reclamações por Canal × Categoria (formato longo, na ordem de aparição)."""
+    negativos = (tabela[config.COLS.SENTIMENTO] == config.SENTIMENTS.NEG) & tabela[config.COLS.CATEGORIA].notna()
+    chaves = [tabela.loc[negativos, config.COLS.CANAL], tabela.loc[negativos, config.COLS.CATEGORIA]]
+    contagem = _pesos(tabela)[negativos].groupby(chaves, sort=False, observed=True).sum()
+    return contagem.rename(QTD).reset_index()
+
+def agregar_indicadores_por_loja(tabela: pd.DataFrame) -> pd.DataFrame:
+    """Por loja (na ordem de aparição): quantidade, soma dos ratings, negativos e urgência alta."""
+    pesos = _pesos(tabela)
+    indicadores = pd.DataFrame({
+        'qtd': pesos,
+        'soma_rating': _soma_rating(tabela),
+        'qtd_negativo': pesos.where(tabela[config.COLS.SENTIMENTO] == config.SENTIMENTS.NEG, 0),
+        'qtd_urgencia_alta': pesos.where(tabela[config.COLS.URGENCIA] == config.URGENCIA.ALTA, 0),
+    })
+    return indicadores.groupby(tabela[config.COLS.LOCAL], sort=False, observed=True).sum()
@@ -0,0 +1,57 @@
+import threading
+import pandas as pd
+from . import config
+from . import armazenamento
+from . import analise
+from . import cubo
+from . import instrumentacao
+
+# Feedbacks e cubo mantidos em memória pelo dashboard. A cada execução do script, `atualizar` compara a
+# versão dos dados (armazenamento.versao_dados) com a já carregada e, se mudou, lê só as linhas novas ou
+# alteradas e as junta ao DataFrame e ao cubo. Releitura completa só na primeira vez ou quando o
+# armazenamento não permite ler a diferença (ex.: CSV reescrito pela classificação).
+
+class DadosIncrementais:
+    """
+    Estado compartilhado entre as sessões do dashboard (um por processo, via st.cache_resource).
+    O DataFrame e o cubo nunca são alterados no lugar: cada atualização cria objetos novos,
+    então quem ainda está desenhando com a versão anterior não é afetado.
+    """
+
+    def __init__(self, colunas: list | None = None):
+        self.colunas = colunas
+        self.df = None
+        self.cubo = None
+        self.versao = None
+        self.atualizado_em = None
+        self.ultima_atualizacao = None
+        self._lock = threading.Lock()
+
+    @instrumentacao.instrumentar('DadosIncrementais.atualizar')
+    def atualizar(self) -> tuple:
+        """Sincroniza com o armazenamento e retorna (df, cubo, versão, atualizado_em)."""
+        with self._lock:
+            versao = armazenamento.versao_dados()
+            if versao is None:
+                self.df = self.cubo = self.versao = self.atualizado_em = None
+            elif versao != self.versao:
+                self._aplicar(*armazenamento.carregar_alteracoes(self.versao if self.df is not None else None, self.colunas))
+            return self.df, self.cubo, self.versao, self.atualizado_em
+
+    def _aplicar(self, alteradas: pd.DataFrame | None, versao: tuple | None, completo: bool):
+        lidas = 0 if alteradas is None else len(alteradas)
+        if completo:
+            self.df = None if alteradas is None else analise.preparar_dados(alteradas, self.colunas)
+            self.cubo = None if self.df is None else cubo.construir_cubo(self.df)
+        elif lidas:
+            alteradas = alteradas.drop_duplicates(config.COLS.ID, keep='last')
+            substituidas = self.df[config.COLS.ID].isin(alteradas[config.COLS.ID])
+            novas = analise.preparar_dados(alteradas, self.colunas)
+            alteradas_antes = self.df[substituidas] if substituidas.any() else self.df.iloc[:0]
+            mantidas = self.df[~substituidas] if len(alteradas_antes) else self.df
+            self.cubo = cubo.atualizar_cubo(self.cubo, novas, alteradas_antes)
+            self.df = cubo.concatenar_mantendo_categorias(mantidas, novas)
+        self.versao = versao
+        if completo or lidas:
+            self.atualizado_em = pd.Timestamp.now().floor('s')
+            self.ultima_atualizacao = {'linhas_lidas': lidas, 'completa': completo}
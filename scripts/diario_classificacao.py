@@ -0,0 +1,72 @@
+import json
+import os
+import time
+from . import config
+
+class DiarioDeClassificacoes:
+    """
+    Diário append-only (JSON Lines) com os resultados já pagos da classificação.
+    Cada confirmação grava só o lote acumulado (custo O(lote)); em caso de queda,
+    a próxima execução lê o diário e pula direto para as linhas que faltam.
+    """
+
+    def __init__(self, caminho=None, a_cada_linhas: int | None = None, a_cada_segundos: float | None = None):
+        self.caminho = caminho or config.ARQUIVO_DIARIO_IA
+        self.a_cada_linhas = a_cada_linhas or config.DIARIO_CONFIRMAR_A_CADA_LINHAS
+        self.a_cada_segundos = a_cada_segundos or config.DIARIO_CONFIRMAR_A_CADA_SEGUNDOS
+        self._pendentes = []
+        self._ultima_confirmacao = time.monotonic()
+
+    def ler(self) -> dict:
+        """Retorna ID -> campos de todos os resultados confirmados (o último registro de cada ID vence)."""
+        resultados = {}
+        if not os.path.exists(self.caminho):
+            return resultados
+        with open(self.caminho, encoding='utf-8') as arquivo:
+            for linha in arquivo:
+                try:
+                    registro = json.loads(linha)
+                except json.JSONDecodeError:
+                    # última linha pode ter ficado pela metade numa queda
+                    continue
+                resultados[registro['ID']] = registro['campos']
+        return resultados
+
+    def registrar(self, id_feedback, campos: dict):
+        """Acumula um resultado e confirma o lote quando atingir K linhas ou T segundos."""
+        self._pendentes.append(json.dumps({'ID': str(id_feedback), 'campos': campos}, ensure_ascii=False))
+        if len(self._pendentes) >= self.a_cada_linhas:
+            self.confirmar()
+        else:
+            self.confirmar_se_vencido()
+
+    def segundos_para_confirmar(self) -> float | None:
+        """Quanto falta para o prazo de T segundos do lote acumulado (None se não há nada pendente)."""
+        if not self._pendentes:
+            return None
+        return max(0.0, self._ultima_confirmacao + self.a_cada_segundos - time.monotonic())
+
+    def confirmar_se_vencido(self):
+        """
+        Confirma o lote se o prazo de T segundos já passou. Quem espera resultados deve chamar também
+        enquanto não chegam linhas novas (ex.: API lenta ou em backoff), para o prazo valer mesmo assim.
+        """
+        if self.segundos_para_confirmar() == 0.0:
+            self.confirmar()
+
+    def confirmar(self):
+        """Anexa o lote acumulado ao diário e força a gravação em disco."""
+        self._ultima_confirmacao = time.monotonic()
+        if not self._pendentes:
+            return
+        with open(self.caminho, 'a', encoding='utf-8') as arquivo:
+            arquivo.write("\n".join(self._pendentes) + "\n")
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+        self._pendentes = []
+
+    def descartar(self):
+        """Apaga o diário depois que os resultados foram incorporados ao arquivo principal."""
+        self._pendentes = []
+        if os.path.exists(self.caminho):
+            os.remove(self.caminho)
@@ -0,0 +1,225 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+import pandas as pd
+from . import config
+from . import armazenamento
+from . import instrumentacao
+from . import classificador_ia
+
+# Fila de trabalho para vários classificadores em paralelo. Cada feedback pendente vira uma linha da fila
+# (SQLite em config.ARQUIVO_FILA_IA) que passa por:
+#   pendente -> reservado (dono + prazo) -> classificado (campos já pagos) -> gravado (no armazenamento)
+# A reserva é atômica (BEGIN IMMEDIATE), então dois trabalhadores nunca pegam o mesmo lote; um lote cujo
+# prazo venceu sem renovação volta a ser pendente. A gravação no armazenamento também acontece dentro de
+# uma transação da fila, uma de cada vez, e só para linhas ainda não gravadas: repetir é inofensivo.
+
+class FilaDeClassificacoes:
+    """Fila persistente com reservas por prazo; segura entre processos (cada um abre a sua)."""
+
+    def __init__(self, caminho=None, duracao_reserva: float | None = None):
+        self.caminho = caminho or config.ARQUIVO_FILA_IA
+        self.duracao_reserva = duracao_reserva or config.FILA_IA_DURACAO_RESERVA_SEGUNDOS
+        os.makedirs(os.path.dirname(os.path.abspath(self.caminho)), exist_ok=True)
+        with self._transacao() as conexao:
+            conexao.execute("""
+                CREATE TABLE IF NOT EXISTS fila (
+                    "ID" TEXT PRIMARY KEY,
+                    "Texto_Original" TEXT,
+                    "Setor" TEXT,
+                    estado TEXT NOT NULL,
+                    dono TEXT,
+                    expira_em REAL,
+                    campos TEXT,
+                    gravado_em REAL
+                )""")
+            conexao.execute("CREATE INDEX IF NOT EXISTS idx_fila_estado ON fila (estado, expira_em)")
+
+    def _conectar(self) -> sqlite3.Connection:
+        # sem transações implícitas: cada operação abre a sua com BEGIN IMMEDIATE
+        conexao = sqlite3.connect(self.caminho, timeout=60, isolation_level=None)
+        conexao.execute("PRAGMA journal_mode=WAL")
+        return conexao
+
+    @contextmanager
+    def _transacao(self):
+        """Transação com o bloqueio de escrita já no início, para ler e atualizar sem outro trabalhador no meio."""
+        conexao = self._conectar()
+        try:
+            conexao.execute("BEGIN IMMEDIATE")
+            try:
+                yield conexao
+            except BaseException:
+                conexao.execute("ROLLBACK")
+                raise
+            conexao.execute("COMMIT")
+        finally:
+            conexao.close()
+
+    @instrumentacao.instrumentar('FilaDeClassificacoes.abastecer')
+    def abastecer(self) -> int | None:
+        """
+        Põe na fila os pendentes do armazenamento que ainda não estão nela (e os gravados que voltaram a
+        ser pendentes, ex.: falhas). Retorna quantos aguardam reserva, ou None se os dados não existem.
+        """
+        instante = time.time()
+        pendentes = armazenamento.carregar_pendentes()
+        if pendentes is None:
+            return None
+        linhas = pendentes[['ID', 'Texto_Original', 'Setor']].astype(object)
+        linhas = linhas.where(linhas.notna(), None)
+        with self._transacao() as conexao:
+            # gravado depois da leitura acima = a leitura é que está desatualizada, não volta para a fila
+            conexao.executemany("""
+                INSERT INTO fila ("ID", "Texto_Original", "Setor", estado) VALUES (?, ?, ?, 'pendente')
+                ON CONFLICT("ID") DO UPDATE SET estado = 'pendente', dono = NULL, expira_em = NULL, campos = NULL, gravado_em = NULL
+                WHERE estado = 'gravado' AND gravado_em < ?
+            """, ((str(id_feedback), texto, setor, instante) for id_feedback, texto, setor in linhas.itertuples(index=False, name=None)))
+            return conexao.execute("SELECT COUNT(*) FROM fila WHERE estado IN ('pendente', 'reservado')").fetchone()[0]
+
+    def reservar(self, dono: str, quantidade: int) -> pd.DataFrame:
+        """Reserva até `quantidade` pendentes para `dono` (devolvendo antes à fila as reservas vencidas)."""
+        agora = time.time()
+        with self._transacao() as conexao:
+            devolvidos = conexao.execute(
+                "UPDATE fila SET estado = 'pendente', dono = NULL, expira_em = NULL WHERE estado = 'reservado' AND expira_em < ?", (agora,)
+            ).rowcount
+            if devolvidos:
+                print(f"⏰ {devolvidos} feedbacks com reserva vencida voltaram para a fila.")
+            linhas = conexao.execute(
+                """SELECT "ID", "Texto_Original", "Setor" FROM fila WHERE estado = 'pendente' LIMIT ?""", (quantidade,)
+            ).fetchall()
+            conexao.executemany(
+                """UPDATE fila SET estado = 'reservado', dono = ?, expira_em = ? WHERE "ID" = ?""",
+                ((dono, agora + self.duracao_reserva, linha[0]) for linha in linhas)
+            )
+        return pd.DataFrame(linhas, columns=['ID', 'Texto_Original', 'Setor'])
+
+    def renovar(self, dono: str) -> int:
+        """Estende o prazo das reservas do dono; retorna quantas ele ainda tem."""
+        with self._transacao() as conexao:
+            return conexao.execute(
+                "UPDATE fila SET expira_em = ? WHERE estado = 'reservado' AND dono = ?", (time.time() + self.duracao_reserva, dono)
+            ).rowcount
+
+    @contextmanager
+    def manter_reserva(self, dono: str, a_cada_segundos: float | None = None):
+        """Renova as reservas do dono numa thread em segundo plano enquanto o bloco executa."""
+        a_cada_segundos = a_cada_segundos or config.FILA_IA_RENOVAR_A_CADA_SEGUNDOS
+        parar = threading.Event()
+
+        def renovar_periodicamente():
+            while not parar.wait(a_cada_segundos):
+                try:
+                    self.renovar(dono)
+                except sqlite3.Error as e:
+                    print(f"⚠️  Não foi possível renovar a reserva: {e}")
+
+        thread = threading.Thread(target=renovar_periodicamente, daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            parar.set()
+            thread.join()
+
+    def liberar(self, dono: str) -> int:
+        """Devolve à fila o que o dono reservou e não classificou (ex.: execução interrompida)."""
+        with self._transacao() as conexao:
+            return conexao.execute(
+                "UPDATE fila SET estado = 'pendente', dono = NULL, expira_em = NULL WHERE estado = 'reservado' AND dono = ?", (dono,)
+            ).rowcount
+
+    def guardar_resultados(self, resultados: dict) -> int:
+        """
+        Guarda os campos classificados (ID -> campos) na fila. Vale o primeiro resultado de cada ID:
+        um repetido (reserva vencida e refeita por outro) é ignorado. Retorna quantos foram aceitos.
+        """
+        with self._transacao() as conexao:
+            return sum(conexao.execute(
+                """UPDATE fila SET estado = 'classificado', dono = NULL, expira_em = NULL, campos = ?
+                   WHERE "ID" = ? AND estado IN ('pendente', 'reservado')""",
+                (json.dumps(campos, ensure_ascii=False), str(id_feedback))
+            ).rowcount for id_feedback, campos in resultados.items())
+
+    @instrumentacao.instrumentar('FilaDeClassificacoes.gravar')
+    def gravar(self) -> int | None:
+        """
+        Grava no armazenamento tudo o que está classificado e ainda não foi gravado, inclusive o de
+        trabalhadores que caíram. Retorna quantos foram gravados, ou None se a gravação falhou.
+        """
+        try:
+            with self._transacao() as conexao:
+                linhas = conexao.execute("""SELECT "ID", campos FROM fila WHERE estado = 'classificado'""").fetchall()
+                if linhas:
+                    armazenamento.salvar_classificacoes({id_feedback: json.loads(campos) for id_feedback, campos in linhas})
+                    conexao.execute("UPDATE fila SET estado = 'gravado', campos = NULL, gravado_em = ? WHERE estado = 'classificado'", (time.time(),))
+        except Exception as e:
+            print(f"\n❌ Erro ao gravar os resultados da fila no armazenamento: {e}")
+            print(f"   Eles continuam em '{self.caminho}' e serão gravados pelo próximo trabalhador.")
+            return None
+        return len(linhas)
+
+    def estatisticas(self) -> dict:
+        """Quantidade de feedbacks em cada estado."""
+        conexao = self._conectar()
+        try:
+            return dict(conexao.execute("SELECT estado, COUNT(*) FROM fila GROUP BY estado").fetchall())
+        finally:
+            conexao.close()
+
+def _nome_do_trabalhador() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+@instrumentacao.instrumentar()
+def executar_trabalhador(tamanho_reserva: int | None = None, max_simultaneas: int | None = None,
+                         requisicoes_por_segundo: float | None = None) -> dict | None:
+    """
+    Trabalhador da fila: reserva lotes de pendentes, classifica (guardando cada leva na fila assim que
+    termina), grava no armazenamento e repete até a fila esvaziar. Vários podem rodar ao mesmo tempo.
+    Retorna as contagens do que este trabalhador classificou, ou None se os dados não puderam ser lidos ou gravados.
+    """
+    tamanho_reserva = tamanho_reserva or config.FILA_IA_TAMANHO_RESERVA
+    dono = _nome_do_trabalhador()
+    fila = FilaDeClassificacoes()
+    aguardando = fila.abastecer()
+    if aguardando is None:
+        print(f"Erro: O arquivo '{config.NOME_ARQUIVO_CSV}' não foi encontrado.")
+        return None
+    print(f"📥 Trabalhador {dono}: {aguardando} feedbacks na fila.")
+
+    resultados = {}
+    total = 0
+    while True:
+        reservados = fila.reservar(dono, tamanho_reserva)
+        if reservados.empty:
+            break
+        total += len(reservados)
+        print(f"\n📦 {len(reservados)} feedbacks reservados por {dono}.")
+        with fila.manter_reserva(dono):
+            lote = classificador_ia.classificar_feedbacks(reservados, max_simultaneas, requisicoes_por_segundo,
+                                                          ao_classificar_lote=fila.guardar_resultados)
+        fila.guardar_resultados(lote) # a última leva, se a execução foi interrompida antes de entregá-la
+        resultados.update(lote)
+        interrompido = len(lote) < len(reservados)
+        if interrompido and (devolvidos := fila.liberar(dono)):
+            print(f"↩️  {devolvidos} feedbacks não classificados voltaram para a fila.")
+        gravados = fila.gravar()
+        if gravados is None:
+            return None
+        print(f"💾 {gravados} feedbacks gravados no armazenamento ({config.BACKEND_ARMAZENAMENTO}).")
+        if interrompido:
+            break
+
+    print(f"\n📊 Fila: {fila.estatisticas()}")
+    if not total:
+        print("✅ Nenhum novo feedback para classificar.")
+    return classificador_ia.resumir_resultados(total, resultados)
+
+if __name__ == '__main__':
+    executar_trabalhador()
@@ -1,94 +1,194 @@
-import random
-import uuid
+import functools
 import os
+import re
+import string
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
 from faker import Faker
 from . import config
-
-# inicializa o faker com a localidade definida no config
-faker = Faker(config.FAKER_LOCALE)
-
-def gerar_feedbacks_com_faker(n: int, setor: str) -> list:
-    """Gera uma lista de feedbacks fictícios usando parâmetros do config."""
-    if setor not in ['hotelaria', 'material_construcao']:
+from . import armazenamento
+
+SETORES = ['hotelaria', 'material_construcao']
+_UNIDADES_DATA = {'y': 'years', 'w': 'weeks', 'd': 'days', 'h': 'hours', 'm': 'minutes', 's': 'seconds'}
+_HEXADECIMAL = np.array([ord(c) for c in '0123456789abcdef'], dtype=np.uint32)
+
+def _converter_data(valor) -> pd.Timestamp:
+    """Aceita o formato relativo do Faker ('-1y', '-30d', 'now') ou uma data absoluta."""
+    agora = pd.Timestamp.now().floor('s')
+    if valor == 'now':
+        return agora
+    relativo = re.fullmatch(r'([+-]?\d+)([ywdhms])', str(valor))
+    if relativo:
+        return agora + pd.DateOffset(**{_UNIDADES_DATA[relativo.group(2)]: int(relativo.group(1))})
+    return pd.Timestamp(valor)
+
+def criar_pools_de_nomes(semente: int | None = None, tamanho: int | None = None) -> dict:
+    """Sorteia uma vez, com o Faker, os nomes usados nos textos e nos nomes de lojas/hotéis."""
+    tamanho = tamanho or config.GERADOR_TAMANHO_POOL_NOMES
+    gerador = Faker(config.FAKER_LOCALE)
+    gerador.seed_instance(semente)
+    return {
+        'nome': np.array([gerador.name() for _ in range(tamanho)], dtype=object),
+        'sobrenome': np.array([gerador.last_name() for _ in range(tamanho)], dtype=object),
+        'palavra': np.array([gerador.word().capitalize() for _ in range(tamanho)], dtype=object),
+    }
+
+@functools.cache
+def _pools_padrao(semente: int | None, tamanho: int, locale: str) -> dict:
+    """Pools do config, criados pelo Faker na primeira chamada e reutilizados nas seguintes (por semente, tamanho e idioma)."""
+    return criar_pools_de_nomes(semente, tamanho)
+
+def _sortear(rng: np.random.Generator, valores, n: int) -> np.ndarray:
+    valores = np.asarray(valores, dtype=object)
+    return valores[rng.integers(0, len(valores), n)]
+
+def _gerar_uuids(n: int) -> np.ndarray:
+    """
+    UUID4 formatados sem laço em Python. Os bytes vêm de os.urandom e não da semente: repetir
+    a geração com a mesma semente não pode anexar IDs que já existem (os resultados são gravados por ID).
+    """
+    octetos = np.frombuffer(os.urandom(16 * n), dtype=np.uint8).reshape(n, 16).copy()
+    octetos[:, 6] = (octetos[:, 6] & 0x0F) | 0x40 # versão 4
+    octetos[:, 8] = (octetos[:, 8] & 0x3F) | 0x80 # variante RFC 4122
+    digitos = _HEXADECIMAL[np.stack([octetos >> 4, octetos & 0x0F], axis=2).reshape(n, 32)]
+    digitos = np.insert(digitos, [8, 12, 16, 20], ord('-'), axis=1)
+    return np.ascontiguousarray(digitos).view('<U36').ravel()
+
+def _preencher_templates(templates: list, escolhidos: np.ndarray, campos: dict) -> np.ndarray:
+    """Monta os textos template a template, concatenando colunas inteiras em vez de chamar format() por linha."""
+    textos = np.empty(len(escolhidos), dtype=object)
+    for i, template in enumerate(templates):
+        linhas = np.flatnonzero(escolhidos == i)
+        if len(linhas) == 0:
+            continue
+        texto = np.full(len(linhas), '', dtype=object)
+        for literal, campo, _, _ in string.Formatter().parse(template):
+            texto = texto + literal
+            if campo is not None:
+                texto = texto + campos[campo][linhas]
+        textos[linhas] = texto
+    return textos
+
+def gerar_bloco_de_feedbacks(n: int, setor: str, rng: np.random.Generator, pools: dict,
+                             inicio: pd.Timestamp, fim: pd.Timestamp) -> pd.DataFrame:
+    """Gera `n` feedbacks fictícios de um setor com operações vetorizadas do NumPy."""
+    ratings = rng.integers(1, 6, n)
+    tom = np.where(ratings >= 4, 0, np.where(ratings == 3, 1, 2))
+
+    # todos os templates do setor numa lista só; cada tom sorteia dentro da sua faixa
+    textos_setor = config.TEXTOS_FEEDBACK[setor]
+    grupos = [textos_setor['positivo'], textos_setor['neutro'], textos_setor['negativo']]
+    templates = [template for grupo in grupos for template in grupo]
+    tamanhos = np.array([len(grupo) for grupo in grupos])
+    inicios = np.concatenate([[0], np.cumsum(tamanhos)[:-1]])
+    escolhidos = inicios[tom] + (rng.random(n) * tamanhos[tom]).astype(int)
+
+    if setor == 'hotelaria':
+        locais = 'Hotel ' + _sortear(rng, pools['sobrenome'], n) + ' ' + _sortear(rng, config.SUFIXOS_HOTEIS, n)
+    else:
+        locais = (_sortear(rng, config.PREFIXOS_LOJAS, n) + ' ' + _sortear(rng, pools['palavra'], n) + ' '
+                  + _sortear(rng, config.SUFIXOS_LOJAS, n))
+
+    campos = {
+        'nome': _sortear(rng, pools['nome'], n),
+        'local': locais,
+        'produto': _sortear(rng, config.LISTA_PRODUTOS_CONSTRUCAO, n),
+    }
+    segundos = rng.integers(0, max(1, int((fim - inicio).total_seconds())), n)
+    datas = (inicio + pd.to_timedelta(segundos, unit='s')).strftime('%Y-%m-%d %H:%M:%S')
+
+    return pd.DataFrame({
+        'ID': _gerar_uuids(n),
+        'Setor': setor.replace('_', ' ').title(),
+        'Canal': _sortear(rng, config.CANAIS_FEEDBACK, n),
+        'Data': datas,
+        'Rating': ratings,
+        'Local_Loja': locais,
+        'Texto_Original': _preencher_templates(templates, escolhidos, campos),
+    })
+
+def gerar_feedbacks_com_faker(n: int, setor: str, pools: dict | None = None) -> list:
+    """
+    Gera uma lista de feedbacks fictícios usando parâmetros do config. Sem `pools`, usa os de
+    _pools_padrao, então chamadas repetidas (por setor, em laço) não voltam a acionar o Faker.
+    """
+    if setor not in SETORES:
         print(f"Alerta: Setor '{setor}' inválido. Ignorando.")
         return []
-
-    # dicionário de textos do config
-    textos_feedback = config.TEXTOS_FEEDBACK
-    
-    def gerar_nome_hotel():
-      return f"Hotel {faker.last_name()} {random.choice(config.SUFIXOS_HOTEIS)}"
-
-    def gerar_nome_loja_construcao():
-      prefixo = random.choice(config.PREFIXOS_LOJAS)
-      sufixo = random.choice(config.SUFIXOS_LOJAS)
-      return f"{prefixo} {faker.word().capitalize()} {sufixo}"
-
-    feedbacks_gerados = []
-
-    for _ in range(n):
-        rating = faker.random_int(min=1, max=5)
-        categoria_texto = 'positivo' if rating >= 4 else 'neutro' if rating == 3 else 'negativo'
-        
-        local_gerado = gerar_nome_hotel() if setor == 'hotelaria' else gerar_nome_loja_construcao()
-        texto_template = random.choice(textos_feedback[setor][categoria_texto])
-        
-        texto_final = texto_template.format(
-            nome=faker.name(), 
-            local=local_gerado, 
-            produto=random.choice(config.LISTA_PRODUTOS_CONSTRUCAO)
-        )
-
-        feedback = {
-            'ID': str(uuid.uuid4()),
-            'Setor': setor.replace('_', ' ').title(),
-            'Canal': random.choice(config.CANAIS_FEEDBACK),
-            'Data': faker.date_time_between(start_date=config.FEEDBACK_START_DATE, end_date='now').strftime('%Y-%m-%d %H:%M:%S'),
-            'Rating': rating,
-            'Local_Loja': local_gerado,
-            'Texto_Original': texto_final
-        }
-        feedbacks_gerados.append(feedback)
-
-    return feedbacks_gerados
-
-
-def adicionar_novos_feedbacks(num_hotel: int, num_construcao: int):
+    if pools is None:
+        pools = _pools_padrao(config.GERADOR_SEMENTE, config.GERADOR_TAMANHO_POOL_NOMES, config.FAKER_LOCALE)
+    bloco = gerar_bloco_de_feedbacks(n, setor, np.random.default_rng(config.GERADOR_SEMENTE), pools,
+                                     _converter_data(config.FEEDBACK_START_DATE), _converter_data('now'))
+    return bloco.to_dict('records')
+
+def _gerar_bloco(tarefa: tuple) -> pd.DataFrame:
+    """Ponto de entrada dos processos do pool (precisa ser uma função de módulo)."""
+    n, setor, semente, pools, inicio, fim = tarefa
+    return gerar_bloco_de_feedbacks(n, setor, np.random.default_rng(semente), pools, inicio, fim)
+
+def _gerar_blocos(tarefas: list, processos: int):
+    """Gera os blocos na ordem das tarefas; com pool, mantém no máximo 2 blocos por processo em memória."""
+    if processos <= 1:
+        for tarefa in tarefas:
+            yield _gerar_bloco(tarefa)
+        return
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        em_andamento = deque()
+        for tarefa in tarefas:
+            em_andamento.append(executor.submit(_gerar_bloco, tarefa))
+            if len(em_andamento) >= 2 * processos:
+                yield em_andamento.popleft().result()
+        while em_andamento:
+            yield em_andamento.popleft().result()
+
+def adicionar_novos_feedbacks(num_hotel: int, num_construcao: int, semente: int | None = None,
+                              tamanho_bloco: int | None = None, processos: int | None = None) -> int | None:
     """
-    Gera uma quantidade definida de feedbacks para cada setor e os adiciona ao arquivo CSV.
+    Gera uma quantidade definida de feedbacks para cada setor e os adiciona ao armazenamento,
+    bloco a bloco. Com a mesma semente e o mesmo tamanho de bloco, os feedbacks se repetem, exceto
+    os IDs, sempre novos (as datas continuam relativas ao dia da geração, conforme FEEDBACK_START_DATE).
+    Retorna quantos foram gravados, ou None se a gravação falhou.
     """
+    semente = config.GERADOR_SEMENTE if semente is None else semente
+    tamanho_bloco = tamanho_bloco or config.GERADOR_TAMANHO_BLOCO
+    processos = processos or config.GERADOR_PROCESSOS
     print(f"Iniciando geração de {num_hotel} feedbacks de hotelaria e {num_construcao} de construção...")
 
-    # parâmetros recebidos em vez dos valores do config
-    feedbacks_hoteleiros = gerar_feedbacks_com_faker(num_hotel, 'hotelaria')
-    feedbacks_construcao = gerar_feedbacks_com_faker(num_construcao, 'material_construcao')
+    inicio, fim = _converter_data(config.FEEDBACK_START_DATE), _converter_data('now')
+    pools = criar_pools_de_nomes(semente)
+    quantidades = [(n_bloco, setor)
+                   for quantidade, setor in [(num_hotel, 'hotelaria'), (num_construcao, 'material_construcao')]
+                   for n_bloco in [tamanho_bloco] * (quantidade // tamanho_bloco) + [quantidade % tamanho_bloco]
+                   if n_bloco > 0]
 
-    todos_novos_feedbacks = feedbacks_hoteleiros + feedbacks_construcao
-    
     # se feedback foi realmente gerado
-    if not todos_novos_feedbacks:
+    if not quantidades:
         print("Nenhum feedback foi gerado. Operação cancelada.")
-        return
+        return 0
 
-    novos_feedbacks_df = pd.DataFrame(todos_novos_feedbacks)
+    # uma semente derivada por bloco: o resultado não depende de quantos processos foram usados
+    sementes = np.random.SeedSequence(semente).spawn(len(quantidades))
+    tarefas = [(n_bloco, setor, semente_bloco, pools, inicio, fim) for (n_bloco, setor), semente_bloco in zip(quantidades, sementes)]
 
+    gravados = 0
     try:
-        if os.path.exists(config.NOME_ARQUIVO_CSV):
-            print(f"Adicionando {len(novos_feedbacks_df)} novos feedbacks ao arquivo existente...")
-            novos_feedbacks_df.to_csv(config.NOME_ARQUIVO_CSV, mode='a', index=False, sep=';', header=False, encoding='utf-8')
-        else:
-            print(f"Arquivo '{config.NOME_ARQUIVO_CSV}' não encontrado. Criando novo arquivo...")
-            novos_feedbacks_df.to_csv(config.NOME_ARQUIVO_CSV, index=False, sep=';', encoding='utf-8')
-            
-        print(f"\n✅ Sucesso! {len(novos_feedbacks_df)} novos feedbacks foram adicionados.")
+        for bloco in _gerar_blocos(tarefas, processos):
+            armazenamento.anexar_feedbacks(bloco)
+            gravados += len(bloco)
+            if len(tarefas) > 1:
+                print(f"  -> {gravados}/{num_hotel + num_construcao} feedbacks gravados...")
+        print(f"\n✅ Sucesso! {gravados} novos feedbacks foram adicionados.")
+        return gravados
     except Exception as e:
         print(f"\n❌ Ocorreu um erro ao salvar o arquivo: {e}")
         print("Verifique se o arquivo não está aberto em outro programa.")
+        return None
 
 
 if __name__ == '__main__':
     adicionar_novos_feedbacks(
-        num_hotel=config.NOVOS_FEEDBACKS_HOTELARIA, 
+        num_hotel=config.NOVOS_FEEDBACKS_HOTELARIA,
         num_construcao=config.NOVOS_FEEDBACKS_CONSTRUCAO
-    )
\ No newline at end of file
+    )
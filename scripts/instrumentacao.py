@@ -0,0 +1,160 @@
+import contextvars
+import functools
+import json
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+import pandas as pd
+from . import config
+
+# Camada leve de medição: spans aninhados com duração, linhas de entrada/saída e variação de memória.
+# Desligada (padrão), medir() e @instrumentar custam só a checagem da flag.
+# Cada registro vira uma linha JSON em config.ARQUIVO_INSTRUMENTACAO.
+
+_ativa_no_contexto = contextvars.ContextVar('instrumentacao_ativa', default=None)
+_coletor = contextvars.ContextVar('instrumentacao_coletor', default=None)
+_rodada = contextvars.ContextVar('instrumentacao_rodada', default=None)
+_pilhas = threading.local()
+_lock = threading.Lock()
+_buffer = []
+
+def ativa() -> bool:
+    """Ligada para o contexto atual (painel do dashboard) ou globalmente pelo config."""
+    valor = _ativa_no_contexto.get()
+    return config.INSTRUMENTACAO_ATIVA if valor is None else valor
+
+class _SpanNulo:
+    def registrar(self, **atributos):
+        pass
+
+_SPAN_NULO = _SpanNulo()
+
+class Span:
+    """Um trecho medido; `registrar` acrescenta atributos (ex.: linhas=len(df)) ao registro."""
+
+    def __init__(self, nome: str, atributos: dict):
+        self.nome = nome
+        self.atributos = atributos
+
+    def registrar(self, **atributos):
+        self.atributos.update(atributos)
+
+def _pilha() -> list:
+    if not hasattr(_pilhas, 'spans'):
+        _pilhas.spans = []
+    return _pilhas.spans
+
+def _memoria_atual() -> int | None:
+    if not config.INSTRUMENTACAO_MEDIR_MEMORIA:
+        return None
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    return tracemalloc.get_traced_memory()[0]
+
+def _emitir(registro: dict, fim_da_raiz: bool):
+    coletor = _coletor.get()
+    if coletor is not None:
+        coletor.append(registro)
+    with _lock:
+        _buffer.append(registro)
+        if fim_da_raiz or len(_buffer) >= 100:
+            _descarregar_sem_lock()
+
+def _descarregar_sem_lock():
+    global _buffer
+    if not _buffer:
+        return
+    try:
+        with open(config.ARQUIVO_INSTRUMENTACAO, 'a', encoding='utf-8') as arquivo:
+            arquivo.write(''.join(json.dumps(registro, ensure_ascii=False, default=str) + '\n' for registro in _buffer))
+    except OSError as e:
+        print(f"⚠️  Não foi possível gravar a instrumentação em '{config.ARQUIVO_INSTRUMENTACAO}': {e}")
+    _buffer = []
+
+def descarregar():
+    """Grava os registros pendentes no arquivo."""
+    with _lock:
+        _descarregar_sem_lock()
+
+@contextmanager
+def medir(nome: str, **atributos):
+    """Mede o bloco `with`; aninhado em outro span, o registro guarda o nome do pai."""
+    if not ativa():
+        yield _SPAN_NULO
+        return
+
+    pilha = _pilha()
+    span = Span(nome, atributos)
+    pai = pilha[-1].nome if pilha else None
+    pilha.append(span)
+    memoria_antes = _memoria_atual()
+    inicio_relogio = time.time()
+    inicio = time.perf_counter()
+    try:
+        yield span
+    except BaseException as e:
+        span.atributos['erro'] = type(e).__name__
+        raise
+    finally:
+        duracao = time.perf_counter() - inicio
+        pilha.pop()
+        registro = {
+            'nome': nome,
+            'pai': pai,
+            'nivel': len(pilha),
+            'rodada': _rodada.get(),
+            'inicio': round(inicio_relogio, 6),
+            'duracao_ms': round(duracao * 1000, 3),
+            'thread': threading.current_thread().name,
+        }
+        if memoria_antes is not None:
+            registro['memoria_delta_mb'] = round((_memoria_atual() - memoria_antes) / 2 ** 20, 3)
+        registro.update(span.atributos)
+        _emitir(registro, fim_da_raiz=not pilha)
+
+def _tamanho(valor) -> int | None:
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        return len(valor)
+    if isinstance(valor, tuple) and valor and isinstance(valor[0], (pd.DataFrame, pd.Series)):
+        return len(valor[0])
+    return None
+
+def instrumentar(nome: str | None = None):
+    """Decorator: mede a função e registra as linhas do primeiro argumento e do retorno (se forem DataFrames)."""
+    def decorador(funcao):
+        nome_span = nome or funcao.__name__
+
+        @functools.wraps(funcao)
+        def envolvida(*args, **kwargs):
+            if not ativa():
+                return funcao(*args, **kwargs)
+            with medir(nome_span) as span:
+                if args and (linhas_entrada := _tamanho(args[0])) is not None:
+                    span.registrar(linhas_entrada=linhas_entrada)
+                resultado = funcao(*args, **kwargs)
+                if (linhas := _tamanho(resultado)) is not None:
+                    span.registrar(linhas=linhas)
+                return resultado
+        return envolvida
+    return decorador
+
+def iniciar_coleta(ativar: bool = True) -> list:
+    """
+    Liga (ou desliga) a instrumentação só para o contexto atual, ex.: uma execução do script do Streamlit,
+    e devolve a lista que recebe os registros emitidos nele.
+    """
+    registros = []
+    _ativa_no_contexto.set(True if ativar else None)
+    _coletor.set(registros if ativar else None)
+    _rodada.set(uuid.uuid4().hex[:8] if ativar else None)
+    return registros
+
+def resumo(registros: list) -> pd.DataFrame:
+    """Tabela dos registros na ordem em que os spans começaram."""
+    if not registros:
+        return pd.DataFrame(columns=['nome', 'pai', 'duracao_ms'])
+    df = pd.DataFrame(registros).sort_values('inicio', kind='stable')
+    colunas = [col for col in ['nome', 'pai', 'duracao_ms', 'linhas_entrada', 'linhas', 'memoria_delta_mb', 'erro'] if col in df.columns]
+    return df[colunas].reset_index(drop=True)
@@ -0,0 +1,136 @@
+import glob
+import hashlib
+import os
+import time
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+from sklearn.metrics import classification_report
+from sklearn.utils.class_weight import compute_sample_weight
+from . import config
+from . import instrumentacao
+
+# Registro de modelos de urgência: cada versão fica em PASTA_MODELOS/urgencia-<impressão>.joblib.
+# A impressão digital resume as linhas rotuladas; se ela já existe no registro, o modelo é só carregado.
+# Caso contrário, a versão mais recente é atualizada com partial_fit apenas nas linhas novas.
+CLASSES = np.array([config.URGENCIA.ALTA, config.URGENCIA.MEDIA, config.URGENCIA.BAIXA])
+PREFIXO_ARQUIVO = 'urgencia-'
+
+def criar_vetorizador() -> HashingVectorizer:
+    """Vetorizador sem estado: não precisa ser ajustado nem salvo junto com o modelo."""
+    return HashingVectorizer(n_features=config.MODELO_URGENCIA_N_FEATURES, ngram_range=(1, 2), alternate_sign=False)
+
+def _hashes_das_linhas(df_modelo: pd.DataFrame) -> pd.Series:
+    """Hash de (ID, texto, urgência) de cada linha, indexado pelo ID."""
+    hashes = pd.util.hash_pandas_object(df_modelo, index=False).to_numpy()
+    return pd.Series(hashes, index=df_modelo[config.COLS.ID].to_numpy())
+
+def _impressao_digital(hashes: pd.Series) -> str:
+    """Resume o conjunto de linhas (independente da ordem) e os parâmetros que mudam o modelo."""
+    partes = [
+        str(len(hashes)),
+        str(int(hashes.to_numpy().sum())),
+        str(int(np.bitwise_xor.reduce(hashes.to_numpy()))),
+        str(config.MODELO_URGENCIA_N_FEATURES),
+        str(config.MODELO_URGENCIA_PERCENTUAL_TESTE),
+        ','.join(CLASSES),
+    ]
+    return hashlib.sha256('|'.join(partes).encode('utf-8')).hexdigest()[:16]
+
+def _eh_teste(ids: pd.Series) -> np.ndarray:
+    """Separação treino/teste fixa por hash do ID: uma linha nunca troca de lado entre versões."""
+    return pd.util.hash_pandas_object(ids, index=False).to_numpy() % 100 < config.MODELO_URGENCIA_PERCENTUAL_TESTE
+
+def _caminho_registro(impressao: str) -> str:
+    return os.path.join(config.PASTA_MODELOS, f"{PREFIXO_ARQUIVO}{impressao}.joblib")
+
+def _versoes_no_registro() -> list:
+    """Arquivos do registro, do mais recente para o mais antigo."""
+    arquivos = glob.glob(os.path.join(config.PASTA_MODELOS, f"{PREFIXO_ARQUIVO}*.joblib"))
+    return sorted(arquivos, key=os.path.getmtime, reverse=True)
+
+def _carregar_versao(caminho: str) -> dict | None:
+    try:
+        return joblib.load(caminho)
+    except Exception as e:
+        print(f"⚠️  Não foi possível ler o modelo salvo em '{caminho}': {e}")
+        return None
+
+def _salvar_versao(versao: dict):
+    """Grava a nova versão de forma atômica e remove as mais antigas além de MODELOS_MANTIDOS."""
+    os.makedirs(config.PASTA_MODELOS, exist_ok=True)
+    caminho = _caminho_registro(versao['impressao'])
+    temporario = caminho + '.tmp'
+    joblib.dump(versao, temporario)
+    os.replace(temporario, caminho)
+    for antigo in _versoes_no_registro()[config.MODELOS_MANTIDOS:]:
+        os.remove(antigo)
+
+def _pode_atualizar(hashes_anteriores: pd.Series, hashes: pd.Series) -> bool:
+    """Só dá para atualizar se nenhuma linha já usada sumiu ou mudou de rótulo/texto."""
+    return hashes.reindex(hashes_anteriores.index).eq(hashes_anteriores).all()
+
+def _treinar(modelo: SGDClassifier, vetorizador: HashingVectorizer, textos: pd.Series, rotulos: np.ndarray, epocas: int):
+    X = vetorizador.transform(textos)
+    # o class_weight='balanced' não é aceito no partial_fit; o peso por amostra tem o mesmo efeito
+    pesos = compute_sample_weight('balanced', rotulos)
+    for epoca in range(epocas):
+        ordem = np.random.default_rng(epoca).permutation(len(rotulos))
+        modelo.partial_fit(X[ordem], rotulos[ordem], classes=CLASSES, sample_weight=pesos[ordem])
+
+@instrumentacao.instrumentar()
+def carregar_ou_treinar_modelo_urgencia(df: pd.DataFrame):
+    """
+    Retorna o modelo, o vetorizador e o relatório de classificação para prever a 'Urgencia'.
+    Sem linhas novas, custa a leitura de um arquivo; com linhas novas, treina só sobre elas.
+    """
+    df_modelo = df[[config.COLS.ID, config.COLS.TEXTO, config.COLS.URGENCIA]].dropna()
+    df_modelo = df_modelo[df_modelo[config.COLS.URGENCIA].isin(CLASSES)]
+    df_modelo = df_modelo.astype(str).drop_duplicates(config.COLS.ID, keep='last')
+
+    if df_modelo[config.COLS.URGENCIA].nunique() < 2 or len(df_modelo) < config.MODELO_URGENCIA_MIN_AMOSTRAS:
+        return None, None, None
+
+    vetorizador = criar_vetorizador()
+    hashes = _hashes_das_linhas(df_modelo)
+    impressao = _impressao_digital(hashes)
+
+    if os.path.exists(_caminho_registro(impressao)):
+        versao = _carregar_versao(_caminho_registro(impressao))
+        if versao is not None:
+            return versao['modelo'], vetorizador, versao['relatorio']
+
+    teste = _eh_teste(df_modelo[config.COLS.ID])
+    versoes = _versoes_no_registro()
+    anterior = _carregar_versao(versoes[0]) if versoes else None
+
+    if anterior is not None and _pode_atualizar(anterior['hashes'], hashes):
+        modelo = anterior['modelo']
+        treino = ~teste & ~df_modelo[config.COLS.ID].isin(anterior['hashes'].index).to_numpy()
+        epocas = 1
+        print(f"🔄 Atualizando o modelo de urgência com {treino.sum()} linhas novas...")
+    else:
+        modelo = SGDClassifier(loss='log_loss', alpha=1e-5, random_state=42)
+        treino = ~teste
+        epocas = config.MODELO_URGENCIA_EPOCAS_INICIAIS
+        print(f"🧠 Treinando o modelo de urgência do zero com {treino.sum()} linhas...")
+
+    if treino.any():
+        _treinar(modelo, vetorizador, df_modelo.loc[treino, config.COLS.TEXTO],
+                 df_modelo.loc[treino, config.COLS.URGENCIA].to_numpy(), epocas)
+    if not hasattr(modelo, 'coef_') or not teste.any():
+        return None, None, None
+
+    y_test = df_modelo.loc[teste, config.COLS.URGENCIA]
+    relatorio = classification_report(y_test, modelo.predict(vetorizador.transform(df_modelo.loc[teste, config.COLS.TEXTO])), zero_division=0)
+
+    _salvar_versao({
+        'impressao': impressao,
+        'modelo': modelo,
+        'hashes': hashes,
+        'relatorio': relatorio,
+        'criado_em': time.time(),
+    })
+    return modelo, vetorizador, relatorio
@@ -0,0 +1,84 @@
+import time
+import pandas as pd
+from . import config
+from . import analise
+from . import cubo
+from . import instrumentacao
+from .classificador_ia import classificar_feedbacks_pendentes
+
+# Pipeline completo em fluxo: em vez de classificar tudo e só então gerar o relatório, cada leva de
+# resultados da classificação é aplicada às linhas e ao cubo do relatório em memória, e o relatório
+# estático é refeito durante a execução (no máximo a cada PIPELINE_INTERVALO_RELATORIO_SEGUNDOS).
+
+class AgregacaoDoRelatorio:
+    """
+    Linhas do relatório (config.COLUNAS_RELATORIO_ESTATICO) e o cubo delas, atualizados a cada leva
+    classificada sem reler o armazenamento. As linhas são lidas na primeira leva, depois da retomada
+    do diário, para já incluírem o que foi recuperado.
+    """
+
+    def __init__(self, intervalo: float | None = None):
+        self.intervalo = config.PIPELINE_INTERVALO_RELATORIO_SEGUNDOS if intervalo is None else intervalo
+        self.df = None
+        self.cubo = None
+        self._posicoes = None
+        self._ultimo_relatorio = time.monotonic()
+        self._alteradas_desde_o_relatorio = 0
+
+    def _carregar(self) -> bool:
+        df = analise.carregar_dados(colunas=config.COLUNAS_RELATORIO_ESTATICO)
+        if df is None:
+            return False
+        # campos da IA em object para receberem os valores novos no lugar (o score continua numérico)
+        textos = [col for col in config.COLUNAS_IA if col in df.columns and col != 'Sentiment_Score']
+        self.df = df.astype({col: object for col in textos}).reset_index(drop=True)
+        self.cubo = cubo.construir_cubo(self.df)
+        ids = self.df[config.COLS.ID].astype(str)
+        self._posicoes = pd.Series(self.df.index, index=ids)[~ids.duplicated(keep='last').to_numpy()]
+        return True
+
+    @instrumentacao.instrumentar('AgregacaoDoRelatorio.aplicar_leva')
+    def aplicar_leva(self, resultados: dict):
+        """Gancho de classificar_feedbacks_pendentes: aplica a leva ({ID: campos}) e refaz o relatório se já deu o intervalo."""
+        if self.df is None and not self._carregar():
+            return
+        atualizacoes = pd.DataFrame.from_dict(resultados, orient='index')
+        atualizacoes.index = atualizacoes.index.astype(str)
+        posicoes = self._posicoes.reindex(atualizacoes.index).dropna().astype(int)
+        if posicoes.empty:
+            return
+
+        colunas = [col for col in atualizacoes.columns if col in self.df.columns]
+        antigas = self.df.loc[posicoes.to_numpy()]
+        novas = antigas.copy()
+        for col in colunas:
+            valores = atualizacoes.loc[posicoes.index, col].to_numpy()
+            novas[col] = pd.to_numeric(valores, errors='coerce') if col == 'Sentiment_Score' else valores
+        self.cubo = cubo.atualizar_cubo(self.cubo, novas, antigas)
+        self.df.loc[posicoes.to_numpy(), colunas] = novas[colunas]
+        self._alteradas_desde_o_relatorio += len(posicoes)
+
+        if time.monotonic() - self._ultimo_relatorio >= self.intervalo:
+            print(f"\n📄 Atualizando o relatório com {self._alteradas_desde_o_relatorio} feedbacks classificados desde a última versão...")
+            self.gerar_relatorio()
+
+    def gerar_relatorio(self) -> bool:
+        """Relatório estático a partir das linhas e do cubo em memória; retorna False se não há dados."""
+        if self.df is None and not self._carregar():
+            print("\nAnálise interrompida: dados não carregados.")
+            return False
+        analise.gerar_relatorio_estatico(self.df, self.cubo)
+        self._ultimo_relatorio = time.monotonic()
+        self._alteradas_desde_o_relatorio = 0
+        return True
+
+@instrumentacao.instrumentar()
+def executar_pipeline(intervalo_relatorio: float | None = None, **opcoes_classificacao) -> tuple[dict | None, bool]:
+    """
+    Classifica os pendentes repassando cada leva ao relatório e gera a versão final no fim.
+    Retorna o resumo da classificação (None se ela falhou) e se o relatório foi gerado.
+    """
+    agregacao = AgregacaoDoRelatorio(intervalo_relatorio)
+    resumo = classificar_feedbacks_pendentes(ao_classificar_lote=agregacao.aplicar_leva, **opcoes_classificacao)
+    print("\n--- Relatório final ---")
+    return resumo, agregacao.gerar_relatorio()
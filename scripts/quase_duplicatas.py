@@ -0,0 +1,271 @@
+import contextlib
+import difflib
+import itertools
+import os
+import re
+import time
+import zlib
+import numpy as np
+from . import config
+from . import armazenamento
+from . import instrumentacao
+from .cache_ia import normalizar_texto
+
+# Índice de quase duplicatas (MinHash + LSH) sobre o Texto_Original. Textos que diferem só em um nome,
+# loja ou produto caem no mesmo grupo; só um representante por grupo vai para a API e os demais copiam
+# o resultado dele. O índice guarda a assinatura de cada ID já visto, então cada execução só calcula
+# as assinaturas dos feedbacks novos.
+
+_PRIMO = np.uint64(2 ** 31 - 1)
+_SEM_ASSINATURA = np.iinfo(np.uint32).max # textos curtos demais: nunca entram em um grupo
+_PALAVRA = re.compile(r'\w+')
+_TOKEN = re.compile(r'\w+|[^\w\s]')
+
+def _parametros() -> np.ndarray:
+    return np.array([config.DUPLICATAS_NUM_PERMUTACOES, config.DUPLICATAS_LINHAS_POR_BANDA,
+                     config.DUPLICATAS_TAMANHO_SHINGLE, config.DUPLICATAS_MIN_PALAVRAS])
+
+def _permutacoes() -> tuple[np.ndarray, np.ndarray]:
+    """Coeficientes fixos das funções hash (a*x + b) mod p; mudam só com o número de permutações."""
+    rng = np.random.default_rng(20240601)
+    k = config.DUPLICATAS_NUM_PERMUTACOES
+    return (rng.integers(1, int(_PRIMO), k, dtype=np.uint64),
+            rng.integers(0, int(_PRIMO), k, dtype=np.uint64))
+
+def _shingles(texto: str) -> set:
+    """Hashes dos n-gramas de palavras do texto normalizado (vazio se o texto for curto demais)."""
+    palavras = _PALAVRA.findall(normalizar_texto(texto))
+    if len(palavras) < config.DUPLICATAS_MIN_PALAVRAS:
+        return set()
+    n = config.DUPLICATAS_TAMANHO_SHINGLE
+    return {zlib.crc32(' '.join(palavras[i:i + n]).encode('utf-8')) for i in range(len(palavras) - n + 1)}
+
+def calcular_assinaturas(textos: list, tamanho_bloco: int = 20_000) -> np.ndarray:
+    """Assinaturas MinHash (n x permutações, uint32), calculadas em blocos de textos com numpy."""
+    a, b = _permutacoes()
+    conjuntos = [_shingles(texto) for texto in textos]
+    tamanhos = np.fromiter(map(len, conjuntos), dtype=np.int64, count=len(conjuntos))
+    inicios = np.concatenate([[0], np.cumsum(tamanhos)])
+    valores = np.fromiter(itertools.chain.from_iterable(conjuntos), dtype=np.uint64, count=int(inicios[-1]))
+
+    assinaturas = np.full((len(textos), len(a)), _SEM_ASSINATURA, dtype=np.uint32)
+    for primeiro in range(0, len(textos), tamanho_bloco):
+        linhas = np.arange(primeiro, min(primeiro + tamanho_bloco, len(textos)))
+        linhas = linhas[tamanhos[linhas] > 0]
+        if len(linhas) == 0:
+            continue
+        trecho = valores[inicios[linhas[0]]:inicios[linhas[-1] + 1]]
+        hashes = (a[:, None] * trecho[None, :] + b[:, None]) % _PRIMO
+        # mínimo de cada permutação dentro dos shingles de cada texto
+        assinaturas[linhas] = np.minimum.reduceat(hashes, inicios[linhas] - inicios[linhas[0]], axis=1).T
+    return assinaturas
+
+@contextlib.contextmanager
+def _trava(caminho: str, espera_maxima: float = 30.0):
+    """Trava entre processos via arquivo criado com O_EXCL; uma trava mais velha que espera_maxima é tida como abandonada."""
+    arquivo_trava = f"{caminho}.trava"
+    os.makedirs(os.path.dirname(arquivo_trava) or '.', exist_ok=True)
+    while True:
+        try:
+            os.close(os.open(arquivo_trava, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(arquivo_trava) > espera_maxima:
+                    os.remove(arquivo_trava)
+                    continue
+            except FileNotFoundError:
+                continue
+            time.sleep(0.05)
+    try:
+        yield
+    finally:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(arquivo_trava)
+
+def _chaves_das_bandas(assinaturas: np.ndarray) -> np.ndarray:
+    """Uma chave uint64 por banda de LSH (n x bandas): textos parecidos coincidem em pelo menos uma banda."""
+    linhas_por_banda = config.DUPLICATAS_LINHAS_POR_BANDA
+    bandas = assinaturas.shape[1] // linhas_por_banda
+    blocos = assinaturas[:, :bandas * linhas_por_banda].reshape(len(assinaturas), bandas, linhas_por_banda).astype(np.uint64)
+    multiplicadores = np.random.default_rng(7).integers(1, 2 ** 63, linhas_por_banda, dtype=np.uint64) | np.uint64(1)
+    return (blocos * multiplicadores).sum(axis=2)
+
+def _similaridade(assinaturas: np.ndarray, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Jaccard estimado entre as linhas a[i] e b[i] (fração de permutações com o mesmo mínimo)."""
+    return (assinaturas[a] == assinaturas[b]).mean(axis=1)
+
+class IndiceQuaseDuplicatas:
+    """
+    Assinaturas MinHash de todos os feedbacks já vistos, persistidas em um .npz.
+    `atualizar` calcula só as dos IDs novos; `agrupar` encontra, para os IDs consultados,
+    os grupos de quase duplicatas (incluindo feedbacks antigos, já classificados).
+    """
+
+    def __init__(self, caminho=None):
+        self.caminho = caminho or config.ARQUIVO_INDICE_DUPLICATAS
+        self.ids = np.array([], dtype=str)
+        self.assinaturas = np.empty((0, config.DUPLICATAS_NUM_PERMUTACOES), dtype=np.uint32)
+        self._carregar()
+
+    def _ler_arquivo(self) -> tuple[np.ndarray, np.ndarray] | None:
+        """IDs e assinaturas gravados, ou None se o arquivo não existe, não abre ou é de outros parâmetros."""
+        if not os.path.exists(self.caminho):
+            return None
+        try:
+            with np.load(self.caminho) as dados:
+                if np.array_equal(dados['parametros'], _parametros()):
+                    return dados['ids'], dados['assinaturas']
+                print("🧬 Parâmetros do índice de quase duplicatas mudaram; o índice será refeito.")
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️  Não foi possível ler o índice de quase duplicatas em '{self.caminho}': {e}")
+        return None
+
+    def _carregar(self):
+        gravado = self._ler_arquivo()
+        if gravado is not None:
+            self.ids, self.assinaturas = gravado
+        self._reindexar()
+
+    def _reindexar(self):
+        self._posicoes = {id_feedback: posicao for posicao, id_feedback in enumerate(self.ids.tolist())}
+        self._chaves = _chaves_das_bandas(self.assinaturas)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def atualizar(self, ids: list, textos: list) -> int:
+        """Acrescenta as assinaturas dos IDs ainda fora do índice; retorna quantos entraram."""
+        novos = [(str(id_feedback), texto) for id_feedback, texto in zip(ids, textos) if str(id_feedback) not in self._posicoes]
+        if not novos:
+            return 0
+        assinaturas = calcular_assinaturas([texto for _, texto in novos])
+        self.ids = np.concatenate([self.ids, np.array([id_feedback for id_feedback, _ in novos], dtype=str)])
+        self.assinaturas = np.vstack([self.assinaturas, assinaturas])
+        self._reindexar()
+        return len(novos)
+
+    def agrupar(self, ids_consulta: list) -> dict:
+        """
+        Grupos que contêm algum ID consultado: representante -> membros (só IDs consultados).
+        O representante é o feedback mais antigo do grupo, que pode já ter sido classificado.
+        """
+        consulta = np.array([self._posicoes[str(id_feedback)] for id_feedback in ids_consulta if str(id_feedback) in self._posicoes], dtype=np.int64)
+        consulta = consulta[self.assinaturas[consulta, 0] != _SEM_ASSINATURA]
+        if len(consulta) == 0:
+            return {}
+
+        validas = self.assinaturas[:, 0] != _SEM_ASSINATURA
+        pares = []
+        for banda in range(self._chaves.shape[1]):
+            chaves = self._chaves[:, banda]
+            candidatas = np.flatnonzero(validas & np.isin(chaves, chaves[consulta]))
+            # ordenadas por chave e posição: o primeiro de cada balde é o mais antigo
+            candidatas = candidatas[np.lexsort((candidatas, chaves[candidatas]))]
+            _, primeiro, grupo = np.unique(chaves[candidatas], return_index=True, return_inverse=True)
+            lider = candidatas[primeiro[grupo]]
+            pares.append(np.column_stack([candidatas, lider])[candidatas != lider])
+        pares = np.unique(np.concatenate(pares), axis=0)
+        pares = pares[_similaridade(self.assinaturas, pares[:, 0], pares[:, 1]) >= config.DUPLICATAS_LIMIAR_JACCARD]
+        if len(pares) == 0:
+            return {}
+
+        from scipy.sparse import coo_matrix
+        from scipy.sparse.csgraph import connected_components
+        n = len(self.ids)
+        grafo = coo_matrix((np.ones(len(pares), dtype=np.int8), (pares[:, 0], pares[:, 1])), shape=(n, n))
+        _, componente = connected_components(grafo, directed=False)
+        eh_consulta = np.zeros(n, dtype=bool)
+        eh_consulta[consulta] = True
+        envolvidas = np.unique(pares)
+
+        grupos = {}
+        for rotulo in np.unique(componente[consulta]):
+            nos = envolvidas[componente[envolvidas] == rotulo]
+            if len(nos) < 2:
+                continue
+            representante = nos.min()
+            membros = nos[eh_consulta[nos] & (nos != representante)]
+            # o grupo é transitivo; cada membro ainda precisa ser parecido com o próprio representante
+            membros = membros[_similaridade(self.assinaturas, membros, np.full(len(membros), representante)) >= config.DUPLICATAS_LIMIAR_JACCARD]
+            if len(membros):
+                grupos[self.ids[representante]] = self.ids[membros].tolist()
+        return grupos
+
+    def salvar(self):
+        """
+        Grava o índice de forma atômica. Antes, junta as assinaturas que outro processo (ex.: outro
+        trabalhador da fila) gravou desde a leitura, para que uma gravação não apague as da outra.
+        """
+        with _trava(str(self.caminho)):
+            gravado = self._ler_arquivo()
+            if gravado is not None:
+                outros = ~np.isin(gravado[0], self.ids)
+                if outros.any():
+                    self.ids = np.concatenate([self.ids, gravado[0][outros]])
+                    self.assinaturas = np.vstack([self.assinaturas, gravado[1][outros]])
+                    self._reindexar()
+            temporario = f"{self.caminho}.{os.getpid()}.tmp"
+            with open(temporario, 'wb') as arquivo:
+                np.savez(arquivo, ids=self.ids, assinaturas=self.assinaturas, parametros=_parametros())
+            os.replace(temporario, self.caminho)
+
+def transferir_entidade(valor, texto_origem: str, texto_destino: str):
+    """
+    Leva uma entidade (ex.: o nome em Menciona_Empregado) do texto do representante para o do membro:
+    alinha as palavras dos dois textos com difflib e devolve o trecho do membro que ocupa o lugar dela.
+    Retorna None se o valor não aparece literalmente no texto de origem nem no de destino.
+    """
+    if valor is None or str(valor).strip().lower() in ('', 'não', 'nao'):
+        return valor
+    origem, destino = _TOKEN.findall(str(texto_origem)), _TOKEN.findall(str(texto_destino))
+    alvo = [token.lower() for token in _TOKEN.findall(str(valor))]
+    minusculas = [token.lower() for token in origem]
+    inicio = next((i for i in range(len(origem) - len(alvo) + 1) if minusculas[i:i + len(alvo)] == alvo), None)
+    if inicio is None:
+        return valor if str(valor).lower() in str(texto_destino).lower() else None
+    fim = inicio + len(alvo)
+
+    def no_destino(posicao: int, final: bool) -> int:
+        for operacao, i1, i2, j1, j2 in difflib.SequenceMatcher(None, origem, destino, autojunk=False).get_opcodes():
+            if i1 <= posicao < i2 or (operacao == 'insert' and i1 == posicao):
+                if operacao == 'equal':
+                    return j1 + (posicao - i1) + (1 if final else 0)
+                return j2 if final else j1
+        return len(destino)
+
+    trecho = destino[no_destino(inicio, False):no_destino(fim - 1, True)]
+    return ' '.join(trecho) if trecho else None
+
+def adaptar_resultado(resultado: dict, texto_representante: str, texto_membro: str) -> dict:
+    """
+    Cópia do resultado do representante para um membro do grupo: os campos de entidade
+    (config.DUPLICATAS_CAMPOS_POR_LINHA) são extraídos do texto do membro e trocados também
+    nos textos gerados (rascunho de resposta, sugestão).
+    """
+    copia = dict(resultado)
+    for campo in config.DUPLICATAS_CAMPOS_POR_LINHA:
+        valor = resultado.get(campo)
+        novo = transferir_entidade(valor, texto_representante, texto_membro)
+        copia[campo] = novo
+        if isinstance(valor, str) and novo and novo != valor:
+            for campo_gerado in config.CAMPOS_GERACAO_IA:
+                if isinstance(copia.get(campo_gerado), str):
+                    copia[campo_gerado] = copia[campo_gerado].replace(valor, novo)
+    return copia
+
+@instrumentacao.instrumentar()
+def carregar_classificados(ids: list) -> dict:
+    """ID -> (texto, setor, resultado) dos feedbacks já classificados, para servir de representante."""
+    if not ids:
+        return {}
+    # só as linhas dos representantes, não o conjunto inteiro
+    df = armazenamento.carregar_por_ids(ids, colunas=['ID', 'Texto_Original', 'Setor'] + config.COLUNAS_IA)
+    if df is None or 'Status' not in df.columns:
+        return {}
+    df = df[df['Status'].isin(config.STATUS_CONCLUIDOS)]
+    df = df.astype(object).where(df.notna(), None)
+    return {
+        str(linha['ID']): (linha['Texto_Original'], linha['Setor'], {coluna: linha[coluna] for coluna in config.COLUNAS_IA if coluna != 'Status'})
+        for linha in df.to_dict('records')
+    }
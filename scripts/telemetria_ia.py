@@ -0,0 +1,257 @@
+import argparse
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+import pandas as pd
+from . import config
+
+# Telemetria das chamadas à API: uma linha por requisição com latência, tokens de `usage`, custo,
+# tentativas e falhas de interpretação, num SQLite pequeno (config.ARQUIVO_TELEMETRIA_IA).
+# As threads de classificação só acrescentam ao buffer; a gravação acontece em grupo.
+
+COLUNAS = {
+    'execucao': 'TEXT NOT NULL',
+    'inicio': 'REAL NOT NULL',
+    'modo': 'TEXT NOT NULL', # 'individual' ou 'lote'
+    'etapa': 'TEXT', # 'completa' (prompt único), 'compacta' ou 'geracao' (duas etapas)
+    'modelo': 'TEXT',
+    'ids': 'TEXT', # IDs dos feedbacks enviados, separados por vírgula
+    'feedbacks': 'INTEGER NOT NULL',
+    'feedbacks_validos': 'INTEGER NOT NULL',
+    'latencia_ms': 'REAL', # soma das requisições HTTP (todas as tentativas)
+    'espera_ms': 'REAL', # fila do limitador de taxa + backoff entre tentativas
+    'tentativas': 'INTEGER',
+    'status_http': 'INTEGER',
+    'prompt_tokens': 'INTEGER',
+    'completion_tokens': 'INTEGER',
+    'total_tokens': 'INTEGER',
+    'custo': 'REAL',
+    'erro': 'TEXT',
+}
+
+_lock = threading.Lock()
+_buffer = []
+_execucao = None
+
+def iniciar_execucao() -> str:
+    """Abre uma nova execução; as chamadas seguintes são agrupadas sob o mesmo identificador."""
+    global _execucao
+    _execucao = time.strftime('%Y%m%d-%H%M%S-') + uuid.uuid4().hex[:4]
+    return _execucao
+
+def _custo(usage: dict) -> float | None:
+    """Usa o custo informado pela API; sem ele, estima pelos preços do config."""
+    if usage.get('cost') is not None:
+        return float(usage['cost'])
+    if usage.get('prompt_tokens') is None:
+        return None
+    return (usage['prompt_tokens'] * config.IA_CUSTO_POR_MILHAO_TOKENS_ENTRADA
+            + usage.get('completion_tokens', 0) * config.IA_CUSTO_POR_MILHAO_TOKENS_SAIDA) / 1e6
+
+def registrar_chamada(metadados: dict, ids: list, feedbacks_validos: int, erro: str | None = None, etapa: str = 'completa'):
+    """Guarda uma requisição (metadados vindos de classificador_ia._enviar_prompt)."""
+    if not config.IA_REGISTRAR_TELEMETRIA:
+        return
+    usage = metadados.get('usage') or {}
+    registro = {
+        'execucao': _execucao or 'avulsa',
+        'inicio': metadados.get('inicio', time.time()),
+        'modo': 'lote' if len(ids) > 1 else 'individual',
+        'etapa': etapa,
+        'modelo': config.MODELO_IA,
+        'ids': ','.join(str(id_feedback) for id_feedback in ids if id_feedback is not None),
+        'feedbacks': len(ids),
+        'feedbacks_validos': feedbacks_validos,
+        'latencia_ms': round(metadados.get('latencia_ms', 0.0), 1),
+        'espera_ms': round(metadados.get('espera_ms', 0.0), 1),
+        'tentativas': metadados.get('tentativas'),
+        'status_http': metadados.get('status_http'),
+        'prompt_tokens': usage.get('prompt_tokens'),
+        'completion_tokens': usage.get('completion_tokens'),
+        'total_tokens': usage.get('total_tokens'),
+        'custo': _custo(usage),
+        'erro': erro or metadados.get('erro'),
+    }
+    with _lock:
+        _buffer.append(registro)
+        if len(_buffer) >= 50:
+            _descarregar_sem_lock()
+
+def _conectar(caminho=None) -> sqlite3.Connection:
+    conexao = sqlite3.connect(caminho or config.ARQUIVO_TELEMETRIA_IA)
+    definicao = ', '.join(f"{coluna} {tipo}" for coluna, tipo in COLUNAS.items())
+    conexao.execute(f"CREATE TABLE IF NOT EXISTS chamadas ({definicao})")
+    # arquivos criados por versões anteriores ganham as colunas novas (vazias nas linhas antigas)
+    existentes = {linha[1] for linha in conexao.execute("PRAGMA table_info(chamadas)")}
+    for coluna in COLUNAS.keys() - existentes:
+        conexao.execute(f"ALTER TABLE chamadas ADD COLUMN {coluna} {COLUNAS[coluna].replace(' NOT NULL', '')}")
+    conexao.execute("CREATE INDEX IF NOT EXISTS idx_chamadas_execucao ON chamadas (execucao, inicio)")
+    return conexao
+
+def _descarregar_sem_lock():
+    global _buffer
+    if not _buffer:
+        return
+    try:
+        with _conectar() as conexao:
+            conexao.executemany(
+                f"INSERT INTO chamadas ({', '.join(COLUNAS)}) VALUES ({', '.join('?' * len(COLUNAS))})",
+                [tuple(registro[coluna] for coluna in COLUNAS) for registro in _buffer]
+            )
+        conexao.close()
+    except sqlite3.Error as e:
+        print(f"⚠️  Não foi possível gravar a telemetria em '{config.ARQUIVO_TELEMETRIA_IA}': {e}")
+    _buffer = []
+
+def descarregar():
+    """Grava as chamadas pendentes no SQLite."""
+    with _lock:
+        _descarregar_sem_lock()
+
+def finalizar_execucao() -> dict | None:
+    """Grava o buffer, aplica a retenção e devolve o resumo da execução atual (None se não houve chamadas)."""
+    with _lock:
+        _descarregar_sem_lock()
+        try:
+            with _conectar() as conexao:
+                conexao.execute("DELETE FROM chamadas WHERE inicio < ?", (time.time() - config.TELEMETRIA_IA_MAX_IDADE_DIAS * 86400,))
+            conexao.close()
+        except sqlite3.Error:
+            pass
+    df = carregar_chamadas(execucao=_execucao)
+    if df is None or df.empty:
+        return None
+    return _resumir(df).iloc[0].to_dict()
+
+def carregar_chamadas(execucao: str | None = None, caminho=None) -> pd.DataFrame | None:
+    """Lê as chamadas registradas (de uma execução, se informada). None se ainda não há telemetria."""
+    if not os.path.exists(caminho or config.ARQUIVO_TELEMETRIA_IA):
+        # só leitura: o arquivo é criado por quem registra chamadas, não pelo painel nem por `main.py telemetria`
+        return None
+    try:
+        conexao = _conectar(caminho)
+        consulta, parametros = "SELECT * FROM chamadas", ()
+        if execucao is not None:
+            consulta, parametros = consulta + " WHERE execucao = ?", (execucao,)
+        df = pd.read_sql_query(consulta + " ORDER BY inicio", conexao, params=parametros)
+        conexao.close()
+    except sqlite3.Error as e:
+        print(f"⚠️  Não foi possível ler a telemetria em '{caminho or config.ARQUIVO_TELEMETRIA_IA}': {e}")
+        return None
+    # colunas só com NULL (ex.: API sem `usage`) chegam como object
+    numericas = [coluna for coluna, tipo in COLUNAS.items() if tipo.startswith(('INTEGER', 'REAL'))]
+    df[numericas] = df[numericas].astype(float)
+    df['etapa'] = df['etapa'].fillna('completa')
+    df['fim'] = df['inicio'] + (df['latencia_ms'] + df['espera_ms']) / 1000
+    return df
+
+def _para_data(segundos: pd.Series) -> pd.Series:
+    """Epoch em segundos -> data no fuso local (sem fuso), arredondada ao segundo."""
+    fuso = datetime.now().astimezone().tzinfo
+    return pd.to_datetime(segundos, unit='s', utc=True).dt.tz_convert(fuso).dt.tz_localize(None).dt.floor('s')
+
+def _com_feedbacks_classificados(df: pd.DataFrame) -> pd.DataFrame:
+    """A etapa de geração repete feedbacks já classificados: só as outras etapas contam para a vazão."""
+    geracao = df['etapa'] == 'geracao'
+    return df.assign(classificados=df['feedbacks'].mask(geracao, 0), classificados_validos=df['feedbacks_validos'].mask(geracao, 0))
+
+def _resumir(df: pd.DataFrame) -> pd.DataFrame:
+    """Uma linha por execução: vazão, latência, tokens por feedback, novas tentativas e falhas."""
+    grupos = _com_feedbacks_classificados(df).groupby('execucao', sort=False)
+    resumo = pd.DataFrame({
+        'inicio': _para_data(grupos['inicio'].min()),
+        'chamadas': grupos.size(),
+        'feedbacks': grupos['classificados'].sum().astype(int),
+        'feedbacks_validos': grupos['classificados_validos'].sum().astype(int),
+        'duracao_s': (grupos['fim'].max() - grupos['inicio'].min()).round(1),
+        'latencia_p50_ms': grupos['latencia_ms'].median().round(0),
+        'latencia_p95_ms': grupos['latencia_ms'].quantile(0.95).round(0),
+        'novas_tentativas': (grupos['tentativas'].sum() - grupos.size()).astype(int),
+        'falhas_json': grupos['erro'].apply(lambda erros: int((erros == 'json_invalido').sum())),
+        'falhas_api': grupos['erro'].apply(lambda erros: int(erros.notna().sum() - (erros == 'json_invalido').sum())),
+        'tokens_entrada_por_feedback': (grupos['prompt_tokens'].sum() / grupos['classificados'].sum()).round(1),
+        'tokens_saida_por_feedback': (grupos['completion_tokens'].sum() / grupos['classificados'].sum()).round(1),
+        'custo': grupos['custo'].sum(),
+    })
+    resumo['feedbacks_por_minuto'] = (resumo['feedbacks_validos'] / resumo['duracao_s'].clip(lower=0.1) * 60).round(1)
+    return resumo.reset_index().sort_values('inicio', ascending=False, ignore_index=True)
+
+def _comparar_etapas(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Antes/depois do modo em duas etapas: por etapa, e somando as etapas de cada modo, os tokens
+    e a latência por feedback classificado (a geração é dividida por todos os classificados do modo).
+    """
+    df = _com_feedbacks_classificados(df).assign(modo_prompt=lambda d: d['etapa'].map(lambda etapa: 'prompt único' if etapa == 'completa' else 'duas etapas'))
+    grupos = list(df.groupby(['modo_prompt', 'etapa']))
+    grupos += [((modo_prompt, 'total'), grupo) for modo_prompt, grupo in df.groupby('modo_prompt')]
+    linhas = []
+    for (modo_prompt, etapa), grupo in grupos:
+        classificados = df.loc[df['modo_prompt'] == modo_prompt, 'classificados'].sum()
+        linhas.append({
+            'modo': modo_prompt,
+            'etapa': etapa,
+            'chamadas': len(grupo),
+            'feedbacks_na_etapa': int(grupo['feedbacks'].sum()),
+            'tokens_entrada_por_feedback': round(grupo['prompt_tokens'].sum() / classificados, 1) if classificados else None,
+            'tokens_saida_por_feedback': round(grupo['completion_tokens'].sum() / classificados, 1) if classificados else None,
+            'latencia_ms_por_feedback': round(grupo['latencia_ms'].sum() / classificados, 1) if classificados else None,
+            'latencia_p50_ms': round(grupo['latencia_ms'].median(), 0),
+        })
+    return pd.DataFrame(linhas).sort_values(['modo', 'etapa'], ignore_index=True)
+
+def gerar_relatorio(df: pd.DataFrame, top: int = 10, intervalo: str = '1min') -> dict:
+    """
+    Tabelas do relatório: resumo por execução, comparação entre prompt único e duas etapas, vazão ao
+    longo do tempo (feedbacks classificados por intervalo) e as chamadas mais lentas e mais caras,
+    com os IDs dos feedbacks envolvidos.
+    """
+    por_chamada = df.assign(
+        tokens_por_feedback=(df['total_tokens'] / df['feedbacks']).round(1),
+        custo_por_feedback=df['custo'] / df['feedbacks'],
+        inicio=_para_data(df['inicio']),
+    )
+    colunas = ['inicio', 'execucao', 'ids', 'modo', 'etapa', 'latencia_ms', 'espera_ms', 'tentativas',
+               'total_tokens', 'tokens_por_feedback', 'custo_por_feedback', 'erro']
+    vazao = (_com_feedbacks_classificados(df).assign(fim=_para_data(df['fim']))
+               .set_index('fim')[['classificados_validos', 'total_tokens']]
+               .resample(intervalo).sum()
+               .astype(int)
+               .rename(columns={'classificados_validos': 'feedbacks', 'total_tokens': 'tokens'}))
+    return {
+        'resumo': _resumir(df),
+        'etapas': _comparar_etapas(df),
+        'vazao': vazao,
+        'mais_lentas': por_chamada.nlargest(top, 'latencia_ms')[colunas].reset_index(drop=True),
+        'mais_caras': por_chamada.sort_values(['tokens_por_feedback', 'custo_por_feedback'], ascending=False)
+                                 .head(top)[colunas].reset_index(drop=True),
+    }
+
+def imprimir_relatorio(execucao: str | None = None, top: int = 10, intervalo: str = '1min'):
+    """Relatório no terminal (opção do main.py e `python -m scripts.telemetria_ia`)."""
+    df = carregar_chamadas(execucao)
+    if df is None or df.empty:
+        print("📡 Nenhuma chamada à API registrada ainda.")
+        return
+    relatorio = gerar_relatorio(df, top, intervalo)
+    with pd.option_context('display.width', 200, 'display.max_columns', None, 'display.max_colwidth', 40):
+        print("\n📡 Resumo por execução (mais recente primeiro):")
+        print(relatorio['resumo'].to_string(index=False))
+        print("\n✂️ Tokens e latência por feedback classificado, por modo de prompt e etapa:")
+        print(relatorio['etapas'].to_string(index=False))
+        print(f"\n📈 Vazão (feedbacks classificados a cada {intervalo}):")
+        print(relatorio['vazao'][relatorio['vazao']['feedbacks'] > 0].to_string())
+        print(f"\n🐢 {top} chamadas mais lentas:")
+        print(relatorio['mais_lentas'].to_string(index=False))
+        print(f"\n💰 {top} chamadas mais caras (tokens por feedback):")
+        print(relatorio['mais_caras'].to_string(index=False))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Relatório da telemetria das chamadas à API de classificação.")
+    parser.add_argument('--execucao', help="mostra só uma execução (ex.: 20250101-120000-ab12)")
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--intervalo', default='1min', help="janela da vazão no formato do pandas (ex.: 30s, 5min)")
+    args = parser.parse_args()
+    imprimir_relatorio(args.execucao, args.top, args.intervalo)
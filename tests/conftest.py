@@ -0,0 +1,33 @@
+import sys
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from scripts import config, gerarFeedback
+
+@pytest.fixture
+def dados_temporarios(tmp_path, monkeypatch):
+    """
+    Aponta para uma pasta temporária todos os caminhos do config dentro de data/ e a pasta de gráficos:
+    nada do projeto é tocado, inclusive por configurações novas.
+    """
+    for nome, valor in list(vars(config).items()):
+        if isinstance(valor, Path) and config.DATA_DIR in valor.parents:
+            monkeypatch.setattr(config, nome, tmp_path / valor.relative_to(config.DATA_DIR))
+    monkeypatch.setattr(config, 'DATA_DIR', tmp_path)
+    monkeypatch.setattr(config, 'PASTA_GRAFICOS', str(tmp_path / 'relatorio_de_analise'))
+    return tmp_path
+
+@pytest.fixture
+def gerar_feedbacks():
+    """Gera `n` feedbacks fictícios e reprodutíveis (semente fixa)."""
+    pools = gerarFeedback.criar_pools_de_nomes(1)
+
+    def gerar(n: int, semente: int = 0) -> pd.DataFrame:
+        return gerarFeedback.gerar_bloco_de_feedbacks(
+            n, 'hotelaria', np.random.default_rng(semente), pools, pd.Timestamp('2024-01-01'), pd.Timestamp('2025-01-01')
+        )
+    return gerar
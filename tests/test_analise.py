@@ -0,0 +1,19 @@
+import pandas as pd
+from scripts import analise, config
+
+def test_impressao_digital_muda_com_o_config_do_desenho(monkeypatch):
+    dados = pd.Series([5, 3], index=pd.Index(['Limpeza', 'Recepção'], name='Subcategoria'), name='Quantidade')
+    original = analise._impressao_digital(analise.desenhar_grafico_pareto, dados)
+    assert analise._impressao_digital(analise.desenhar_grafico_pareto, dados) == original
+
+    monkeypatch.setattr(config, 'RELATORIO_PROCESSOS', 7) # não muda o PNG
+    assert analise._impressao_digital(analise.desenhar_grafico_pareto, dados) == original
+    monkeypatch.setattr(config, 'FIGSIZE_GRANDE', (1, 1))
+    assert analise._impressao_digital(analise.desenhar_grafico_pareto, dados) != original
+
+def test_impressao_digital_cobre_o_codigo_dos_auxiliares(monkeypatch):
+    dados = pd.Series([5, 3], index=pd.Index(['Limpeza', 'Recepção'], name='Subcategoria'), name='Quantidade')
+    original = analise._impressao_digital(analise.desenhar_grafico_pareto, dados)
+    codigo, nomes = analise._codigo_do_desenho()
+    monkeypatch.setattr(analise, '_codigo_do_desenho', lambda: (codigo + b'auxiliar alterado', nomes))
+    assert analise._impressao_digital(analise.desenhar_grafico_pareto, dados) != original
@@ -0,0 +1,77 @@
+import pandas as pd
+import pytest
+from scripts import armazenamento, config
+
+def _feedbacks(n: int, inicio: int = 0) -> pd.DataFrame:
+    """Feedbacks mínimos, um a cada 10 dias (várias partições Setor/Mês no Parquet)."""
+    posicoes = range(inicio, inicio + n)
+    return pd.DataFrame({
+        'ID': [f'id-{posicao}' for posicao in posicoes],
+        'Setor': 'Hotelaria',
+        'Canal': 'App',
+        'Data': [f"{pd.Timestamp('2024-01-01') + pd.Timedelta(days=10 * posicao):%Y-%m-%d %H:%M:%S}" for posicao in posicoes],
+        'Rating': [1 + posicao % 5 for posicao in posicoes],
+        'Local_Loja': 'Hotel Centro',
+        'Texto_Original': [f'Feedback número {posicao}' for posicao in posicoes],
+    })
+
+def test_parquet_ida_e_volta_das_classificacoes(dados_temporarios, monkeypatch):
+    monkeypatch.setattr(config, 'BACKEND_ARMAZENAMENTO', 'parquet')
+    armazenamento.anexar_feedbacks(_feedbacks(30))
+    resultados = {
+        'id-0': {'Sentimento': 'Negativo', 'Sentiment_Score': -0.8, 'Tags': ['limpeza', 'quarto'], 'Status': 'Classificado'},
+        'id-7': {'Sentimento': 'Positivo', 'Sentiment_Score': 0.5, 'Tags': [], 'Status': 'Classificado'},
+    }
+    armazenamento.salvar_classificacoes(resultados)
+
+    df = armazenamento.carregar_feedbacks()
+    assert len(df) == 30 and df['ID'].is_unique # partições reescritas não deixam duplicatas
+    linhas = df.set_index(df['ID'].astype(str))
+    for id_feedback, campos in resultados.items():
+        assert linhas.at[id_feedback, 'Sentimento'] == campos['Sentimento']
+        assert linhas.at[id_feedback, 'Sentiment_Score'] == pytest.approx(campos['Sentiment_Score'])
+        assert linhas.at[id_feedback, 'Status'] == 'Classificado'
+        assert linhas.at[id_feedback, 'Tags'] == str(campos['Tags']) # listas viram texto, como no CSV
+    assert linhas.drop(index=list(resultados))['Status'].isna().all()
+    assert pd.to_datetime(linhas['Data']).to_dict() == pd.to_datetime(_feedbacks(30).set_index('ID')['Data']).to_dict()
+
+def test_csv_acrescimo_le_so_as_linhas_novas(dados_temporarios):
+    armazenamento.anexar_feedbacks(_feedbacks(20))
+    df, versao, completo = armazenamento.carregar_alteracoes(None)
+    assert completo and len(df) == 20
+    assert versao == armazenamento.versao_dados()
+
+    armazenamento.anexar_feedbacks(_feedbacks(5, inicio=20))
+    assert armazenamento.versao_dados() != versao
+    df, versao, completo = armazenamento.carregar_alteracoes(versao)
+    assert not completo
+    assert df['ID'].tolist() == [f'id-{posicao}' for posicao in range(20, 25)]
+
+    df, _, completo = armazenamento.carregar_alteracoes(versao)
+    assert not completo and df.empty
+
+@pytest.mark.parametrize('backend', ['sqlite', 'parquet'])
+def test_alteracoes_nos_outros_backends(dados_temporarios, monkeypatch, backend):
+    monkeypatch.setattr(config, 'BACKEND_ARMAZENAMENTO', backend)
+    armazenamento.anexar_feedbacks(_feedbacks(20))
+    _, versao, completo = armazenamento.carregar_alteracoes(None)
+    assert completo
+
+    armazenamento.anexar_feedbacks(_feedbacks(5, inicio=20))
+    df, versao, completo = armazenamento.carregar_alteracoes(versao)
+    assert not completo
+    assert set(df['ID']) == {f'id-{posicao}' for posicao in range(20, 25)}
+
+    armazenamento.salvar_classificacoes({'id-0': {'Status': 'Classificado'}})
+    df, _, completo = armazenamento.carregar_alteracoes(versao)
+    assert not completo and 'id-0' in set(df['ID'])
+
+def test_csv_reescrita_devolve_o_conjunto_inteiro(dados_temporarios):
+    armazenamento.anexar_feedbacks(_feedbacks(20))
+    _, versao, _ = armazenamento.carregar_alteracoes(None)
+
+    # mesmas linhas e um arquivo maior, como num acréscimo: só a geração denuncia a reescrita
+    armazenamento.salvar_classificacoes({'id-0': {'Status': 'Classificado'}})
+    assert armazenamento.versao_dados()[2] != versao[2]
+    df, _, completo = armazenamento.carregar_alteracoes(versao)
+    assert completo and len(df) == 20
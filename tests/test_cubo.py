@@ -0,0 +1,26 @@
+import pandas as pd
+from scripts import config, cubo
+
+def _reclamacoes(lojas: int, subcategorias: int) -> pd.DataFrame:
+    pares = [(f'Loja {loja}', f'Sub {sub}') for loja in range(lojas) for sub in range(subcategorias)]
+    return pd.DataFrame({
+        config.COLS.LOCAL: [loja for loja, _ in pares],
+        config.COLS.SUBCATEGORIA: [sub for _, sub in pares],
+        config.COLS.SENTIMENTO: config.SENTIMENTS.NEG,
+    })
+
+def test_mapa_de_calor_corta_nas_maiores_por_padrao(monkeypatch):
+    monkeypatch.setattr(config, 'MAPA_CALOR_MAX_LOJAS', 3)
+    monkeypatch.setattr(config, 'MAPA_CALOR_MAX_SUBCATEGORIAS', 2)
+    tabela = cubo.agregar_problemas_por_loja(_reclamacoes(5, 4))
+    assert tabela.shape == (4, 3)
+    assert tabela.index[-1] == tabela.columns[-1] == config.MAPA_CALOR_ROTULO_OUTROS
+    assert tabela.to_numpy().sum() == 20
+
+def test_mapa_de_calor_sem_limite(monkeypatch):
+    monkeypatch.setattr(config, 'MAPA_CALOR_MAX_LOJAS', 3)
+    assert cubo.agregar_problemas_por_loja(_reclamacoes(5, 4), None, None).shape == (5, 4)
+    assert cubo.agregar_problemas_por_loja(_reclamacoes(5, 4), 0, None).index.tolist() == [config.MAPA_CALOR_ROTULO_OUTROS]
+
+    monkeypatch.setattr(config, 'MAPA_CALOR_SO_MAIORES', False)
+    assert cubo.agregar_problemas_por_loja(_reclamacoes(5, 4)).shape == (5, 4)
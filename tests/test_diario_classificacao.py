@@ -0,0 +1,45 @@
+import time
+from scripts.diario_classificacao import DiarioDeClassificacoes
+
+def test_so_le_o_que_foi_confirmado(dados_temporarios):
+    diario = DiarioDeClassificacoes(a_cada_linhas=3, a_cada_segundos=3600)
+    diario.registrar('a', {'Sentimento': 'Positivo'})
+    diario.registrar('b', {'Sentimento': 'Negativo'})
+    assert DiarioDeClassificacoes().ler() == {}
+
+    diario.registrar('c', {'Sentimento': 'Neutro'}) # terceira linha: confirma o lote
+    assert set(DiarioDeClassificacoes().ler()) == {'a', 'b', 'c'}
+
+def test_releitura_fica_com_o_ultimo_registro_e_ignora_linha_cortada(dados_temporarios):
+    diario = DiarioDeClassificacoes(a_cada_linhas=1)
+    diario.registrar('a', {'Sentimento': 'Positivo'})
+    diario.registrar('a', {'Sentimento': 'Negativo'})
+    diario.registrar(7, {'Sentimento': 'Neutro'})
+    with open(diario.caminho, 'a', encoding='utf-8') as arquivo:
+        arquivo.write('{"ID": "b", "campos": {"Sent') # queda no meio da gravação
+
+    assert DiarioDeClassificacoes().ler() == {'a': {'Sentimento': 'Negativo'}, '7': {'Sentimento': 'Neutro'}}
+
+def test_descartar_apaga_o_diario_e_os_pendentes(dados_temporarios):
+    diario = DiarioDeClassificacoes(a_cada_linhas=2, a_cada_segundos=3600)
+    diario.registrar('a', {'Sentimento': 'Positivo'})
+    diario.registrar('b', {'Sentimento': 'Positivo'})
+    diario.registrar('c', {'Sentimento': 'Positivo'}) # fica pendente
+    diario.descartar()
+    assert not diario.caminho.exists()
+
+    diario.confirmar()
+    assert DiarioDeClassificacoes().ler() == {}
+
+def test_prazo_vale_sem_linhas_novas(dados_temporarios):
+    diario = DiarioDeClassificacoes(a_cada_linhas=100, a_cada_segundos=0.2)
+    diario.registrar('a', {'Sentimento': 'Positivo'}) # logo após a criação: ainda dentro do prazo
+    assert 0 < diario.segundos_para_confirmar() <= 0.2
+    diario.confirmar_se_vencido()
+    assert DiarioDeClassificacoes().ler() == {}
+
+    time.sleep(0.25) # nenhuma linha nova chega (ex.: API em backoff)
+    assert diario.segundos_para_confirmar() == 0.0
+    diario.confirmar_se_vencido()
+    assert set(DiarioDeClassificacoes().ler()) == {'a'}
+    assert diario.segundos_para_confirmar() is None
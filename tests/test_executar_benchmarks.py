@@ -0,0 +1,14 @@
+from benchmarks.executar_benchmarks import comparar
+
+def _execucao(**etapas) -> dict:
+    return {'resultados': {'1000': etapas}}
+
+def test_etapa_que_passou_a_falhar_e_regressao():
+    base = _execucao(carregar={'segundos': 0.5}, analisar={'erro': 'KeyError: x'})
+    atual = _execucao(carregar={'erro': 'ValueError: quebrou'}, analisar={'erro': 'KeyError: x'})
+    assert [(r['etapa'], r['metrica']) for r in comparar(atual, base)] == [('carregar', 'erro')]
+
+def test_piora_acima_do_limite():
+    base = _execucao(carregar={'segundos': 1.0}, analisar={'segundos': 1.0})
+    atual = _execucao(carregar={'segundos': 1.1}, analisar={'segundos': 2.0}, nova={'segundos': 9.0})
+    assert [r['etapa'] for r in comparar(atual, base, limite=0.25)] == ['analisar']
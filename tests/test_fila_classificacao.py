@@ -0,0 +1,30 @@
+import time
+from scripts.fila_classificacao import FilaDeClassificacoes
+
+def test_reserva_vencida_volta_para_a_fila(dados_temporarios, gerar_feedbacks):
+    from scripts import armazenamento
+    armazenamento.anexar_feedbacks(gerar_feedbacks(6))
+    fila = FilaDeClassificacoes(duracao_reserva=0.2)
+    assert fila.abastecer() == 6
+
+    primeira = fila.reservar('trabalhador-1', 4)
+    assert len(primeira) == 4
+    # dentro do prazo, o outro trabalhador só vê o que sobrou
+    assert set(fila.reservar('trabalhador-2', 10)['ID']).isdisjoint(primeira['ID'])
+    assert fila.estatisticas() == {'reservado': 6}
+
+    time.sleep(0.3)
+    assert len(fila.reservar('trabalhador-3', 10)) == 6
+    assert fila.renovar('trabalhador-1') == 0
+
+def test_resultado_repetido_de_reserva_vencida_e_ignorado(dados_temporarios, gerar_feedbacks):
+    from scripts import armazenamento
+    armazenamento.anexar_feedbacks(gerar_feedbacks(2))
+    fila = FilaDeClassificacoes(duracao_reserva=0.1)
+    fila.abastecer()
+    id_feedback = str(fila.reservar('lento', 1)['ID'].iloc[0])
+    time.sleep(0.2)
+    assert id_feedback in set(fila.reservar('rapido', 2)['ID'])
+
+    assert fila.guardar_resultados({id_feedback: {'Sentimento': 'Positivo'}}) == 1
+    assert fila.guardar_resultados({id_feedback: {'Sentimento': 'Negativo'}}) == 0
@@ -0,0 +1,13 @@
+from scripts import gerarFeedback
+
+def test_faker_so_na_primeira_chamada(monkeypatch):
+    gerarFeedback._pools_padrao.cache_clear()
+    chamadas = []
+    criar = gerarFeedback.criar_pools_de_nomes
+    monkeypatch.setattr(gerarFeedback, 'criar_pools_de_nomes', lambda *args: chamadas.append(args) or criar(*args))
+    for setor in gerarFeedback.SETORES * 2:
+        assert len(gerarFeedback.gerar_feedbacks_com_faker(5, setor)) == 5
+    assert len(chamadas) == 1
+
+def test_ids_sempre_novos(gerar_feedbacks):
+    assert set(gerar_feedbacks(50, semente=1)['ID']).isdisjoint(gerar_feedbacks(50, semente=1)['ID'])
@@ -0,0 +1,25 @@
+import pytest
+from scripts import armazenamento, config
+from scripts.quase_duplicatas import IndiceQuaseDuplicatas, carregar_classificados
+
+def test_salvar_junta_o_que_outro_trabalhador_gravou(dados_temporarios):
+    primeiro, segundo = IndiceQuaseDuplicatas(), IndiceQuaseDuplicatas() # os dois leram o índice vazio
+    primeiro.atualizar(['a1', 'a2'], ['o quarto estava sujo e a recepção demorou muito', 'o café da manhã estava frio e sem opções'])
+    segundo.atualizar(['b1'], ['a piscina estava fechada durante toda a nossa estadia'])
+    primeiro.salvar()
+    segundo.salvar()
+    assert sorted(IndiceQuaseDuplicatas().ids.tolist()) == ['a1', 'a2', 'b1']
+
+@pytest.mark.parametrize('backend', ['csv', 'sqlite', 'parquet'])
+def test_carregar_classificados_so_dos_ids_pedidos(dados_temporarios, gerar_feedbacks, monkeypatch, backend):
+    monkeypatch.setattr(config, 'BACKEND_ARMAZENAMENTO', backend)
+    monkeypatch.setattr(config, 'CSV_LINHAS_POR_BLOCO', 7)
+    feedbacks = gerar_feedbacks(30)
+    armazenamento.anexar_feedbacks(feedbacks)
+    ids = feedbacks['ID'].astype(str).tolist()
+    armazenamento.salvar_classificacoes({id_feedback: {'Sentimento': 'Positivo', 'Status': config.STATUS_CLASSIFICADO}
+                                         for id_feedback in ids[:20]})
+
+    classificados = carregar_classificados([ids[3], ids[12], ids[25], 'inexistente'])
+    assert set(classificados) == {ids[3], ids[12]} # ids[25] ainda está pendente
+    assert classificados[ids[3]][2]['Sentimento'] == 'Positivo'
@@ -0,0 +1,5 @@
+from scripts import config, telemetria_ia
+
+def test_ler_sem_telemetria_nao_cria_o_arquivo(dados_temporarios):
+    assert telemetria_ia.carregar_chamadas() is None
+    assert not config.ARQUIVO_TELEMETRIA_IA.exists()
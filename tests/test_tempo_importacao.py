@@ -0,0 +1,14 @@
+import os
+import pytest
+from benchmarks import verificar_tempo_importacao as orcamento
+
+# máquinas mais lentas (ex.: CI compartilhado) podem afrouxar só os tempos, nunca a lista de bibliotecas
+FOLGA = float(os.environ.get('ORCAMENTO_IMPORTACAO_FOLGA', '1.0'))
+
+@pytest.mark.parametrize('modulo', list(orcamento.ORCAMENTOS))
+def test_importacao_nao_carrega_bibliotecas_pesadas(modulo):
+    _, pacotes = orcamento.medir_importacao(modulo)
+    assert not set(orcamento.ORCAMENTOS[modulo][1]) & pacotes
+
+def test_importacoes_e_menu_dentro_do_orcamento():
+    assert orcamento.verificar(repeticoes=3, folga=FOLGA) == []